@@ -48,11 +48,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero: el tiempo total de la petición incluye al resto de middlewares
+    "jobs.middleware.RequestTimingMiddleware",
+    # Todo lo que lea la base de datos después ya sabe si debe ir a la principal
+    "jobs.middleware.ReplicaPinningMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # Necesita request.user: solo perfila peticiones de usuarios staff
+    "jobs.middleware.RequestProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -61,7 +67,8 @@ ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates que además mide el tiempo de render (jobs.timing)
+        "BACKEND": "jobs.timing.DjangoTemplatesMedidas",
         "DIRS": [os.path.join(BASE_DIR, 'templates')],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -80,13 +87,74 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite en modo WAL para varios workers de gunicorn: los lectores no bloquean al
+# escritor y viceversa. Las PRAGMA se aplican al abrir cada conexión (init_command)
+# y las conexiones se reutilizan entre peticiones (CONN_MAX_AGE).
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # seguro con WAL; solo se pierde durabilidad ante un corte de luz
+    f"PRAGMA busy_timeout={config('SQLITE_BUSY_TIMEOUT_MS', default=5000, cast=int)}",
+    f"PRAGMA mmap_size={config('SQLITE_MMAP_SIZE', default=128 * 1024 * 1024, cast=int)}",
+    f"PRAGMA cache_size=-{config('SQLITE_CACHE_SIZE_KB', default=20000, cast=int)}",  # negativo = KiB
+    "PRAGMA temp_store=MEMORY",
+]
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "NAME": config('SQLITE_PATH', default=str(BASE_DIR / "db.sqlite3")),
+        "CONN_MAX_AGE": config('CONN_MAX_AGE', default=600, cast=int),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            # Espera del propio driver ante un bloqueo, en segundos
+            "timeout": config('SQLITE_BUSY_TIMEOUT_MS', default=5000, cast=int) / 1000,
+            # BEGIN IMMEDIATE: el bloqueo de escritura se pide al empezar la transacción,
+            # así dos transacciones no se bloquean mutuamente al pasar de lectura a escritura
+            "transaction_mode": "IMMEDIATE",
+            "init_command": ";".join(SQLITE_PRAGMAS),
+        },
+    }
+}
+
+# Réplicas de solo lectura: rutas de ficheros SQLite separadas por comas. Se llaman
+# replica1, replica2... y jobs.routers.PrimaryReplicaRouter les envía las lecturas.
+# En local se mantienen al día copiando la principal: `python manage.py sync_sqlite_replicas`.
+for _n, _ruta in enumerate(config('SQLITE_REPLICAS', default='', cast=Csv()), start=1):
+    DATABASES[f"replica{_n}"] = {
+        **DATABASES["default"],
+        "NAME": _ruta,
+        "OPTIONS": {
+            **DATABASES["default"]["OPTIONS"],
+            "init_command": ";".join(SQLITE_PRAGMAS + ["PRAGMA query_only=1"]),
+        },
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["jobs.routers.PrimaryReplicaRouter"]
+
+# Segundos que un usuario lee de la principal después de escribir (retraso de las réplicas)
+JOBS_REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# Reintentos de las escrituras que fallan con "database is locked" (jobs/db.py)
+JOBS_DB_RETRY_ATTEMPTS = 5
+JOBS_DB_RETRY_BACKOFF = 0.05  # segundos, se duplica en cada intento
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Con varios workers de gunicorn debe ser una caché compartida (Redis, Memcached,
+# FileBasedCache...) para que las invalidaciones lleguen a todos los procesos.
+
+CACHES = {
+    "default": {
+        "BACKEND": config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        "LOCATION": config('CACHE_LOCATION', default='ducky-default'),
     }
 }
 
+# Segundos que se guardan en caché los roles y ofertas propias de cada usuario (jobs.access)
+JOBS_ACCESS_CACHE_TIMEOUT = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -144,6 +212,95 @@ LOGIN_REDIRECT_URL = '/'
 # Redirige a login tras cerrar sesión
 LOGOUT_REDIRECT_URL = '/'
 
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend' 
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
 # Para producción, puedes usar SMTP o cualquier otro backend de correo
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
 DEFAULT_FROM_EMAIL = 'noreply@opentojob.es'
+
+# Bandeja de salida de correos (jobs.outbox / manage.py send_outbox)
+JOBS_OUTBOX_MAX_ATTEMPTS = 5
+JOBS_OUTBOX_BACKOFF_BASE = 60
+
+# Máximo de eventos que devuelve la API de la agenda en una sola respuesta
+JOBS_AGENDA_MAX_EVENTS = 500
+
+# Segundos que se guarda en caché el JSON de cada ventana de la agenda
+JOBS_AGENDA_CACHE_TIMEOUT = 60 * 60
+
+# Máximo de cambios por respuesta de la sincronización incremental de la agenda
+JOBS_AGENDA_MAX_SYNC_CHANGES = 200
+
+# Máximo de candidaturas por petición en el cambio de estado masivo
+JOBS_BULK_STATUS_MAX = 1000
+
+# Tiempo máximo en caché del HTML compartido de las páginas públicas de ofertas
+JOBS_FRAGMENT_CACHE_TIMEOUT = 3600
+# Recuentos de facetas del listado: caducan antes porque los tramos de antigüedad dependen de la hora
+JOBS_FACET_CACHE_TIMEOUT = 300
+# Ofertas de "Recomendadas para ti" en el panel del candidato (jobs/recommendations.py)
+JOBS_RECOMMENDATIONS_LIMIT = 6
+# Afinidad de las candidaturas con su oferta (jobs/fit.py), por versión de la oferta
+JOBS_FIT_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Cabecera Server-Timing con el desglose de cada petición (jobs.middleware.RequestTimingMiddleware)
+JOBS_SERVER_TIMING = config('SERVER_TIMING', default=True, cast=bool)
+
+
+# Consultas lentas (jobs.slow_queries): umbral en ms (0 lo desactiva) y fichero JSON
+# por líneas que resume `python manage.py slow_queries`
+JOBS_SLOW_QUERY_MS = config('SLOW_QUERY_MS', default=100, cast=float)
+JOBS_SLOW_QUERY_LOG = config('SLOW_QUERY_LOG', default=str(BASE_DIR / "slow_queries.log"))
+
+# Perfiles de cProfile que piden los usuarios staff con `X-Profile: 1` o `?_profile=1`
+# (jobs.middleware.RequestProfilerMiddleware); se leen con `python manage.py profiles`
+JOBS_PROFILE_DIR = config('PROFILE_DIR', default=str(BASE_DIR / "profiles"))
+JOBS_PROFILE_MAX_FILES = 200
+
+# Métricas de /metrics (jobs.metrics): cada proceso vuelca las suyas en este directorio,
+# que debe ser compartido por todos los workers y vaciarse en cada despliegue
+JOBS_METRICS_DIR = config('METRICS_DIR', default=str(BASE_DIR / "metrics"))
+JOBS_METRICS_FLUSH_SECONDS = 5
+# Token de /metrics (variable de entorno METRICS_TOKEN): el scraper de Prometheus envía
+# `Authorization: Bearer <token>`. Vacío, /metrics responde 404 salvo con DEBUG
+JOBS_METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+
+# Logging
+# Una línea por petición en 'jobs.timing' (ruta, status, tiempos y consultas) y una
+# línea JSON por consulta lenta en JOBS_SLOW_QUERY_LOG
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "simple": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+        "mensaje": {"format": "%(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "simple"},
+        "slow_queries": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": JOBS_SLOW_QUERY_LOG,
+            "maxBytes": 20 * 1024 * 1024,
+            "backupCount": 3,
+            "delay": True,  # el fichero se crea con la primera consulta lenta
+            "formatter": "mensaje",
+        },
+    },
+    "loggers": {
+        "jobs": {
+            "handlers": ["console"],
+            "level": config('JOBS_LOG_LEVEL', default='INFO'),
+            "propagate": False,
+        },
+        "jobs.slow_queries": {
+            "handlers": ["slow_queries"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
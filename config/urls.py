@@ -21,6 +21,7 @@ from django.conf import settings
 
 from django.conf.urls.static import static
 from core import views as core_views  # asumimos que home está en app "core"
+from jobs import views as jobs_views
 
 
 urlpatterns = [
@@ -29,6 +30,7 @@ urlpatterns = [
     path('', core_views.home, name='home'),  # Página de inicio
     path('account/', include('django.contrib.auth.urls')),  # login/logout
     path('jobs/', include('jobs.urls')),  # URLs de la app jobs
+    path('metrics', jobs_views.metrics, name='metrics'),  # Prometheus
    
 
 
@@ -0,0 +1,84 @@
+# jobs/access.py
+"""
+Resolución de permisos del usuario: grupos (roles) e ids de las ofertas que ha creado.
+
+Se calcula una sola vez por petición (se memoriza en el propio objeto user) y se
+guarda en la caché entre peticiones. Las señales de jobs/signals.py invalidan la
+entrada cuando cambian los grupos del usuario o se crean/borran sus ofertas.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+from .models import JobOffer
+from .routers import lectura_para_cache, marcar_cambio
+
+HEADHUNTER_GROUP = 'headhunter'
+
+# Tiempo máximo que una entrada puede vivir en caché aunque no se invalide
+ACCESS_CACHE_TIMEOUT = getattr(settings, 'JOBS_ACCESS_CACHE_TIMEOUT', 300)
+
+_REQUEST_ATTR = '_jobs_access'
+
+
+class UserAccess:
+    """Roles y ofertas propias de un usuario, inmutables durante la petición."""
+
+    __slots__ = ('user_id', 'roles', 'owned_offer_ids')
+
+    def __init__(self, user_id, roles=(), owned_offer_ids=()):
+        self.user_id = user_id
+        self.roles = frozenset(roles)
+        self.owned_offer_ids = frozenset(owned_offer_ids)
+
+    @property
+    def is_headhunter(self):
+        return HEADHUNTER_GROUP in self.roles
+
+    def has_role(self, name):
+        return name in self.roles
+
+    def owns_offer(self, offer_id):
+        return offer_id in self.owned_offer_ids
+
+
+ANONYMOUS_ACCESS = UserAccess(None)
+
+
+def access_cache_key(user_id):
+    return f'jobs:access:{user_id}'
+
+
+def get_user_access(user):
+    """
+    Devuelve el UserAccess del usuario. Como mucho dos consultas por usuario
+    hasta que la entrada de caché se invalida o expira.
+    """
+    if user is None or not user.is_authenticated:
+        return ANONYMOUS_ACCESS
+
+    access = getattr(user, _REQUEST_ATTR, None)
+    if access is not None:
+        return access
+
+    key = access_cache_key(user.pk)
+    data = cache.get(key)
+    metrics.inc('jobs_cache_requests_total', cache='permisos', result='miss' if data is None else 'hit')
+    if data is None:
+        with lectura_para_cache(key):
+            data = {
+                'roles': list(user.groups.values_list('name', flat=True)),
+                'offers': list(JobOffer.objects.filter(created_by_id=user.pk).values_list('id', flat=True)),
+            }
+        cache.set(key, data, ACCESS_CACHE_TIMEOUT)
+
+    access = UserAccess(user.pk, data['roles'], data['offers'])
+    setattr(user, _REQUEST_ATTR, access)
+    return access
+
+
+def invalidate_user_access(*user_ids):
+    keys = [access_cache_key(user_id) for user_id in user_ids if user_id is not None]
+    if keys:
+        cache.delete_many(keys)
+        marcar_cambio(*keys)
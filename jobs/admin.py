@@ -1,6 +1,6 @@
 # jobs/admin.py
 from django.contrib import admin
-from .models import JobOffer, StatusMessageTemplate, Candidatura, AgendaAccion # Asegúrate de importar todos tus modelos
+from .models import JobOffer, StatusMessageTemplate, Candidatura, AgendaAccion, OutboxEmail # Asegúrate de importar todos tus modelos
 
 # Inline para ver Candidaturas directamente en la página de JobOffer
 class CandidaturaInline(admin.TabularInline): # admin.StackedInline ofrece un layout diferente
@@ -10,15 +10,19 @@ class CandidaturaInline(admin.TabularInline): # admin.StackedInline ofrece un la
     readonly_fields = ('user', 'fecha_aplicacion', 'updated_at') # Campos que no se pueden editar directamente aquí
     can_delete = False # O True si quieres permitir eliminar candidaturas desde la oferta
 
+    def get_queryset(self, request):
+        # Cada fila muestra el usuario y la oferta: sin esto, dos consultas por candidatura
+        return super().get_queryset(request).select_related('user', 'offer')
+
 # 1. Personalización para JobOffer
 @admin.register(JobOffer)
 class JobOfferAdmin(admin.ModelAdmin):
     # CORREGIDO: Añadido 'updated_at' al list_display y readonly_fields según tu modelo de JobOffer
-    list_display = ['title', 'company_name', 'location', 'modality', 'created_by', 'is_active', 'created_at', 'updated_at']
+    list_display = ['title', 'company_name', 'location', 'modality', 'created_by', 'is_active', 'num_candidaturas', 'created_at', 'updated_at']
     list_filter = ['is_active', 'modality', 'created_at', 'company_name']
     search_fields = ['title', 'company_name', 'location', 'description', 'created_by__username']
     ordering = ('-created_at',) # Ordenar por fecha de creación descendente por defecto
-    readonly_fields = ('created_by', 'created_at', 'updated_at') # Campos que no deberían ser editables después de la creación
+    readonly_fields = ('created_by', 'created_at', 'updated_at', 'num_candidaturas', 'num_pendientes', 'num_aceptadas', 'num_rechazadas') # Campos que no deberían ser editables después de la creación
 
     # Agrupar campos en la página de edición
     fieldsets = (
@@ -33,6 +37,10 @@ class JobOfferAdmin(admin.ModelAdmin):
             'fields': ('created_by', 'created_at', 'updated_at'),
             'classes': ('collapse',),
         }),
+        ('Candidaturas', { # Contadores mantenidos automáticamente
+            'fields': ('num_candidaturas', 'num_pendientes', 'num_aceptadas', 'num_rechazadas'),
+            'classes': ('collapse',),
+        }),
     )
 
     inlines = [CandidaturaInline] # Añadir las candidaturas como inlines
@@ -75,17 +83,17 @@ class CandidaturaAdmin(admin.ModelAdmin):
     actions = ['marcar_como_aceptado', 'marcar_como_rechazado', 'marcar_como_pendiente'] # Usando los CHOICES existentes
 
     def marcar_como_aceptado(self, request, queryset):
-        updated = queryset.update(estado='aceptado')
+        updated = queryset.cambiar_estado('aceptado') # Mantiene los contadores de la oferta
         self.message_user(request, f"{updated} candidaturas marcadas como 'Aceptado'.", level='success')
     marcar_como_aceptado.short_description = "Marcar candidaturas seleccionadas como 'Aceptado'"
 
     def marcar_como_rechazado(self, request, queryset):
-        updated = queryset.update(estado='rechazado')
+        updated = queryset.cambiar_estado('rechazado') # Mantiene los contadores de la oferta
         self.message_user(request, f"{updated} candidaturas marcadas como 'Rechazado'.", level='warning')
     marcar_como_rechazado.short_description = "Marcar candidaturas seleccionadas como 'Rechazado'"
 
     def marcar_como_pendiente(self, request, queryset):
-        updated = queryset.update(estado='pendiente')
+        updated = queryset.cambiar_estado('pendiente') # Mantiene los contadores de la oferta
         self.message_user(request, f"{updated} candidaturas marcadas como 'Pendiente'.", level='info')
     marcar_como_pendiente.short_description = "Marcar candidaturas seleccionadas como 'Pendiente'"
 
@@ -103,6 +111,8 @@ class AgendaAccionAdmin(admin.ModelAdmin):
     list_filter = ('tipo', 'fecha_hora_inicio', 'oferta__title', 'user__username') # CORREGIDO: Usar 'fecha_hora_inicio'
     search_fields = ('titulo', 'descripcion', 'oferta__title', 'user__username') # CORREGIDO: 'descripcion'
     ordering = ('fecha_hora_inicio',) # CORREGIDO: Usar 'fecha_hora_inicio'
+    # 'oferta' admite nulos y el select_related automático del listado no la sigue
+    list_select_related = ('user', 'oferta')
 
     # Método para mostrar una versión corta de la descripción en list_display
     def display_descripcion(self, obj):
@@ -117,4 +127,14 @@ class AgendaAccionAdmin(admin.ModelAdmin):
     )
     # Si tienes muchas ofertas o candidaturas, esto puede ser útil
     # Si añades candidatura a AgendaAccion, también la pones aquí
-    raw_id_fields = ('user', 'oferta') # 'candidatura' si lo añades al modelo
\ No newline at end of file
+    raw_id_fields = ('user', 'oferta') # 'candidatura' si lo añades al modelo
+
+
+# 5. Bandeja de salida de correos (solo consulta; la vacía `manage.py send_outbox`)
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('asunto', 'destinatario', 'estado', 'intentos', 'proximo_intento', 'creado', 'enviado')
+    list_filter = ('estado',)
+    search_fields = ('destinatario', 'asunto')
+    readonly_fields = ('candidatura', 'destinatario', 'asunto', 'cuerpo', 'intentos', 'ultimo_error', 'creado', 'enviado')
+    raw_id_fields = ('candidatura',)
@@ -0,0 +1,115 @@
+# jobs/agenda.py
+"""
+Caché de los feeds de la agenda (api_acciones_headhunter) y registro de cambios
+para la sincronización incremental (api_acciones_cambios).
+
+Cada usuario tiene un número de versión de agenda que se incrementa cuando se
+crea, modifica o elimina una de sus acciones (ver jobs/signals.py). El JSON ya
+serializado de cada ventana se guarda bajo (usuario, versión, ventana), así que
+al cambiar la versión las entradas anteriores dejan de leerse y caducan solas.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+from .models import AgendaCambio
+from .routers import marcar_cambio
+
+AGENDA_FEED_TIMEOUT = getattr(settings, 'JOBS_AGENDA_CACHE_TIMEOUT', 60 * 60)
+
+
+def version_key(user_id):
+    return f'jobs:agenda:version:{user_id}'
+
+
+def get_version(user_id):
+    """
+    Versión actual de la agenda del usuario. Si la clave no existe (arranque,
+    expulsión de la caché) se inicializa con un valor basado en el reloj para no
+    reutilizar nunca una versión antigua.
+    """
+    key = version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(user_id):
+    if user_id is None:
+        return
+    key = version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+    marcar_cambio(key)
+
+
+def feed_key(user_id, version, *window):
+    digest = hashlib.sha1('|'.join(str(part) for part in window).encode()).hexdigest()
+    return f'jobs:agenda:feed:{user_id}:{version}:{digest}'
+
+
+def make_etag(body):
+    """ETag fuerte: hash del contenido exacto de la respuesta."""
+    return '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+
+def get_feed(user_id, *window):
+    """
+    Devuelve (key, entrada) donde entrada es un dict {'body', 'etag', 'headers'}
+    o None si no está en caché para la versión actual.
+    """
+    key = feed_key(user_id, get_version(user_id), *window)
+    entry = cache.get(key)
+    metrics.inc('jobs_cache_requests_total', cache='agenda', result='miss' if entry is None else 'hit')
+    return key, entry
+
+
+def set_feed(key, body, headers=None):
+    entry = {'body': body, 'etag': make_etag(body), 'headers': headers or {}}
+    cache.set(key, entry, AGENDA_FEED_TIMEOUT)
+    return entry
+
+
+# --- Sincronización incremental ---
+
+def registrar_cambio(user_id, accion_id, eliminada=False):
+    """
+    Deja constancia de que la acción ha cambiado. Se sustituye la fila anterior de
+    la acción para que el registro no crezca con cada edición.
+    """
+    AgendaCambio.objects.filter(accion_id=accion_id).delete()
+    AgendaCambio.objects.create(user_id=user_id, accion_id=accion_id, eliminada=eliminada)
+
+
+def token_actual(user_id):
+    """Último token de sincronización del usuario (0 si nunca ha cambiado nada)."""
+    ultimo = AgendaCambio.objects.filter(user_id=user_id).order_by('-id').values_list('id', flat=True).first()
+    return ultimo or 0
+
+
+def cambios_desde(user_id, token, limit):
+    """
+    Cambios posteriores a `token`, como mucho `limit`. Devuelve
+    (nuevo_token, ids_modificados, ids_eliminados, desbordado).
+    """
+    filas = list(
+        AgendaCambio.objects
+        .filter(user_id=user_id, id__gt=token)
+        .order_by('id')
+        .values_list('id', 'accion_id', 'eliminada')[:limit + 1]
+    )
+    if len(filas) > limit:
+        return token_actual(user_id), [], [], True
+    if not filas:
+        return token, [], [], False
+    modificados = [accion_id for _, accion_id, eliminada in filas if not eliminada]
+    eliminados = [accion_id for _, accion_id, eliminada in filas if eliminada]
+    return filas[-1][0], modificados, eliminados, False
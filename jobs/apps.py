@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class JobsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "jobs"
+
+    def ready(self):
+        # Registra los receptores de señales (índice de búsqueda, etc.)
+        from . import signals  # noqa: F401
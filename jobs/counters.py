@@ -0,0 +1,92 @@
+# jobs/counters.py
+"""
+Mantenimiento de los contadores de candidaturas de JobOffer
+(num_candidaturas, num_pendientes, num_aceptadas, num_rechazadas).
+
+Los cambios individuales llegan por señales (jobs/signals.py), los masivos por
+Candidatura.objects.cambiar_estado() y cualquier desajuste (bulk_create,
+queryset.update directo, SQL manual) se repara con recalcular_contadores().
+"""
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import JobOffer, Candidatura, CONTADOR_POR_ESTADO, ajustar_contadores
+
+CAMPOS_CONTADOR = JobOffer.CAMPOS_CONTADOR
+
+
+def candidatura_creada(candidatura):
+    deltas = {'num_candidaturas': 1}
+    campo = CONTADOR_POR_ESTADO.get(candidatura.estado)
+    if campo:
+        deltas[campo] = 1
+    ajustar_contadores(candidatura.offer_id, **deltas)
+
+
+def candidatura_cambiada(candidatura, estado_anterior):
+    if estado_anterior == candidatura.estado:
+        return
+    deltas = {}
+    origen = CONTADOR_POR_ESTADO.get(estado_anterior)
+    destino = CONTADOR_POR_ESTADO.get(candidatura.estado)
+    if origen:
+        deltas[origen] = -1
+    if destino:
+        deltas[destino] = 1
+    ajustar_contadores(candidatura.offer_id, **deltas)
+
+
+def candidatura_eliminada(candidatura):
+    deltas = {'num_candidaturas': -1}
+    campo = CONTADOR_POR_ESTADO.get(candidatura.estado)
+    if campo:
+        deltas[campo] = -1
+    ajustar_contadores(candidatura.offer_id, **deltas)
+
+
+def _recuentos():
+    """Recuento real de cada contador como subconsulta correlacionada sobre la oferta."""
+    def contar(**filtro):
+        return Coalesce(Subquery(
+            Candidatura.objects.filter(offer=OuterRef('pk'), **filtro).order_by()
+            .values('offer').annotate(n=Count('id')).values('n')
+        ), 0)
+    recuentos = {'num_candidaturas': contar()}
+    for estado, campo in CONTADOR_POR_ESTADO.items():
+        recuentos[campo] = contar(estado=estado)
+    return recuentos
+
+
+def recalcular_contadores(batch_size=500, dry_run=False):
+    """
+    Recalcula los contadores por lotes de ofertas y corrige las que no coinciden.
+    Devuelve la lista de ids de ofertas que estaban desajustadas.
+
+    Cada lote va en su propia transacción y se corrige con un único
+    UPDATE ... SET num_x = (SELECT COUNT(...)): el recuento se hace en la misma
+    sentencia que la escritura, así que una candidatura creada o cambiada
+    mientras tanto (que ajusta los contadores con F()) no se pisa con un valor
+    calculado antes.
+    """
+    recuentos = _recuentos()
+    reales = {f'real_{campo}': expresion for campo, expresion in recuentos.items()}
+    desajustadas = []
+    ultimo = 0
+    while True:
+        with transaction.atomic():
+            lote = list(
+                JobOffer.objects.filter(pk__gt=ultimo).order_by('pk')
+                .annotate(**reales).values('pk', *CAMPOS_CONTADOR, *reales)[:batch_size]
+            )
+            if not lote:
+                break
+            ultimo = lote[-1]['pk']
+            ids = [
+                fila['pk'] for fila in lote
+                if any(fila[campo] != fila[f'real_{campo}'] for campo in CAMPOS_CONTADOR)
+            ]
+            if ids and not dry_run:
+                JobOffer.objects.filter(pk__in=ids).update(**recuentos)
+        desajustadas.extend(ids)
+    return desajustadas
@@ -0,0 +1,63 @@
+# jobs/db.py
+"""
+Reintentos de escrituras ante "database is locked".
+
+Con SQLite solo hay un escritor a la vez. El busy_timeout de la conexión ya
+espera a que se libere el bloqueo, pero bajo picos de escrituras (varios
+workers de gunicorn) aun así puede agotarse. `con_reintentos` ejecuta la
+escritura en su propia transacción y, si falla por bloqueo, la repite unas
+pocas veces con backoff exponencial antes de propagar el error.
+"""
+import functools
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+MAX_INTENTOS = getattr(settings, 'JOBS_DB_RETRY_ATTEMPTS', 5)
+BACKOFF = getattr(settings, 'JOBS_DB_RETRY_BACKOFF', 0.05)  # segundos
+
+_MENSAJES_BLOQUEO = ('database is locked', 'database table is locked', 'database is busy')
+
+
+def es_bloqueo(exc):
+    return isinstance(exc, OperationalError) and any(msg in str(exc).lower() for msg in _MENSAJES_BLOQUEO)
+
+
+def con_reintentos(func=None, *, intentos=None, using=DEFAULT_DB_ALIAS):
+    """
+    Decorador: ejecuta `func` dentro de transaction.atomic() y la repite si
+    falla por bloqueo de la base de datos.
+
+    Dentro de una transacción ya abierta no se reintenta (la transacción externa
+    ya está abortada); el error se propaga para que la reintente quien la abrió.
+    """
+    if func is None:
+        return functools.partial(con_reintentos, intentos=intentos, using=using)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        max_intentos = intentos or MAX_INTENTOS
+        intento = 1
+        while True:
+            try:
+                with transaction.atomic(using=using):
+                    return func(*args, **kwargs)
+            except OperationalError as exc:
+                if (
+                    not es_bloqueo(exc)
+                    or intento >= max_intentos
+                    or connections[using].in_atomic_block
+                ):
+                    raise
+            espera = BACKOFF * (2 ** (intento - 1))
+            time.sleep(espera * random.uniform(0.5, 1.5))
+            intento += 1
+
+    return wrapper
+
+
+def guardar(instance, **kwargs):
+    """instance.save(**kwargs) con reintentos ante bloqueo."""
+    return con_reintentos(instance.save)(**kwargs)
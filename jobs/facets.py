@@ -0,0 +1,201 @@
+# jobs/facets.py
+"""
+Navegación por facetas del listado de ofertas: modalidad, categoría,
+ubicación y antigüedad de la publicación.
+
+Todos los recuentos salen de una sola consulta agrupada por (modalidad,
+categoría, ubicación, tramo de antigüedad) sobre las ofertas activas (y las
+que coinciden con la búsqueda o el rango de salario, si los hay), servida por el índice
+jobs_offer_facets_idx. Con esas filas se calcula en Python cada faceta para
+cualquier combinación de filtros: el recuento de un valor aplica los filtros
+de las demás facetas, no el de la propia, para que se vean las alternativas.
+
+Las filas se guardan en caché por versión del listado y conjunto base
+(búsqueda y rango de salario), y el resultado por firma de filtros. Como los
+tramos de antigüedad dependen de la hora, caducan a los
+JOBS_FACET_CACHE_TIMEOUT segundos.
+"""
+import hashlib
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Value, When
+from django.utils import timezone
+
+from . import fragments, metrics
+from .models import JobOffer
+
+FACET_TIMEOUT = getattr(settings, 'JOBS_FACET_CACHE_TIMEOUT', 5 * 60)
+
+# Valores que se muestran como mucho en las facetas de texto libre
+MAX_VALORES = 10
+MAX_LONGITUD = 100
+
+# Tramos de antigüedad: (valor del filtro, etiqueta, días). Son acumulativos:
+# "última semana" incluye las de las últimas 24 horas.
+ANTIGUEDADES = [
+    ('24h', 'Últimas 24 horas', 1),
+    ('7d', 'Última semana', 7),
+    ('30d', 'Último mes', 30),
+]
+DIAS = {valor: dias for valor, _, dias in ANTIGUEDADES}
+TRAMOS = {valor: n for n, (valor, _, _) in enumerate(ANTIGUEDADES)}
+
+# Parámetro de la URL -> etiqueta, en el orden de las columnas de las filas agrupadas
+FACETAS = {
+    'modality': 'Modalidad',
+    'category': 'Categoría',
+    'location': 'Ubicación',
+    'publicada': 'Publicada',
+}
+COLUMNAS = {nombre: n for n, nombre in enumerate(FACETAS)}
+
+
+def leer_filtros(params):
+    """Filtros válidos de la query string ({parámetro: valor}); lo que no es válido se ignora."""
+    filtros = {}
+    modalidad = params.get('modality', '')
+    if modalidad in JobOffer.ModalityChoices.values:
+        filtros['modality'] = modalidad
+    for nombre in ('category', 'location'):
+        valor = params.get(nombre, '').strip()[:MAX_LONGITUD]
+        if valor:
+            filtros[nombre] = valor
+    if params.get('publicada', '') in DIAS:
+        filtros['publicada'] = params['publicada']
+    return filtros
+
+
+def filtrar(queryset, filtros):
+    """Aplica los filtros al queryset de ofertas."""
+    if 'modality' in filtros:
+        queryset = queryset.filter(modality=filtros['modality'])
+    if 'category' in filtros:
+        queryset = queryset.filter(category=filtros['category'])
+    if 'location' in filtros:
+        queryset = queryset.filter(location=filtros['location'])
+    if 'publicada' in filtros:
+        queryset = queryset.filter(created_at__gte=timezone.now() - timedelta(days=DIAS[filtros['publicada']]))
+    return queryset
+
+
+def firma(filtros):
+    """Representación estable de los filtros, para claves de caché."""
+    return urlencode(sorted(filtros.items()))
+
+
+# --- Recuentos ---
+
+def _tramo(ahora):
+    # 0: últimas 24 h, 1: última semana, 2: último mes, 3: más antiguas
+    return Case(
+        *[When(created_at__gte=ahora - timedelta(days=dias), then=Value(n))
+          for n, (_, _, dias) in enumerate(ANTIGUEDADES)],
+        default=Value(len(ANTIGUEDADES)),
+        output_field=IntegerField(),
+    )
+
+
+def agrupar(queryset):
+    """La consulta agrupada: una fila por combinación de valores, con su número de ofertas."""
+    filas = (
+        queryset.order_by()
+        .annotate(edad=_tramo(timezone.now()))
+        .values_list('modality', 'category', 'location', 'edad')
+        .annotate(n=Count('id'))
+    )
+    return [tuple(fila) for fila in filas]
+
+
+def _cumple(fila, filtros, excepto):
+    for nombre, valor in filtros.items():
+        if nombre == excepto:
+            continue
+        if nombre == 'publicada':
+            if fila[COLUMNAS['publicada']] > TRAMOS[valor]:
+                return False
+        elif fila[COLUMNAS[nombre]] != valor:
+            return False
+    return True
+
+
+def calcular(filas, filtros):
+    """
+    {parámetro: [{'valor', 'etiqueta', 'n', 'activo'}]} para cada faceta, más
+    'total' con las ofertas que cumplen todos los filtros.
+    """
+    resultado = {}
+    for nombre in FACETAS:
+        cuentas = {}
+        for fila in filas:
+            if _cumple(fila, filtros, excepto=nombre):
+                valor = fila[COLUMNAS[nombre]]
+                cuentas[valor] = cuentas.get(valor, 0) + fila[4]
+        resultado[nombre] = _valores(nombre, cuentas, filtros.get(nombre))
+    resultado['total'] = sum(fila[4] for fila in filas if _cumple(fila, filtros, excepto=None))
+    return resultado
+
+
+def _valores(nombre, cuentas, activo):
+    if nombre == 'modality':
+        opciones = [(valor, etiqueta, cuentas.get(valor, 0)) for valor, etiqueta in JobOffer.ModalityChoices.choices]
+    elif nombre == 'publicada':
+        # Acumulativo sobre los tramos 0..n
+        opciones = [
+            (valor, etiqueta, sum(cuentas.get(tramo, 0) for tramo in range(n + 1)))
+            for n, (valor, etiqueta, _) in enumerate(ANTIGUEDADES)
+        ]
+    else:
+        ordenadas = sorted(((v, n) for v, n in cuentas.items() if v), key=lambda par: (-par[1], par[0]))
+        elegidas = ordenadas[:MAX_VALORES]
+        if activo and activo not in dict(elegidas):
+            elegidas.append((activo, cuentas.get(activo, 0)))
+        opciones = [(valor, valor, n) for valor, n in elegidas]
+    return [
+        {'valor': valor, 'etiqueta': etiqueta, 'n': n, 'activo': valor == activo}
+        for valor, etiqueta, n in opciones
+        if n or valor == activo
+    ]
+
+
+def get_facetas(queryset, filtros, clave_base=''):
+    """
+    Facetas para los filtros actuales. `queryset` es el conjunto sin filtros de
+    facetas (ofertas activas, ya restringidas por la búsqueda o el salario si los
+    hay) y `clave_base` lo identifica en la caché.
+    """
+    version = fragments.get_list_version()
+    base = hashlib.sha1(clave_base.encode()).hexdigest()
+    clave = f'jobs:facets:{version}:{base}:{hashlib.sha1(firma(filtros).encode()).hexdigest()}'
+    resultado = cache.get(clave)
+    metrics.inc('jobs_cache_requests_total', cache='facetas', result='miss' if resultado is None else 'hit')
+    if resultado is not None:
+        return resultado
+
+    clave_filas = f'jobs:facets:filas:{version}:{base}'
+    filas = cache.get(clave_filas)
+    if filas is None:
+        filas = agrupar(queryset)
+        cache.set(clave_filas, filas, FACET_TIMEOUT)
+    resultado = calcular(filas, filtros)
+    cache.set(clave, resultado, FACET_TIMEOUT)
+    return resultado
+
+
+def enlazar(facetas, params):
+    """
+    Añade 'url' a cada valor: la query string que activa ese valor (o lo quita si
+    ya está activo), volviendo a la primera página.
+    """
+    base = {clave: valor for clave, valor in params.items() if clave != 'cursor'}
+    for nombre in FACETAS:
+        for opcion in facetas[nombre]:
+            nuevos = dict(base)
+            if opcion['activo']:
+                nuevos.pop(nombre, None)
+            else:
+                nuevos[nombre] = opcion['valor']
+            opcion['url'] = '?' + urlencode(nuevos)
+    return facetas
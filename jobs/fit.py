@@ -0,0 +1,75 @@
+# jobs/fit.py
+"""
+Afinidad de cada candidatura con su oferta, para ordenar el panel de
+postulaciones del headhunter: similitud del coseno TF-IDF entre el mensaje de
+la candidatura y los requisitos y la descripción de la oferta.
+
+El IDF se calcula sobre los mensajes de los candidatos de la propia oferta (lo
+que distingue a un candidato de los demás que se presentaron), así que no
+depende de la matriz de recomendaciones ni de ninguna consulta extra. Como el
+IDF es del conjunto, las afinidades de una misma lectura se guardan juntas:
+una clave por candidatura bajo (versión de la oferta, firma del conjunto de
+candidaturas). Una candidatura nueva o borrada cambia la firma y se puntúan
+todas otra vez, en un solo lote con arrays de NumPy.
+"""
+import hashlib
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from . import fragments
+from .tfidf import terminos, terminos_oferta
+
+FIT_TIMEOUT = getattr(settings, 'JOBS_FIT_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def cache_key(offer_id, version, firma, candidatura_id):
+    return f'jobs:fit:{offer_id}:{version}:{firma}:{candidatura_id}'
+
+
+def firma_conjunto(candidaturas):
+    return hashlib.sha1(','.join(str(pk) for pk in sorted(c.pk for c in candidaturas)).encode()).hexdigest()
+
+
+def puntuar(offer, textos):
+    """Afinidad en [0, 1] de cada texto con los requisitos y la descripción de la oferta, en el mismo orden."""
+    vocabulario = {}
+    filas, columnas, tf = [], [], []
+    for fila, texto in enumerate(textos):
+        for termino, peso in terminos(texto).items():
+            filas.append(fila)
+            columnas.append(vocabulario.setdefault(termino, len(vocabulario)))
+            tf.append(peso)
+    oferta = terminos_oferta('', offer.description, offer.requirements, '')
+    for termino in oferta:
+        vocabulario.setdefault(termino, len(vocabulario))
+
+    filas, columnas = np.array(filas, np.int64), np.array(columnas, np.int64)
+    # IDF sobre los textos puntuados, con el suavizado 1 + log((1 + n) / (1 + df))
+    df = np.bincount(columnas, minlength=len(vocabulario))
+    idf = np.log((1 + len(textos)) / (1 + df)) + 1
+    consulta = np.zeros(len(vocabulario))
+    consulta[[vocabulario[termino] for termino in oferta]] = list(oferta.values())
+    consulta *= idf
+    norma_consulta = np.linalg.norm(consulta)
+
+    pesos = np.array(tf) * idf[columnas]
+    normas = np.sqrt(np.bincount(filas, weights=pesos * pesos, minlength=len(textos))) * norma_consulta
+    productos = np.bincount(filas, weights=pesos * consulta[columnas], minlength=len(textos))
+    # Mensaje vacío, o sin ningún término que pese: afinidad 0
+    return np.divide(productos, normas, out=np.zeros(len(textos)), where=normas > 0).tolist()
+
+
+def afinidades(offer, candidaturas):
+    """{candidatura_id: afinidad} de todas las candidaturas de la oferta (el IDF es el de este conjunto)."""
+    version = fragments.get_offer_versions([offer.pk])[offer.pk]
+    firma = firma_conjunto(candidaturas)
+    claves = {c.pk: cache_key(offer.pk, version, firma, c.pk) for c in candidaturas}
+    guardadas = cache.get_many(list(claves.values()))
+    if len(guardadas) < len(claves):
+        # Falta alguna (conjunto nuevo o clave expulsada): se puntúan todas con el mismo IDF
+        puntos = puntuar(offer, [c.mensaje_personalizado or '' for c in candidaturas])
+        guardadas = {claves[c.pk]: p for c, p in zip(candidaturas, puntos)}
+        cache.set_many(guardadas, FIT_TIMEOUT)
+    return {pk: guardadas[clave] for pk, clave in claves.items()}
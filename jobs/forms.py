@@ -9,6 +9,9 @@ from .models import (
 )
 from django.utils import timezone 
 
+from .access import get_user_access
+from .status_messages import CAMPOS
+
 
 class JobOfferForm(forms.ModelForm):
     """
@@ -75,6 +78,9 @@ class StatusMessageTemplateForm(forms.ModelForm):
     class Meta:
         model = StatusMessageTemplate
         fields = ['estado', 'mensaje']
+        help_texts = {
+            'mensaje': "Marcadores disponibles: " + ", ".join("{{ %s }}" % campo for campo in CAMPOS),
+        }
         widgets = {
             'estado': forms.Select(attrs={'class': 'form-select'}),
             'mensaje': forms.Textarea(attrs={'rows': 8, 'class': 'form-control', 'placeholder': 'Cuerpo del mensaje...'}),
@@ -111,7 +117,7 @@ class AgendaAccionForm(forms.ModelForm):
         self.user = kwargs.pop('user', None) 
         super().__init__(*args, **kwargs)
 
-        if self.user and self.user.groups.filter(name='headhunter').exists():
+        if self.user and get_user_access(self.user).is_headhunter:
             # Filtra las ofertas creadas por el headhunter actual
             self.fields['oferta'].queryset = JobOffer.objects.filter(created_by=self.user).order_by('title')
             
@@ -139,7 +145,7 @@ class AgendaAccionForm(forms.ModelForm):
         duracion = self.cleaned_data['duracion_minutos']
         if duracion <= 0:
             raise forms.ValidationError("La duración debe ser un número positivo.")
-        if duracion > 480: # 8 horas
+        if duracion > AgendaAccion.MAX_DURACION_MINUTOS: # 8 horas
             raise forms.ValidationError("La duración máxima permitida es de 8 horas.")
         return duracion
 
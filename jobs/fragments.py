@@ -0,0 +1,172 @@
+# jobs/fragments.py
+"""
+Caché de HTML compartido de las páginas públicas de ofertas (JobOfferList y
+JobOfferDetailView).
+
+Se guardan tres cosas, todas iguales para cualquier visitante:
+  - la tarjeta de cada oferta del listado (con variante 'headhunter', que
+    además muestra quién la creó),
+  - el cuerpo de la página de detalle de cada oferta,
+  - los ids de cada página del listado (por cursor y tamaño de página).
+
+Cada oferta tiene su número de versión y el listado uno global; las señales de
+jobs/signals.py los incrementan al guardar o borrar una oferta, así que las
+entradas antiguas dejan de leerse y caducan solas. Lo personal (si el usuario
+ya se postuló, si es el creador, si es headhunter) no se guarda aquí: lo calcula
+la vista en cada petición.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import metrics
+from .routers import lectura_para_cache, marcar_cambio
+
+FRAGMENT_TIMEOUT = getattr(settings, 'JOBS_FRAGMENT_CACHE_TIMEOUT', 60 * 60)
+
+LIST_VERSION_KEY = 'jobs:offers:version'
+
+CARD_TEMPLATE = 'jobs/fragments/offer_card.html'
+DETAIL_TEMPLATE = 'jobs/fragments/offer_detail_body.html'
+
+VARIANTE_PUBLICA = 'publica'
+VARIANTE_HEADHUNTER = 'headhunter'
+
+
+# --- Versiones ---
+
+def offer_version_key(offer_id):
+    return f'jobs:offer:version:{offer_id}'
+
+
+def _get_or_init(key):
+    # Igual que la versión de la agenda: se inicializa con el reloj para no
+    # reutilizar nunca una versión anterior tras una expulsión de la caché
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+    marcar_cambio(key)
+
+
+def get_list_version():
+    return _get_or_init(LIST_VERSION_KEY)
+
+
+def get_offer_versions(offer_ids):
+    """{offer_id: versión} en una sola lectura de la caché (más las que falte crear)."""
+    keys = {offer_id: offer_version_key(offer_id) for offer_id in offer_ids}
+    found = cache.get_many(keys.values())
+    return {
+        offer_id: found[key] if key in found else _get_or_init(key)
+        for offer_id, key in keys.items()
+    }
+
+
+def bump_list_version():
+    """Invalida todas las páginas del listado (p. ej. tras cargas masivas sin señales)."""
+    _bump(LIST_VERSION_KEY)
+
+
+def bump_offer(offer_id):
+    """Invalida los fragmentos de la oferta y todas las páginas del listado."""
+    _bump(offer_version_key(offer_id))
+    bump_list_version()
+
+
+# --- Páginas del listado ---
+
+def list_page_key(version, *params):
+    digest = hashlib.sha1('|'.join(str(part) for part in params).encode()).hexdigest()
+    return f'jobs:offers:page:{version}:{digest}'
+
+
+def get_list_page(*params):
+    """
+    Devuelve (key, entrada) donde entrada es un dict {'ids', 'next', 'previous'}
+    o None si la página no está en caché para la versión actual del listado.
+    """
+    key = list_page_key(get_list_version(), *params)
+    entry = cache.get(key)
+    metrics.inc('jobs_cache_requests_total', cache='listado', result='miss' if entry is None else 'hit')
+    return key, entry
+
+
+def set_list_page(key, ids, next_cursor, previous_cursor):
+    entry = {'ids': list(ids), 'next': next_cursor, 'previous': previous_cursor}
+    cache.set(key, entry, FRAGMENT_TIMEOUT)
+    return entry
+
+
+# --- Fragmentos HTML ---
+
+def card_key(offer_id, version, variante):
+    return f'jobs:frag:card:{offer_id}:{version}:{variante}'
+
+
+def detail_key(offer_id, version):
+    return f'jobs:frag:detail:{offer_id}:{version}'
+
+
+def get_cards(offer_ids, variante, load_offers):
+    """
+    HTML de la tarjeta de cada oferta, en el orden de `offer_ids`.
+
+    Las que no están en caché se cargan con `load_offers(ids)` (un iterable de
+    JobOffer, una sola consulta), se renderizan y se guardan. Los ids que ya no
+    existen se omiten. Devuelve una lista de (offer_id, html).
+    """
+    versions = get_offer_versions(offer_ids)
+    keys = {offer_id: card_key(offer_id, versions[offer_id], variante) for offer_id in offer_ids}
+    found = cache.get_many(keys.values())
+
+    html = {offer_id: found[key] for offer_id, key in keys.items() if key in found}
+    missing = [offer_id for offer_id in offer_ids if offer_id not in html]
+    metrics.inc('jobs_cache_requests_total', len(html), cache='tarjetas', result='hit')
+    metrics.inc('jobs_cache_requests_total', len(missing), cache='tarjetas', result='miss')
+    if missing:
+        nuevos = {}
+        # Recién cambiadas, de la principal: una réplica atrasada quedaría cacheada bajo la versión nueva
+        with lectura_para_cache(*(offer_version_key(offer_id) for offer_id in missing)):
+            offers = list(load_offers(missing))
+        for offer in offers:
+            rendered = render_to_string(CARD_TEMPLATE, {
+                'offer': offer, 'show_creator': variante == VARIANTE_HEADHUNTER,
+            })
+            html[offer.pk] = rendered
+            nuevos[keys[offer.pk]] = rendered
+        cache.set_many(nuevos, FRAGMENT_TIMEOUT)
+
+    return [(offer_id, mark_safe(html[offer_id])) for offer_id in offer_ids if offer_id in html]
+
+
+def get_detail(offer_id):
+    """
+    Devuelve (key, entrada) donde entrada es un dict {'title', 'html'} con el
+    cuerpo de la página de detalle, o None si no está en caché.
+    """
+    key = detail_key(offer_id, get_offer_versions([offer_id])[offer_id])
+    entry = cache.get(key)
+    metrics.inc('jobs_cache_requests_total', cache='detalle', result='miss' if entry is None else 'hit')
+    if entry is not None:
+        entry = {'title': entry['title'], 'html': mark_safe(entry['html'])}
+    return key, entry
+
+
+def set_detail(key, offer):
+    entry = {'title': offer.title, 'html': render_to_string(DETAIL_TEMPLATE, {'offer': offer})}
+    cache.set(key, entry, FRAGMENT_TIMEOUT)
+    return {'title': entry['title'], 'html': mark_safe(entry['html'])}
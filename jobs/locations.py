@@ -0,0 +1,206 @@
+# jobs/locations.py
+"""
+Ubicación normalizada de las ofertas a partir del texto libre de `location`
+("Barcelona, Remoto, Madrid", "Oficina en Bilbao"...), contra un nomenclátor
+offline incluido en el repositorio (jobs/data/gazetteer.csv): sin servicios
+externos de geocodificación.
+
+normalizar() devuelve la ciudad canónica, la región, las coordenadas y el
+geohash de la primera ciudad conocida del texto. JobOffer.save() lo aplica en
+cada guardado y `python manage.py backfill_locations` rellena las filas
+existentes o las escritas sin pasar por save().
+
+Las búsquedas por cercanía (?cerca=Barcelona&radio=50) se resuelven con el
+índice sobre location_geohash: el cuadrado que rodea al radio se cubre con unas
+pocas celdas de geohash y cada celda es un rango del índice; las coordenadas
+recortan después el cuadrado exacto.
+"""
+import csv
+import math
+import re
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db.models import Q
+
+GAZETTEER_FILE = Path(getattr(settings, 'JOBS_GAZETTEER_FILE', Path(__file__).parent / 'data' / 'gazetteer.csv'))
+
+# Precisión del geohash guardado (7 caracteres: celdas de ~150 m)
+PRECISION = 7
+# Celdas como mucho para cubrir el cuadrado de una búsqueda (un rango de índice por celda)
+MAX_CELDAS = 12
+
+RADIOS = (10, 25, 50, 100, 250)
+RADIO_POR_DEFECTO = 25
+RADIO_MAXIMO = 500
+
+KM_POR_GRADO = 111.32
+
+CAMPOS = ('location_city', 'location_region', 'location_lat', 'location_lon', 'location_geohash')
+VACIO = {'location_city': '', 'location_region': '', 'location_lat': None, 'location_lon': None, 'location_geohash': ''}
+
+_SEPARADORES = re.compile(r'[,;/|()\n]|\s-\s|\s+y\s+|\s+o\s+')
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Mayor que cualquier carácter de _BASE32: `prefijo <= geohash < prefijo + FIN` es "empieza por"
+_FIN = '{'
+
+
+class Lugar:
+    """Una ciudad del nomenclátor."""
+
+    def __init__(self, ciudad, region, pais, lat, lon):
+        self.ciudad = ciudad
+        self.region = region
+        self.pais = pais
+        self.lat = lat
+        self.lon = lon
+
+
+def _clave(texto):
+    """Forma de comparación: minúsculas, sin tildes ni signos, espacios simples."""
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(re.sub(r"[^\w'-]+", ' ', texto).split())
+
+
+@lru_cache(maxsize=None)
+def _nomenclator():
+    """{clave de nombre o alias: Lugar}. Se lee una vez por proceso."""
+    lugares = {}
+    with open(GAZETTEER_FILE, encoding='utf-8', newline='') as fichero:
+        for fila in csv.DictReader(fichero):
+            lugar = Lugar(fila['ciudad'], fila['region'], fila['pais'], float(fila['lat']), float(fila['lon']))
+            for nombre in [fila['ciudad'], *filter(None, fila['alias'].split('|'))]:
+                lugares.setdefault(_clave(nombre), lugar)
+    return lugares
+
+
+def buscar(texto):
+    """
+    Primera ciudad conocida del texto, o None. Se prueba el texto entero y luego
+    cada trozo ("Madrid", "Remoto", "Oficina en Bilbao centro"), entero y, si no,
+    por sus grupos de palabras de más largo a más corto.
+    """
+    lugares = _nomenclator()
+    if _clave(texto or '') in lugares:
+        return lugares[_clave(texto)]
+    for trozo in _SEPARADORES.split(texto or ''):
+        palabras = _clave(trozo).split()
+        for largo in range(len(palabras), 0, -1):
+            for inicio in range(len(palabras) - largo + 1):
+                lugar = lugares.get(' '.join(palabras[inicio:inicio + largo]))
+                if lugar:
+                    return lugar
+    return None
+
+
+def normalizar(texto):
+    """{location_city, location_region, location_lat, location_lon, location_geohash} o VACIO."""
+    lugar = buscar(texto)
+    if lugar is None:
+        return dict(VACIO)
+    return {
+        'location_city': lugar.ciudad,
+        'location_region': lugar.region,
+        'location_lat': lugar.lat,
+        'location_lon': lugar.lon,
+        'location_geohash': geohash(lugar.lat, lugar.lon),
+    }
+
+
+# --- Geohash ---
+
+def geohash(lat, lon, precision=PRECISION):
+    """Geohash estándar (base32, bits alternos de longitud y latitud)."""
+    intervalos = [[-180.0, 180.0], [-90.0, 90.0]]  # longitud, latitud
+    valores = (lon, lat)
+    resultado, bits, n, eje = [], 0, 0, 0
+    while len(resultado) < precision:
+        intervalo = intervalos[eje]
+        medio = (intervalo[0] + intervalo[1]) / 2
+        bits <<= 1
+        if valores[eje] >= medio:
+            bits |= 1
+            intervalo[0] = medio
+        else:
+            intervalo[1] = medio
+        eje, n = 1 - eje, n + 1
+        if n == 5:
+            resultado.append(_BASE32[bits])
+            bits, n = 0, 0
+    return ''.join(resultado)
+
+
+def _tamano_celda(precision):
+    """(alto, ancho) en grados de una celda de esa precisión."""
+    bits = 5 * precision
+    return 180 / 2 ** (bits // 2), 360 / 2 ** ((bits + 1) // 2)
+
+
+def _pasos(inicio, fin, paso):
+    valor = inicio
+    while valor < fin:
+        yield valor
+        valor += paso
+    yield fin
+
+
+def celdas(sur, oeste, norte, este):
+    """Prefijos de geohash que cubren el cuadrado, con la mayor precisión que no pase de MAX_CELDAS."""
+    for precision in range(PRECISION, 0, -1):
+        alto, ancho = _tamano_celda(precision)
+        if (math.ceil((norte - sur) / alto) + 1) * (math.ceil((este - oeste) / ancho) + 1) <= MAX_CELDAS:
+            break
+    return sorted({
+        geohash(lat, lon, precision)
+        for lat in _pasos(sur, norte, alto)
+        for lon in _pasos(oeste, este, ancho)
+    })
+
+
+def cuadrado(lat, lon, radio_km):
+    """(sur, oeste, norte, este) del cuadrado que rodea al círculo de radio_km."""
+    dlat = radio_km / KM_POR_GRADO
+    dlon = radio_km / (KM_POR_GRADO * max(math.cos(math.radians(lat)), 0.01))
+    return max(lat - dlat, -90.0), max(lon - dlon, -180.0), min(lat + dlat, 90.0), min(lon + dlon, 180.0)
+
+
+# --- Filtros del listado ---
+
+def leer_filtros(params):
+    """
+    ?cerca=<ciudad> y ?radio=<km>. Una ciudad que no está en el nomenclátor se
+    ignora; el radio se acota a [1, RADIO_MAXIMO].
+    """
+    lugar = buscar(params.get('cerca', '')[:100])
+    if lugar is None:
+        return {}
+    try:
+        radio = int(params.get('radio', RADIO_POR_DEFECTO))
+    except (TypeError, ValueError):
+        radio = RADIO_POR_DEFECTO
+    return {'cerca': lugar.ciudad, 'radio': max(1, min(radio, RADIO_MAXIMO))}
+
+
+def filtrar(queryset, filtros):
+    """Ofertas dentro del cuadrado de `radio` km alrededor de la ciudad."""
+    if not filtros:
+        return queryset
+    lugar = _nomenclator()[_clave(filtros['cerca'])]
+    sur, oeste, norte, este = cuadrado(lugar.lat, lugar.lon, filtros['radio'])
+    rangos = Q()
+    for prefijo in celdas(sur, oeste, norte, este):
+        rangos |= Q(location_geohash__gte=prefijo, location_geohash__lt=prefijo + _FIN)
+    return queryset.filter(
+        rangos,
+        location_lat__range=(sur, norte),
+        location_lon__range=(oeste, este),
+    )
+
+
+def firma(filtros):
+    """Representación estable de los filtros, para claves de caché."""
+    return urlencode(sorted(filtros.items()))
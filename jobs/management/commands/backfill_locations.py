@@ -0,0 +1,16 @@
+from jobs.locations import normalizar
+from jobs.models import JobOffer
+
+from .backfill_salaries import Command as BackfillCommand
+
+
+class Command(BackfillCommand):
+    help = (
+        "Normaliza la ubicación (ciudad, región, coordenadas y geohash) a partir del texto de "
+        "`location` contra el nomenclátor offline, en las ofertas existentes o escritas sin pasar "
+        "por save(). Por lotes de id, con una transacción corta por lote."
+    )
+    origen = 'location'
+    campos = JobOffer.CAMPOS_UBICACION
+    calcular = staticmethod(normalizar)
+    descripcion_vacio = "sin ninguna ciudad del nomenclátor (p. ej. 'Remoto')"
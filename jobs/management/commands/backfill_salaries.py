@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+
+from jobs import fragments
+from jobs.db import con_reintentos
+from jobs.models import JobOffer
+from jobs.salaries import parsear
+
+
+class Command(BaseCommand):
+    help = (
+        "Extrae el salario estructurado (mínimo y máximo anuales, moneda y periodo) del texto de "
+        "`salary` en las ofertas existentes o escritas sin pasar por save(). Recorre las ofertas por "
+        "lotes de id, con una transacción corta por lote, y solo escribe las que cambian."
+    )
+    # Campo de texto libre, campos derivados y función que los calcula (ver backfill_locations)
+    origen = 'salary'
+    campos = JobOffer.CAMPOS_SALARIO
+    calcular = staticmethod(parsear)
+    descripcion_vacio = "con un salario que no se ha podido interpretar"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Ofertas por lote de lectura y bulk_update.")
+        parser.add_argument('--dry-run', action='store_true', help="Solo cuenta las ofertas que cambiarían.")
+
+    def handle(self, *args, **options):
+        revisadas = cambiadas = sin_valor = 0
+        ultimo_id = 0
+        while True:
+            lote = list(
+                JobOffer.objects.filter(pk__gt=ultimo_id).order_by('pk')
+                .only('id', self.origen, *self.campos)[:options['batch_size']]
+            )
+            if not lote:
+                break
+            ultimo_id = lote[-1].pk
+            pendientes = []
+            for offer in lote:
+                texto = getattr(offer, self.origen)
+                campos = self.calcular(texto)
+                if not any(campos.values()) and texto.strip():
+                    sin_valor += 1
+                if any(getattr(offer, campo) != valor for campo, valor in campos.items()):
+                    for campo, valor in campos.items():
+                        setattr(offer, campo, valor)
+                    pendientes.append(offer)
+            if pendientes and not options['dry_run']:
+                con_reintentos(JobOffer.objects.bulk_update)(pendientes, self.campos)
+            revisadas += len(lote)
+            cambiadas += len(pendientes)
+
+        if cambiadas and not options['dry_run']:
+            # bulk_update no lanza señales: las páginas filtradas en caché quedan viejas
+            fragments.bump_list_version()
+        accion = "cambiarían" if options['dry_run'] else "actualizadas"
+        self.stdout.write(self.style.SUCCESS(
+            f"{revisadas} ofertas revisadas, {cambiadas} {accion}, {sin_valor} {self.descripcion_vacio}."
+        ))
@@ -0,0 +1,271 @@
+import json
+import os
+import platform
+import statistics
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs import urls as jobs_urls
+from jobs.access import HEADHUNTER_GROUP
+from jobs.models import AgendaAccion, Candidatura, JobOffer
+
+# Ruta -> (método, actor, escribe). El actor decide con qué usuario se hace la petición.
+# Las rutas que escriben solo se miden con --writes y siempre dentro de una
+# transacción que se revierte.
+RUTAS = {
+    'job_offer_list': ('GET', 'anonimo', False),
+    'api_ofertas_publicas': ('GET', 'anonimo', False),
+    'job_offer_detail': ('GET', 'anonimo', False),
+    'apply_to_offer': ('GET', 'candidato', False),
+    'create_offer': ('GET', 'headhunter', False),
+    'edit_offer': ('GET', 'headhunter', False),
+    'candidate_dashboard': ('GET', 'candidato', False),
+    'headhunter_dashboard': ('GET', 'headhunter', False),
+    'offer_applications': ('GET', 'headhunter', False),
+    'cambiar_estado_candidatura': ('GET', 'headhunter', False),
+    'api_cambiar_estados_candidaturas': ('POST', 'headhunter', True),
+    'agenda': ('GET', 'headhunter', False),
+    'api_acciones_headhunter': ('GET', 'headhunter', False),
+    'api_acciones_cambios': ('GET', 'headhunter', False),
+    'crear_accion_ajax': ('POST', 'headhunter', True),
+    'editar_accion_ajax': ('GET', 'headhunter', False),
+    'eliminar_accion_ajax': ('POST', 'headhunter', True),
+}
+
+
+def percentil(valores, p):
+    """Percentil por interpolación lineal sobre valores ya ordenados."""
+    if len(valores) == 1:
+        return valores[0]
+    posicion = (len(valores) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(valores) - 1)
+    return valores[inferior] + (valores[superior] - valores[inferior]) * (posicion - inferior)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cada ruta de jobs/urls.py con el cliente de pruebas: latencia (p50/p90/p95/p99) y "
+        "número de consultas SQL. Escribe el resultado en JSON para poder comparar ejecuciones "
+        "(--compare). Pensado para usarse sobre los datos de generate_synthetic_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help="Peticiones medidas por ruta.")
+        parser.add_argument('--warmup', type=int, default=2, help="Peticiones previas no medidas (calientan cachés).")
+        parser.add_argument('--cold', action='store_true', help="Vaciar la caché antes de cada petición.")
+        parser.add_argument('--writes', action='store_true', help="Medir también las rutas que escriben (se revierten).")
+        parser.add_argument('--route', action='append', help="Medir solo esta ruta (repetible).")
+        parser.add_argument('--output', help="Fichero JSON de resultados (por defecto, solo la tabla).")
+        parser.add_argument('--compare', help="JSON de una ejecución anterior: muestra la variación de p50 y consultas.")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations debe ser mayor que 0.")
+        if options['compare'] and not os.path.isfile(options['compare']):
+            raise CommandError(f"No existe el fichero a comparar: {options['compare']}")
+        self.actores = self.preparar_actores()
+        self.clientes = {}
+
+        rutas = [patron.name for patron in jobs_urls.urlpatterns if patron.name]
+        if options['route']:
+            desconocidas = set(options['route']) - set(rutas)
+            if desconocidas:
+                raise CommandError(f"Rutas desconocidas: {', '.join(sorted(desconocidas))}")
+            rutas = [ruta for ruta in rutas if ruta in options['route']]
+
+        resultados = {}
+        omitidas = {}
+        # El cliente de pruebas usa el host 'testserver'
+        with override_settings(ALLOWED_HOSTS=['*'], DEBUG=False):
+            for nombre in rutas:
+                if nombre not in RUTAS:
+                    omitidas[nombre] = "sin definición en benchmark_views.RUTAS"
+                    continue
+                metodo, actor, escribe = RUTAS[nombre]
+                if escribe and not options['writes']:
+                    omitidas[nombre] = "escribe (usar --writes)"
+                    continue
+                resultados[nombre] = self.medir(nombre, metodo, actor, escribe, options)
+                self.stdout.write(self.linea(nombre, resultados[nombre]))
+
+        for nombre, motivo in omitidas.items():
+            self.stdout.write(self.style.WARNING(f"{nombre}: omitida ({motivo})"))
+
+        informe = {
+            'fecha': timezone.now().isoformat(),
+            'entorno': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'db': connections['default'].vendor,
+                'cache': cache.__class__.__name__,
+            },
+            'volumen': {
+                'ofertas': JobOffer.objects.count(),
+                'candidaturas': Candidatura.objects.count(),
+                'acciones': AgendaAccion.objects.count(),
+                'usuarios': User.objects.count(),
+            },
+            'opciones': {clave: options[clave] for clave in ('iterations', 'warmup', 'cold', 'writes')},
+            'rutas': resultados,
+            'omitidas': omitidas,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fichero:
+                json.dump(informe, fichero, indent=2, sort_keys=True, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['output']}"))
+        if options['compare']:
+            self.comparar(options['compare'], resultados)
+
+    # --- Datos de las peticiones ---
+
+    def preparar_actores(self):
+        """Elige el headhunter con más candidaturas, su oferta más popular y un candidato activo."""
+        oferta = (
+            JobOffer.objects.filter(created_by__groups__name=HEADHUNTER_GROUP)
+            .order_by('-num_candidaturas', '-id').first()
+        )
+        if oferta is None:
+            raise CommandError("No hay ofertas de headhunters. Genera datos con `generate_synthetic_data`.")
+        headhunter = oferta.created_by
+        candidatura = oferta.applications.order_by('-id').first()
+        candidato = (
+            User.objects.exclude(groups__name=HEADHUNTER_GROUP)
+            .annotate(n=Count('my_applications')).filter(n__gt=0).order_by('-n').first()
+        )
+        if candidato is None or candidatura is None:
+            raise CommandError("No hay candidaturas. Genera datos con `generate_synthetic_data`.")
+        sin_postular = (
+            JobOffer.objects.filter(is_active=True).exclude(applications__user=candidato).order_by('-id').first()
+        )
+        accion = AgendaAccion.objects.filter(user=headhunter).order_by('-id').first()
+        return {
+            'headhunter': headhunter,
+            'candidato': candidato,
+            'oferta': oferta,
+            'oferta_sin_postular': sin_postular or oferta,
+            'candidatura': candidatura,
+            'accion': accion,
+        }
+
+    def cliente(self, actor):
+        if actor not in self.clientes:
+            cliente = Client()
+            if actor != 'anonimo':
+                cliente.force_login(self.actores[actor])
+            self.clientes[actor] = cliente
+        return self.clientes[actor]
+
+    def peticion(self, nombre):
+        """(url, datos, content_type) de la ruta."""
+        a = self.actores
+        ahora = timezone.now()
+        if nombre in ('job_offer_detail', 'edit_offer', 'offer_applications'):
+            return reverse(nombre, kwargs={'offer_id': a['oferta'].pk}), None, None
+        if nombre == 'apply_to_offer':
+            return reverse(nombre, kwargs={'offer_id': a['oferta_sin_postular'].pk}), None, None
+        if nombre == 'cambiar_estado_candidatura':
+            return reverse(nombre, kwargs={'candidature_id': a['candidatura'].pk}), None, None
+        if nombre in ('editar_accion_ajax', 'eliminar_accion_ajax'):
+            if a['accion'] is None:
+                raise CommandError("El headhunter elegido no tiene acciones de agenda.")
+            return reverse(nombre, kwargs={'accion_id': a['accion'].pk}), None, None
+        if nombre == 'api_acciones_headhunter':
+            return reverse(nombre), {
+                'start': (ahora - timedelta(days=7)).isoformat(),
+                'end': (ahora + timedelta(days=35)).isoformat(),
+            }, None
+        if nombre == 'api_acciones_cambios':
+            return reverse(nombre), {'token': 0}, None
+        if nombre == 'api_cambiar_estados_candidaturas':
+            ids = list(a['oferta'].applications.values_list('id', flat=True)[:100])
+            return reverse(nombre), json.dumps({'estado': 'rechazado', 'ids': ids}), 'application/json'
+        if nombre == 'crear_accion_ajax':
+            return reverse(nombre), {
+                'titulo': 'Benchmark', 'tipo': 'otro', 'duracion_minutos': 30,
+                'fecha_hora_inicio': (ahora + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M'), 'oferta': a['oferta'].pk,
+            }, None
+        return reverse(nombre), None, None
+
+    # --- Medición ---
+
+    def medir(self, nombre, metodo, actor, escribe, options):
+        cliente = self.cliente(actor)
+        url, datos, content_type = self.peticion(nombre)
+        tiempos, consultas, codigos = [], [], {}
+
+        for n in range(options['warmup'] + options['iterations']):
+            if options['cold']:
+                cache.clear()
+            with ExitStack() as stack:
+                if escribe:
+                    stack.enter_context(transaction.atomic())
+                capturas = [stack.enter_context(CaptureQueriesContext(conn)) for conn in connections.all()]
+                inicio = time.perf_counter()
+                if metodo == 'GET':
+                    response = cliente.get(url, datos)
+                elif content_type:
+                    response = cliente.post(url, datos, content_type=content_type)
+                else:
+                    response = cliente.post(url, datos)
+                duracion = time.perf_counter() - inicio
+                if escribe:
+                    transaction.set_rollback(True)
+            if n < options['warmup']:
+                continue
+            tiempos.append(duracion * 1000)
+            consultas.append(sum(len(captura) for captura in capturas))
+            codigos[str(response.status_code)] = codigos.get(str(response.status_code), 0) + 1
+
+        tiempos.sort()
+        return {
+            'metodo': metodo,
+            'actor': actor,
+            'url': url,
+            'status': codigos,
+            'ms': {
+                'min': round(tiempos[0], 2),
+                'p50': round(percentil(tiempos, 50), 2),
+                'p90': round(percentil(tiempos, 90), 2),
+                'p95': round(percentil(tiempos, 95), 2),
+                'p99': round(percentil(tiempos, 99), 2),
+                'max': round(tiempos[-1], 2),
+                'media': round(statistics.fmean(tiempos), 2),
+            },
+            'consultas': {'min': min(consultas), 'max': max(consultas), 'media': round(statistics.fmean(consultas), 2)},
+        }
+
+    def linea(self, nombre, r):
+        ms = r['ms']
+        return (
+            f"{nombre:34} {r['metodo']:4} p50 {ms['p50']:8.2f} ms  p95 {ms['p95']:8.2f} ms  "
+            f"p99 {ms['p99']:8.2f} ms  consultas {r['consultas']['media']:6.1f}  status {r['status']}"
+        )
+
+    def comparar(self, ruta_fichero, actuales):
+        with open(ruta_fichero, encoding='utf-8') as fichero:
+            anteriores = json.load(fichero).get('rutas', {})
+        self.stdout.write(f"\nComparación con {ruta_fichero} (actual - anterior):")
+        for nombre, actual in actuales.items():
+            anterior = anteriores.get(nombre)
+            if anterior is None:
+                self.stdout.write(f"{nombre:34} (nueva)")
+                continue
+            delta_ms = actual['ms']['p50'] - anterior['ms']['p50']
+            relativo = delta_ms / anterior['ms']['p50'] * 100 if anterior['ms']['p50'] else 0
+            delta_q = actual['consultas']['media'] - anterior['consultas']['media']
+            self.stdout.write(
+                f"{nombre:34} p50 {delta_ms:+8.2f} ms ({relativo:+6.1f}%)  consultas {delta_q:+6.1f}"
+            )
@@ -0,0 +1,270 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from jobs import fragments, recommendations, search
+from jobs.access import HEADHUNTER_GROUP
+from jobs.counters import recalcular_contadores
+from jobs.models import AgendaAccion, Candidatura, CandidatureStatus, JobOffer, StatusMessageTemplate
+
+PREFIJO = 'synth-'
+PASSWORD = 'ducky-synth'
+
+TITULOS = [
+    'Desarrollador Python', 'Ingeniero de Datos', 'Frontend React', 'DevOps', 'QA Automation',
+    'Product Manager', 'Diseñador UX', 'Backend Java', 'Administrador de Sistemas', 'Data Scientist',
+    'Técnico de Soporte', 'Analista Funcional', 'Scrum Master', 'Ingeniero Cloud', 'Desarrollador Móvil',
+]
+NIVELES = ['Junior', 'Semi Senior', 'Senior', 'Lead', '']
+EMPRESAS = [
+    'Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark Industries', 'Wayne Tech', 'Soylent',
+    'Cyberdyne', 'Tyrell', 'Wonka', 'Vandelay', 'Pied Piper', 'Aperture', 'Massive Dynamic',
+]
+UBICACIONES = [
+    'Madrid', 'Barcelona', 'Valencia', 'Sevilla', 'Bilbao', 'Málaga', 'Zaragoza', 'Buenos Aires',
+    'Ciudad de México', 'Bogotá', 'Santiago', 'Lima', 'Montevideo', 'Remoto', '',
+]
+# {a} y {b}: miles de euros (o dólares) al año, con a < b
+SALARIOS = ['', '', '{a}.000 - {b}.000 €', '{a}k-{b}k EUR', 'USD {m}/mes', 'A convenir', '{b}.000 €']
+TECNOLOGIAS = [
+    'Python', 'Django', 'PostgreSQL', 'Docker', 'Kubernetes', 'AWS', 'React', 'TypeScript', 'Java',
+    'Spring', 'Terraform', 'Kafka', 'Redis', 'Go', 'Linux', 'CI/CD', 'GraphQL', 'Pandas', 'Spark',
+]
+PLANTILLAS = {
+    CandidatureStatus.ACCEPTED: "Hola {{ candidato }}, ¡enhorabuena! Avanzas en el proceso de {{ oferta }} en {{ empresa }}.",
+    CandidatureStatus.REJECTED: "Hola {{ candidato }}, gracias por tu interés en {{ oferta }}. Esta vez no seguiremos adelante.",
+    CandidatureStatus.PENDING: "Hola {{ candidato }}, hemos recibido tu candidatura a {{ oferta }}. — {{ headhunter }}",
+}
+
+
+def pesos_zipf(n, s):
+    """Pesos acumulados 1/rank^s: unos pocos elementos concentran la mayoría."""
+    return list(accumulate(1 / (rank ** s) for rank in range(1, n + 1)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos sintéticos a escala de producción con bulk_create por lotes: candidatos, "
+        "headhunters (grupo 'headhunter'), ofertas, candidaturas, acciones de agenda y plantillas "
+        "de mensaje. La distribución es sesgada (pocos headhunters con la mayoría de ofertas, pocas "
+        "ofertas con la mayoría de candidaturas). Los usuarios se llaman '" + PREFIJO + "*' y su "
+        "contraseña es '" + PASSWORD + "'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--candidates', type=int, default=5000, help="Usuarios candidatos.")
+        parser.add_argument('--headhunters', type=int, default=50, help="Usuarios headhunter.")
+        parser.add_argument('--offers', type=int, default=2000, help="Ofertas de empleo.")
+        parser.add_argument('--applications', type=int, default=50000, help="Candidaturas (se omiten duplicados usuario/oferta).")
+        parser.add_argument('--actions', type=int, default=10000, help="Acciones de agenda.")
+        parser.add_argument('--skew', type=float, default=1.1, help="Exponente de Zipf del sesgo (0 = uniforme).")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Filas por bulk_create.")
+        parser.add_argument('--seed', type=int, default=42, help="Semilla para reproducir el mismo conjunto.")
+        parser.add_argument('--delete', action='store_true', help="Borrar los datos sintéticos existentes y terminar.")
+
+    def handle(self, *args, **options):
+        existentes = User.objects.filter(username__startswith=PREFIJO)
+        if options['delete']:
+            with transaction.atomic():
+                borrados, _ = existentes.delete()
+            fragments.bump_list_version()
+            self.stdout.write(self.style.SUCCESS(f"{borrados} filas sintéticas borradas."))
+            return
+        if existentes.exists():
+            raise CommandError(f"Ya hay usuarios '{PREFIJO}*'. Bórralos antes con --delete.")
+        if options['headhunters'] < 1 or options['candidates'] < 1:
+            raise CommandError("--headhunters y --candidates deben ser mayores que 0.")
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.skew = options['skew']
+        self.now = timezone.now()
+
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            headhunters, candidatos = self.crear_usuarios(options['headhunters'], options['candidates'])
+            ofertas = self.crear_ofertas(headhunters, options['offers'])
+            candidaturas = self.crear_candidaturas(ofertas, candidatos, options['applications'])
+            self.crear_acciones(headhunters, ofertas, candidaturas, options['actions'])
+            self.crear_plantillas(headhunters)
+
+            # bulk_create no emite señales: contadores e índice de búsqueda se rehacen aquí
+            self.paso("Recalculando contadores de candidaturas...")
+            recalcular_contadores(batch_size=self.batch_size)
+        if search.is_supported():
+            self.paso("Reconstruyendo el índice de búsqueda...")
+            search.rebuild_index()
+        self.paso("Calculando los términos de las recomendaciones...")
+        recommendations.reconstruir(batch_size=self.batch_size)
+        fragments.bump_list_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Datos sintéticos generados en {time.perf_counter() - inicio:.1f}s: "
+            f"{len(headhunters)} headhunters, {len(candidatos)} candidatos, {len(ofertas)} ofertas, "
+            f"{len(candidaturas)} candidaturas, {options['actions']} acciones."
+        ))
+
+    def paso(self, mensaje):
+        self.stdout.write(mensaje)
+
+    def elegir(self, elementos, acumulados):
+        return self.rng.choices(elementos, cum_weights=acumulados)[0]
+
+    def salario(self):
+        minimo = self.rng.randint(18, 70)
+        maximo = minimo + self.rng.choice((5, 10, 15, 20))
+        return self.rng.choice(SALARIOS).format(a=minimo, b=maximo, m=minimo * 100)
+
+    def fecha_pasada(self, dias):
+        return self.now - timedelta(seconds=self.rng.randint(0, dias * 24 * 3600))
+
+    def actualizar_fechas(self, modelo, campos, filas):
+        """
+        Fija fechas auto_now/auto_now_add con un UPDATE preparado (executemany).
+        bulk_update construye una expresión CASE por fila y aquí es decenas de veces más lento.
+        """
+        quote = connection.ops.quote_name
+        asignaciones = ', '.join(f'{quote(modelo._meta.get_field(campo).column)} = %s' for campo in campos)
+        sql = f'UPDATE {quote(modelo._meta.db_table)} SET {asignaciones} WHERE {quote(modelo._meta.pk.column)} = %s'
+        adaptar = connection.ops.adapt_datetimefield_value
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [[adaptar(valor) for valor in valores] + [pk] for pk, *valores in filas])
+
+    def crear_usuarios(self, num_headhunters, num_candidatos):
+        self.paso(f"Creando {num_headhunters} headhunters y {num_candidatos} candidatos...")
+        password = make_password(PASSWORD)  # un solo hash: hashear por usuario es muy lento
+        usuarios = [
+            User(username=f'{PREFIJO}hh-{n:05d}', email=f'hh{n}@synth.example', password=password,
+                 first_name=f'Headhunter {n}', last_name=self.rng.choice(EMPRESAS))
+            for n in range(num_headhunters)
+        ] + [
+            User(username=f'{PREFIJO}cand-{n:07d}', email=f'cand{n}@synth.example', password=password,
+                 first_name=f'Candidato {n}')
+            for n in range(num_candidatos)
+        ]
+        User.objects.bulk_create(usuarios, batch_size=self.batch_size)
+        headhunters = list(User.objects.filter(username__startswith=f'{PREFIJO}hh-').order_by('username'))
+        candidatos = list(
+            User.objects.filter(username__startswith=f'{PREFIJO}cand-').order_by('username').values_list('id', flat=True)
+        )
+
+        grupo, _ = Group.objects.get_or_create(name=HEADHUNTER_GROUP)
+        Membership = User.groups.through
+        Membership.objects.bulk_create(
+            [Membership(user_id=hh.pk, group_id=grupo.pk) for hh in headhunters], batch_size=self.batch_size
+        )
+        return headhunters, candidatos
+
+    def crear_ofertas(self, headhunters, cantidad):
+        self.paso(f"Creando {cantidad} ofertas...")
+        acumulados = pesos_zipf(len(headhunters), self.skew)
+        ofertas = []
+        for _ in range(cantidad):
+            titulo = f"{self.rng.choice(TITULOS)} {self.rng.choice(NIVELES)}".strip()
+            tecnologias = self.rng.sample(TECNOLOGIAS, 4)
+            ofertas.append(JobOffer(
+                created_by=self.elegir(headhunters, acumulados),
+                company_name=self.rng.choice(EMPRESAS),
+                title=titulo,
+                description=f"Buscamos {titulo} con experiencia en {', '.join(tecnologias)}.",
+                requirements="\n".join(f"- {t}" for t in tecnologias),
+                location=self.rng.choice(UBICACIONES),
+                modality=self.rng.choice(JobOffer.ModalityChoices.values),
+                salary=self.salario(),
+                category=tecnologias[0],
+                is_active=self.rng.random() < 0.85,
+            ))
+            # bulk_create no pasa por save(): los campos derivados se calculan aquí
+            ofertas[-1].actualizar_salario()
+            ofertas[-1].actualizar_ubicacion()
+        ofertas = JobOffer.objects.bulk_create(ofertas, batch_size=self.batch_size)
+
+        # created_at es auto_now_add: las fechas repartidas se aplican después
+        for oferta in ofertas:
+            oferta.created_at = self.fecha_pasada(365)
+        self.actualizar_fechas(JobOffer, ['created_at'], [(oferta.pk, oferta.created_at) for oferta in ofertas])
+        return ofertas
+
+    def crear_candidaturas(self, ofertas, candidatos, cantidad):
+        self.paso(f"Creando hasta {cantidad} candidaturas...")
+        # Las ofertas más populares (según un orden al azar) reciben la mayoría
+        populares = self.rng.sample(ofertas, len(ofertas))
+        acumulados = pesos_zipf(len(populares), self.skew)
+        estados = CandidatureStatus.values
+        vistos = set()
+        candidaturas = []
+        intentos = 0
+        while len(candidaturas) < cantidad and intentos < cantidad * 3:
+            intentos += 1
+            oferta = self.elegir(populares, acumulados)
+            user_id = self.rng.choice(candidatos)
+            if (oferta.pk, user_id) in vistos:
+                continue
+            vistos.add((oferta.pk, user_id))
+            candidaturas.append(Candidatura(
+                offer_id=oferta.pk, user_id=user_id, headhunter_id=oferta.created_by_id,
+                estado=self.rng.choices(estados, weights=[6, 1, 3])[0],
+                mensaje_personalizado=self.rng.choice(['', 'Me interesa mucho el puesto.', None]),
+            ))
+        candidaturas = Candidatura.objects.bulk_create(candidaturas, batch_size=self.batch_size)
+
+        fechas = {oferta.pk: oferta.created_at for oferta in ofertas}
+        for candidatura in candidaturas:
+            desde = fechas[candidatura.offer_id]
+            segundos = max(int((self.now - desde).total_seconds()), 1)
+            candidatura.fecha_aplicacion = desde + timedelta(seconds=self.rng.randint(0, segundos))
+            candidatura.updated_at = candidatura.fecha_aplicacion
+        self.actualizar_fechas(
+            Candidatura, ['fecha_aplicacion', 'updated_at'],
+            [(c.pk, c.fecha_aplicacion, c.updated_at) for c in candidaturas],
+        )
+        return candidaturas
+
+    def crear_acciones(self, headhunters, ofertas, candidaturas, cantidad):
+        self.paso(f"Creando {cantidad} acciones de agenda...")
+        ofertas_por_hh = {}
+        for oferta in ofertas:
+            ofertas_por_hh.setdefault(oferta.created_by_id, []).append(oferta.pk)
+        candidaturas_por_oferta = {}
+        for candidatura in candidaturas:
+            candidaturas_por_oferta.setdefault(candidatura.offer_id, []).append(candidatura.pk)
+
+        con_ofertas = [hh for hh in headhunters if hh.pk in ofertas_por_hh]
+        if not con_ofertas:
+            return
+        acumulados = pesos_zipf(len(con_ofertas), self.skew)
+        tipos = AgendaAccion.AccionTipoChoices.values
+        acciones = []
+        for n in range(cantidad):
+            hh = self.elegir(con_ofertas, acumulados)
+            oferta_id = self.rng.choice(ofertas_por_hh[hh.pk])
+            candidatura_id = None
+            if candidaturas_por_oferta.get(oferta_id) and self.rng.random() < 0.7:
+                candidatura_id = self.rng.choice(candidaturas_por_oferta[oferta_id])
+            inicio = self.now + timedelta(minutes=15 * self.rng.randint(-60 * 96, 60 * 96))
+            acciones.append(AgendaAccion(
+                user_id=hh.pk, oferta_id=oferta_id, candidatura_id=candidatura_id,
+                titulo=f"{self.rng.choice(tipos).capitalize()} #{n}",
+                fecha_hora_inicio=inicio,
+                duracion_minutos=self.rng.choice([15, 30, 30, 45, 60, 90]),
+                tipo=self.rng.choice(tipos),
+                finished=inicio < self.now and self.rng.random() < 0.8,
+            ))
+        AgendaAccion.objects.bulk_create(acciones, batch_size=self.batch_size)
+
+    def crear_plantillas(self, headhunters):
+        self.paso("Creando plantillas de mensaje...")
+        plantillas = [
+            StatusMessageTemplate(user_id=hh.pk, estado=estado, mensaje=texto)
+            for hh in headhunters
+            for estado, texto in PLANTILLAS.items()
+            if self.rng.random() < 0.6
+        ]
+        StatusMessageTemplate.objects.bulk_create(plantillas, batch_size=self.batch_size)
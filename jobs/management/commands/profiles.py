@@ -0,0 +1,62 @@
+import os
+import pstats
+from io import StringIO
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs import profiling
+
+ORDENES = ('cumulative', 'tottime', 'ncalls')
+
+
+class Command(BaseCommand):
+    help = (
+        "Perfiles de peticiones guardados por RequestProfilerMiddleware (JOBS_PROFILE_DIR). "
+        "Sin opciones muestra las funciones más costosas de todos los perfiles juntos; "
+        "--list los enumera y --route/--user/--last filtran cuáles se combinan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--list', action='store_true', help="Listar los perfiles en lugar de combinarlos.")
+        parser.add_argument('--route', help="Solo los de esta ruta (nombre de la URL).")
+        parser.add_argument('--user', type=int, help="Solo los de este id de usuario.")
+        parser.add_argument('--last', type=int, help="Solo los N más recientes.")
+        parser.add_argument('--top', type=int, default=25, help="Funciones a mostrar.")
+        parser.add_argument('--sort', choices=ORDENES, default='cumulative', help="Orden de las funciones.")
+        parser.add_argument('--output', help="Guardar el perfil combinado en este fichero (para snakeviz, etc.).")
+        parser.add_argument('--clear', action='store_true', help="Borrar los perfiles seleccionados.")
+
+    def handle(self, *args, **options):
+        perfiles = profiling.listar(ruta=options['route'], usuario=options['user'])
+        if options['last']:
+            perfiles = perfiles[-options['last']:]
+        if not perfiles:
+            raise CommandError(f"No hay perfiles en {profiling.PROFILE_DIR} que cumplan los filtros.")
+
+        if options['clear']:
+            for perfil in perfiles:
+                os.remove(perfil.ruta_fichero)
+            self.stdout.write(self.style.SUCCESS(f"{len(perfiles)} perfiles borrados."))
+            return
+
+        if options['list']:
+            for perfil in perfiles:
+                self.stdout.write(
+                    f"{perfil.fecha:%Y-%m-%d %H:%M:%S}  {perfil.ruta:34} usuario {perfil.usuario or '-':>6}  "
+                    f"{perfil.ms:7d} ms  {perfil.ruta_fichero.name}"
+                )
+            return
+
+        # pstats escribe a trozos: se acumula aparte porque self.stdout añade un salto a cada write
+        salida = StringIO()
+        estadisticas = pstats.Stats(*(str(perfil.ruta_fichero) for perfil in perfiles), stream=salida)
+        rutas = sorted({perfil.ruta for perfil in perfiles})
+        media = sum(perfil.ms for perfil in perfiles) / len(perfiles)
+        self.stdout.write(
+            f"{len(perfiles)} perfiles ({', '.join(rutas)}), {media:.0f} ms de media por petición.\n"
+        )
+        estadisticas.strip_dirs().sort_stats(options['sort']).print_stats(options['top'])
+        self.stdout.write(salida.getvalue())
+        if options['output']:
+            estadisticas.dump_stats(options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Perfil combinado guardado en {options['output']}"))
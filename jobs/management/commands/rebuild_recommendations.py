@@ -0,0 +1,31 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula los términos TF-IDF de todas las ofertas para las recomendaciones del panel del "
+        "candidato (ofertas existentes, o escritas sin pasar por save()). La tokenización se reparte "
+        "entre varios procesos; cada proceso web recarga después su matriz en memoria."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Procesos que tokenizan los lotes (1: todo en este proceso). Por defecto, uno por CPU.",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help="Ofertas por lote de lectura y escritura.")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--workers y --batch-size deben ser mayores que 0.")
+        inicio = time.perf_counter()
+        total = recommendations.reconstruir(workers=options['workers'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Términos de recomendación recalculados: {total} ofertas en {time.perf_counter() - inicio:.1f}s "
+            f"con {options['workers']} procesos."
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from jobs import search
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice FTS5 de búsqueda de ofertas a partir de jobs_joboffer."
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write(self.style.WARNING("La base de datos no es SQLite; no hay índice FTS5 que reconstruir."))
+            return
+        with transaction.atomic():
+            total = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Índice de búsqueda reconstruido: {total} ofertas activas indexadas."))
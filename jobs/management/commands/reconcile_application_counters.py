@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from jobs.counters import recalcular_contadores
+
+
+class Command(BaseCommand):
+    help = "Recalcula los contadores de candidaturas de cada oferta y corrige los desajustes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Solo informa de las ofertas desajustadas, sin corregirlas.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Ofertas por lote de lectura y corrección.")
+
+    def handle(self, *args, **options):
+        # Cada lote va en su propia transacción (ver recalcular_contadores)
+        desajustadas = recalcular_contadores(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        if not desajustadas:
+            self.stdout.write(self.style.SUCCESS("Todos los contadores de candidaturas son correctos."))
+            return
+        accion = "desajustadas" if options['dry_run'] else "corregidas"
+        self.stdout.write(self.style.WARNING(f"{len(desajustadas)} ofertas {accion}: {', '.join(map(str, desajustadas[:50]))}"
+                                             + (" ..." if len(desajustadas) > 50 else "")))
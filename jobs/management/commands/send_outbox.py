@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Envía los correos pendientes de la bandeja de salida en lotes, reutilizando una "
+        "conexión por lote. Para probar en local: EMAIL_BACKEND con locmem/console, o SMTP "
+        "contra `python -m aiosmtpd -n -l localhost:1025` (EMAIL_HOST=localhost EMAIL_PORT=1025)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Correos por lote (y por conexión).")
+        parser.add_argument('--loop', action='store_true', help="No terminar: seguir vaciando la bandeja periódicamente.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Segundos de espera con la bandeja vacía (con --loop).")
+
+    def handle(self, *args, **options):
+        total_enviados = total_fallidos = 0
+        while True:
+            enviados, fallidos = outbox.enviar_lote(batch_size=options['batch_size'])
+            total_enviados += enviados
+            total_fallidos += fallidos
+            if enviados or fallidos:
+                self.stdout.write(f"Lote: {enviados} enviados, {fallidos} fallidos.")
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Bandeja procesada: {total_enviados} enviados, {total_fallidos} fallidos, "
+            f"{outbox.profundidad()} pendientes."
+        ))
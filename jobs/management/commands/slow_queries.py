@@ -0,0 +1,111 @@
+import json
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.slow_queries import escaneos
+
+ORDENES = {
+    'total': lambda g: g['total_ms'],
+    'veces': lambda g: g['veces'],
+    'max': lambda g: g['max_ms'],
+    'media': lambda g: g['total_ms'] / g['veces'],
+}
+
+
+def columnas_filtradas(sql, tabla):
+    """Columnas de `tabla` que aparecen en comparaciones o en ORDER BY: candidatas a índice."""
+    patron = re.compile(rf'"{re.escape(tabla)}"\."(\w+)"\s*(?:=|IN\b|>|<|LIKE\b|IS\b|ASC\b|DESC\b)')
+    return list(dict.fromkeys(patron.findall(sql)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Resume el registro de consultas lentas (JOBS_SLOW_QUERY_LOG): agrupa por huella, "
+        "ordena por tiempo total y señala en el EXPLAIN QUERY PLAN los recorridos completos de tabla "
+        "(con las columnas filtradas) y las ordenaciones sin índice, para decidir qué índices añadir."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=None, help="Fichero a leer (por defecto JOBS_SLOW_QUERY_LOG).")
+        parser.add_argument('--top', type=int, default=15, help="Número de huellas a mostrar.")
+        parser.add_argument('--sort', choices=sorted(ORDENES), default='total', help="Criterio de orden.")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON en lugar de tabla.")
+
+    def handle(self, *args, **options):
+        ruta_fichero = options['file'] or settings.JOBS_SLOW_QUERY_LOG
+        try:
+            with open(ruta_fichero, encoding='utf-8') as fichero:
+                grupos, invalidas = self.agrupar(fichero)
+        except FileNotFoundError:
+            raise CommandError(f"No existe {ruta_fichero}: aún no se ha registrado ninguna consulta lenta.")
+
+        ordenados = sorted(grupos.values(), key=ORDENES[options['sort']], reverse=True)[:options['top']]
+        if options['json']:
+            for grupo in ordenados:
+                grupo['rutas'] = dict(grupo['rutas'])
+            self.stdout.write(json.dumps(ordenados, indent=2, ensure_ascii=False))
+            return
+
+        if invalidas:
+            self.stdout.write(self.style.WARNING(f"{invalidas} líneas ilegibles ignoradas."))
+        self.stdout.write(
+            f"{sum(g['veces'] for g in grupos.values())} consultas lentas, {len(grupos)} huellas "
+            f"(top {len(ordenados)} por {options['sort']}):\n"
+        )
+        for n, grupo in enumerate(ordenados, start=1):
+            self.mostrar(n, grupo)
+
+        tablas = Counter()
+        for grupo in grupos.values():
+            for tabla in grupo['escaneos']:
+                tablas[tabla] += grupo['total_ms']
+        if tablas:
+            self.stdout.write(self.style.WARNING("Tablas recorridas enteras (ms acumulados):"))
+            for tabla, ms in tablas.most_common():
+                self.stdout.write(f"  {tabla:30} {ms:10.1f} ms")
+
+    def agrupar(self, lineas):
+        grupos, invalidas = {}, 0
+        for linea in lineas:
+            try:
+                registro = json.loads(linea)
+                clave, ms = registro['huella'], float(registro['ms'])
+            except (ValueError, KeyError, TypeError):
+                invalidas += 1
+                continue
+            grupo = grupos.setdefault(clave, {
+                'huella': clave, 'veces': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'rutas': Counter(), 'sql': registro.get('sql', ''), 'plan': None, 'escaneos': [],
+            })
+            grupo['veces'] += 1
+            grupo['total_ms'] += ms
+            grupo['max_ms'] = max(grupo['max_ms'], ms)
+            grupo['rutas'][registro.get('ruta') or '-'] += 1
+            if registro.get('plan'):
+                grupo['plan'] = registro['plan']
+                grupo['escaneos'] = escaneos(registro['plan'])
+        for grupo in grupos.values():
+            grupo['total_ms'] = round(grupo['total_ms'], 2)
+            grupo['indices'] = {tabla: columnas_filtradas(grupo['sql'], tabla) for tabla in grupo['escaneos']}
+        return grupos, invalidas
+
+    def mostrar(self, n, grupo):
+        media = grupo['total_ms'] / grupo['veces']
+        rutas = ', '.join(f"{ruta} ({veces})" for ruta, veces in grupo['rutas'].most_common(3))
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"#{n}  total {grupo['total_ms']:.1f} ms  veces {grupo['veces']}  "
+            f"media {media:.1f} ms  max {grupo['max_ms']:.1f} ms"
+        ))
+        self.stdout.write(f"  rutas: {rutas}")
+        self.stdout.write(f"  {grupo['huella'][:400]}")
+        for paso in grupo['plan'] or ['(sin plan)']:
+            self.stdout.write(f"    plan: {paso}")
+        for tabla, columnas in grupo['indices'].items():
+            sugerencia = f" (filtra por: {', '.join(columnas)})" if columnas else ""
+            self.stdout.write(self.style.ERROR(f"  ESCANEO COMPLETO de {tabla}{sugerencia}"))
+        if any(paso.startswith('USE TEMP B-TREE FOR ORDER BY') for paso in grupo['plan'] or ()):
+            self.stdout.write(self.style.WARNING("  ORDENA EN MEMORIA: ningún índice sirve para el ORDER BY"))
+        self.stdout.write("")
@@ -0,0 +1,127 @@
+import multiprocessing
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import Sum
+from django.utils import timezone
+
+from jobs.db import es_bloqueo, guardar
+from jobs.models import AgendaAccion, Candidatura, JobOffer
+
+PREFIJO = 'stress-'
+
+
+def _escritor(args):
+    """
+    Proceso escritor: alterna postulaciones (Candidatura) y acciones de agenda,
+    como harían apply_to_offer y la agenda desde varios workers de gunicorn.
+    Devuelve (escrituras_ok, errores_bloqueo, otros_errores, segundos_max).
+    """
+    worker, escrituras, headhunter_id, offer_ids, reintentar = args
+    # Conexión propia: la del proceso padre no se comparte entre procesos
+    connections.close_all()
+    candidatos = list(
+        User.objects.filter(username__startswith=f'{PREFIJO}{worker}-').order_by('id').values_list('id', flat=True)
+    )
+    ok = bloqueos = otros = 0
+    peor = 0.0
+    for i in range(escrituras):
+        if i % 2 == 0:
+            objeto = Candidatura(user_id=candidatos[i // 2], offer_id=offer_ids[i % len(offer_ids)])
+        else:
+            objeto = AgendaAccion(
+                user_id=headhunter_id, oferta_id=offer_ids[i % len(offer_ids)],
+                titulo=f'{PREFIJO}{worker}-{i}', fecha_hora_inicio=timezone.now() + timedelta(hours=i),
+            )
+        inicio = time.perf_counter()
+        try:
+            if reintentar:
+                guardar(objeto)
+            else:
+                objeto.save()
+        except OperationalError as exc:
+            if es_bloqueo(exc):
+                bloqueos += 1
+            else:
+                otros += 1
+        else:
+            ok += 1
+        peor = max(peor, time.perf_counter() - inicio)
+    connections.close_all()
+    return ok, bloqueos, otros, peor
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga de escrituras concurrentes: varios procesos postulan a ofertas y "
+        "crean acciones de agenda a la vez contra la base de datos configurada. Informa de "
+        "los errores 'database is locked' y comprueba que los contadores de las ofertas cuadran. "
+        "Crea sus propios datos (usuarios '" + PREFIJO + "*') y los borra al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help="Procesos escritores simultáneos.")
+        parser.add_argument('--writes', type=int, default=200, help="Escrituras por proceso.")
+        parser.add_argument('--offers', type=int, default=5, help="Ofertas entre las que se reparten las postulaciones.")
+        parser.add_argument('--no-retry', action='store_true', help="Escribir sin jobs.db.con_reintentos (para comparar).")
+        parser.add_argument('--keep', action='store_true', help="No borrar los datos generados.")
+
+    def handle(self, *args, **options):
+        workers, escrituras = options['workers'], options['writes']
+        if workers < 1 or escrituras < 1 or options['offers'] < 1:
+            raise CommandError("--workers, --writes y --offers deben ser mayores que 0.")
+        if User.objects.filter(username__startswith=PREFIJO).exists():
+            raise CommandError(f"Ya existen usuarios '{PREFIJO}*' de una ejecución anterior; bórralos primero.")
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                pragmas = {}
+                for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'cache_size'):
+                    cursor.execute(f'PRAGMA {pragma}')
+                    pragmas[pragma] = cursor.fetchone()[0]
+            self.stdout.write("PRAGMA: " + ", ".join(f"{k}={v}" for k, v in pragmas.items()))
+
+        headhunter = User.objects.create_user(f'{PREFIJO}headhunter')
+        offer_ids = [
+            JobOffer.objects.create(created_by=headhunter, company_name='Stress', title=f'Oferta {n}', description='-').pk
+            for n in range(options['offers'])
+        ]
+        User.objects.bulk_create([
+            User(username=f'{PREFIJO}{worker}-{n:06d}')
+            for worker in range(workers) for n in range((escrituras + 1) // 2)
+        ], batch_size=500)
+
+        # Los procesos hijos abren sus propias conexiones
+        connections.close_all()
+        contexto = multiprocessing.get_context('fork')
+        tareas = [(worker, escrituras, headhunter.pk, offer_ids, not options['no_retry']) for worker in range(workers)]
+        inicio = time.perf_counter()
+        with contexto.Pool(workers) as pool:
+            resultados = pool.map(_escritor, tareas)
+        duracion = time.perf_counter() - inicio
+
+        ok = sum(r[0] for r in resultados)
+        bloqueos = sum(r[1] for r in resultados)
+        otros = sum(r[2] for r in resultados)
+        peor = max(r[3] for r in resultados)
+        self.stdout.write(
+            f"{workers} procesos x {escrituras} escrituras en {duracion:.2f}s: "
+            f"{ok} correctas ({ok / duracion:.0f}/s), {bloqueos} 'database is locked', {otros} otros errores; "
+            f"escritura más lenta {peor * 1000:.0f} ms."
+        )
+
+        candidaturas = Candidatura.objects.filter(offer_id__in=offer_ids).count()
+        contador = JobOffer.objects.filter(pk__in=offer_ids).aggregate(total=Sum('num_candidaturas'))['total']
+        cuadra = candidaturas == contador
+        self.stdout.write(f"Candidaturas: {candidaturas}; contadores de las ofertas: {contador}.")
+
+        if not options['keep']:
+            # En cascada: ofertas, candidaturas y acciones de agenda
+            User.objects.filter(username__startswith=PREFIJO).delete()
+
+        if bloqueos or otros or not cuadra:
+            raise CommandError("La prueba de carga ha fallado.")
+        self.stdout.write(self.style.SUCCESS("Prueba de carga superada."))
@@ -0,0 +1,47 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia la base de datos SQLite principal sobre las réplicas configuradas en "
+        "SQLITE_REPLICAS (API de backup de SQLite: copia consistente aunque haya escrituras). "
+        "Simula la replicación para probar en local jobs.routers.PrimaryReplicaRouter."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Repetir la copia periódicamente.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Segundos entre copias (con --loop).")
+
+    def handle(self, *args, **options):
+        principal = settings.DATABASES[DEFAULT_DB_ALIAS]
+        replicas = {alias: db for alias, db in settings.DATABASES.items() if alias != DEFAULT_DB_ALIAS}
+        if principal['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("Solo para SQLite: con otros motores usa su replicación nativa.")
+        if not replicas:
+            raise CommandError("No hay réplicas configuradas (SQLITE_REPLICAS).")
+
+        while True:
+            inicio = time.perf_counter()
+            # NAME puede ser una URI (la base de datos de test en memoria compartida)
+            origen = sqlite3.connect(str(principal['NAME']), uri=str(principal['NAME']).startswith('file:'))
+            try:
+                for alias, db in replicas.items():
+                    destino = sqlite3.connect(str(db['NAME']))
+                    try:
+                        origen.backup(destino)
+                    finally:
+                        destino.close()
+            finally:
+                origen.close()
+            self.stdout.write(
+                f"{len(replicas)} réplicas actualizadas en {(time.perf_counter() - inicio) * 1000:.0f} ms: "
+                + ", ".join(replicas)
+            )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,188 @@
+# jobs/metrics.py
+"""
+Métricas de la aplicación en formato de texto de Prometheus (vista `metrics`,
+en /metrics).
+
+Cada proceso acumula sus contadores e histogramas en memoria y, como mucho
+cada JOBS_METRICS_FLUSH_SECONDS, los vuelca enteros a su propio fichero JSON
+en JOBS_METRICS_DIR (escritura atómica con os.replace). La vista suma los
+ficheros de todos los procesos, así que da igual qué worker atienda la
+petición. Es el mismo modelo que el modo multiproceso de prometheus_client:
+el directorio se vacía en cada despliegue.
+
+Lo que no es acumulable por proceso (la profundidad de la bandeja de salida)
+se calcula al exponer, con una consulta.
+"""
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+METRICS_DIR = Path(getattr(settings, 'JOBS_METRICS_DIR', 'metrics'))
+FLUSH_SECONDS = getattr(settings, 'JOBS_METRICS_FLUSH_SECONDS', 5)
+
+# Límites (en segundos) de los histogramas de latencia
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, math.inf)
+
+# nombre -> (tipo, ayuda)
+METRICAS = {
+    'jobs_http_requests_total': ('counter', 'Peticiones atendidas por ruta, método y status.'),
+    'jobs_http_request_duration_seconds': ('histogram', 'Duración de las peticiones por ruta y método.'),
+    'jobs_db_queries_total': ('counter', 'Consultas SQL lanzadas por ruta.'),
+    'jobs_db_duration_seconds_total': ('counter', 'Tiempo en la base de datos por ruta.'),
+    'jobs_cache_requests_total': ('counter', 'Lecturas de las cachés de jobs por caché y resultado (hit/miss).'),
+    'jobs_candidaturas_creadas_total': ('counter', 'Candidaturas creadas.'),
+    'jobs_candidaturas_cambios_estado_total': ('counter', 'Cambios de estado de candidaturas por estado nuevo.'),
+    'jobs_outbox_emails': ('gauge', 'Correos en la bandeja de salida por estado.'),
+}
+
+
+def _clave(nombre, etiquetas):
+    return nombre, tuple(sorted(etiquetas.items()))
+
+
+class _Registro:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        # También tras un fork: el hijo no debe volcar los valores del padre como propios
+        self.pid = os.getpid()
+        self.nombre = f'{self.pid}-{time.time_ns()}.json'
+        self.contadores = {}
+        self.histogramas = {}
+        self.volcado = time.monotonic()
+        self.pendiente = False
+
+    def _comprobar_proceso(self):
+        if os.getpid() != self.pid:
+            self._reiniciar()
+
+    def inc(self, nombre, valor=1, **etiquetas):
+        clave = _clave(nombre, etiquetas)
+        with self.lock:
+            self._comprobar_proceso()
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+            self.pendiente = True
+
+    def observe(self, nombre, valor, **etiquetas):
+        clave = _clave(nombre, etiquetas)
+        with self.lock:
+            self._comprobar_proceso()
+            histograma = self.histogramas.get(clave)
+            if histograma is None:
+                histograma = self.histogramas[clave] = {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0}
+            for i, limite in enumerate(BUCKETS):
+                if valor <= limite:
+                    histograma['buckets'][i] += 1
+                    break
+            histograma['sum'] += valor
+            histograma['count'] += 1
+            self.pendiente = True
+
+    def volcar(self, forzar=False):
+        """Escribe el fichero del proceso si hay cambios y ha pasado FLUSH_SECONDS (o si se fuerza)."""
+        with self.lock:
+            self._comprobar_proceso()
+            if not self.pendiente or (not forzar and time.monotonic() - self.volcado < FLUSH_SECONDS):
+                return
+            datos = {
+                'contadores': [[n, dict(e), v] for (n, e), v in self.contadores.items()],
+                'histogramas': [[n, dict(e), h] for (n, e), h in self.histogramas.items()],
+            }
+            self.volcado = time.monotonic()
+            self.pendiente = False
+        METRICS_DIR.mkdir(parents=True, exist_ok=True)
+        fichero = METRICS_DIR / self.nombre
+        temporal = fichero.with_suffix('.tmp')
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(datos, f)
+        os.replace(temporal, fichero)
+
+
+_registro = _Registro()
+inc = _registro.inc
+observe = _registro.observe
+volcar = _registro.volcar
+atexit.register(volcar, forzar=True)
+
+
+def leer():
+    """Suma los ficheros de todos los procesos: ({clave: valor}, {clave: histograma})."""
+    contadores, histogramas = {}, {}
+    if not METRICS_DIR.is_dir():
+        return contadores, histogramas
+    for fichero in METRICS_DIR.glob('*.json'):
+        try:
+            with open(fichero, encoding='utf-8') as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            continue  # Borrado a la vez o ajeno: se ignora
+        for nombre, etiquetas, valor in datos.get('contadores', ()):
+            clave = _clave(nombre, etiquetas)
+            contadores[clave] = contadores.get(clave, 0) + valor
+        for nombre, etiquetas, h in datos.get('histogramas', ()):
+            total = histogramas.setdefault(
+                _clave(nombre, etiquetas), {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0},
+            )
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], h['buckets'])]
+            total['sum'] += h['sum']
+            total['count'] += h['count']
+    return contadores, histogramas
+
+
+# --- Formato de texto de Prometheus ---
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(etiquetas, **extra):
+    pares = list(etiquetas) + sorted(extra.items())
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{k}="{_escapar(v)}"' for k, v in pares) + '}'
+
+
+def _numero(valor):
+    if valor == math.inf:
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def exponer(gauges=None):
+    """
+    Texto para /metrics. `gauges` es {nombre: {tupla de etiquetas: valor}} con
+    los valores que se calculan en el momento.
+    """
+    volcar(forzar=True)
+    contadores, histogramas = leer()
+    gauges = gauges or {}
+    lineas = []
+    for nombre, (tipo, ayuda) in METRICAS.items():
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} {tipo}')
+        if tipo == 'histogram':
+            for (n, etiquetas), h in sorted(histogramas.items()):
+                if n != nombre:
+                    continue
+                acumulado = 0
+                for limite, cuenta in zip(BUCKETS, h['buckets']):
+                    acumulado += cuenta
+                    lineas.append(f'{nombre}_bucket{_etiquetas(etiquetas, le=_numero(float(limite)))} {acumulado}')
+                lineas.append(f'{nombre}_sum{_etiquetas(etiquetas)} {_numero(h["sum"])}')
+                lineas.append(f'{nombre}_count{_etiquetas(etiquetas)} {h["count"]}')
+        elif tipo == 'gauge':
+            for etiquetas, valor in sorted(gauges.get(nombre, {}).items()):
+                lineas.append(f'{nombre}{_etiquetas(etiquetas)} {_numero(valor)}')
+        else:
+            for (n, etiquetas), valor in sorted(contadores.items()):
+                if n == nombre:
+                    lineas.append(f'{nombre}{_etiquetas(etiquetas)} {_numero(valor)}')
+    return '\n'.join(lineas) + '\n'
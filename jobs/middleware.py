@@ -0,0 +1,139 @@
+# jobs/middleware.py
+import cProfile
+import logging
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import metrics, profiling, routers, timing
+
+logger = logging.getLogger('jobs.timing')
+
+# Enviar la cabecera Server-Timing (el log se escribe siempre)
+SERVER_TIMING = getattr(settings, 'JOBS_SERVER_TIMING', True)
+
+# Cómo pide un usuario staff que se perfile su petición
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAM = '_profile'
+
+# Segundos que las lecturas de un usuario siguen yendo a la principal tras escribir
+# (debe cubrir el retraso de las réplicas)
+REPLICA_PIN_SECONDS = getattr(settings, 'JOBS_REPLICA_PIN_SECONDS', 5)
+PIN_COOKIE = 'jobs_primary'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class ReplicaPinningMiddleware:
+    """
+    Lee-lo-que-escribes con réplicas (ver jobs/routers.py). Las peticiones que
+    no son de lectura, y las de un usuario que ha escrito hace menos de
+    REPLICA_PIN_SECONDS, leen de la principal. La marca viaja en una cookie para
+    que valga también para usuarios anónimos y entre workers.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        fijado = request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES
+        tokens = routers.fijar_primario(fijado)
+        try:
+            with connections[DEFAULT_DB_ALIAS].execute_wrapper(routers.registrar_escrituras):
+                response = self.get_response(request)
+            escrito = routers.ha_escrito()
+        finally:
+            routers.restaurar(tokens)
+        if escrito:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+                secure=request.is_secure(),
+            )
+        return response
+
+
+class RequestTimingMiddleware:
+    """
+    Mide cada petición (ver jobs/timing.py) y publica el desglose en la
+    cabecera Server-Timing, visible en la pestaña de red del navegador, en
+    una línea del log 'jobs.timing' con el nombre de la ruta resuelta y en
+    las métricas de /metrics (jobs/metrics.py). Va la primera en MIDDLEWARE
+    para que el total incluya al resto.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with timing.medir() as medicion:
+            response = self.get_response(request)
+        d = medicion.desglose()
+        match = request.resolver_match
+        ruta = match.view_name if match else '-'
+
+        if SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'total;dur={d["total"]:.1f}, '
+                f'db;dur={d["db"]:.1f};desc="{d["consultas"]} consultas", '
+                f'tpl;dur={d["plantillas"]:.1f}, '
+                f'app;dur={d["python"]:.1f}'
+            )
+        logger.info(
+            'ruta=%s metodo=%s status=%s total_ms=%.1f db_ms=%.1f consultas=%d tpl_ms=%.1f python_ms=%.1f',
+            ruta, request.method, response.status_code, d['total'], d['db'], d['consultas'],
+            d['plantillas'], d['python'],
+            extra={'ruta': ruta, 'metodo': request.method, 'status': response.status_code, **d},
+        )
+        metrics.inc('jobs_http_requests_total', ruta=ruta, metodo=request.method, status=response.status_code)
+        metrics.observe('jobs_http_request_duration_seconds', d['total'] / 1000, ruta=ruta, metodo=request.method)
+        metrics.inc('jobs_db_queries_total', d['consultas'], ruta=ruta)
+        metrics.inc('jobs_db_duration_seconds_total', d['db'] / 1000, ruta=ruta)
+        metrics.volcar()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # La URL ya está resuelta: las consultas lentas se anotan con su nombre
+        medicion = timing.actual()
+        if medicion is not None:
+            medicion.ruta = request.resolver_match.view_name
+
+
+class RequestProfilerMiddleware:
+    """
+    Perfilado bajo demanda de una sola petición. Si un usuario staff la envía
+    con la cabecera `X-Profile: 1` o el parámetro `?_profile=1`, la petición
+    se ejecuta con cProfile y el perfil se guarda en JOBS_PROFILE_DIR con la
+    ruta y el id del usuario en el nombre (ver `manage.py profiles`). Para el
+    resto de peticiones solo cuesta comprobar la cabecera. Va después de
+    AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.solicitado(request):
+            return self.get_response(request)
+
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Ya hay otro perfilador activo en este hilo
+            return self.get_response(request)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            perfil.disable()
+        ms = (time.perf_counter() - inicio) * 1000
+
+        match = request.resolver_match
+        nombre = profiling.guardar(perfil, match.view_name if match else '-', request.user.pk, ms)
+        response['X-Profile-File'] = nombre
+        return response
+
+    def solicitado(self, request):
+        marca = request.headers.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM)
+        return marca not in (None, '', '0') and request.user.is_staff
@@ -1,17 +0,0 @@
-# Generated by Django 5.2.3 on 2025-07-17 11:19
-
-from django.db import migrations
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ("jobs", "0001_initial"),
-    ]
-
-    operations = [
-        migrations.RemoveField(
-            model_name="joboffer",
-            name="headhunter",
-        ),
-    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0003_agendaaccion_candidatura_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='joboffer',
+            index=models.Index(fields=['is_active', '-created_at', '-id'], name='jobs_offer_active_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Tabla virtual FTS5 para la búsqueda de ofertas (ver jobs/search.py)
+
+from django.db import migrations
+
+
+def crear_indice_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS jobs_joboffer_fts USING fts5("
+        "title, company_name, description, requirements, category, location, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO jobs_joboffer_fts "
+        "(rowid, title, company_name, description, requirements, category, location) "
+        "SELECT id, title, company_name, description, requirements, category, location "
+        "FROM jobs_joboffer WHERE is_active = 1"
+    )
+
+
+def eliminar_indice_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS jobs_joboffer_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0004_joboffer_active_feed_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_fts, eliminar_indice_fts),
+    ]
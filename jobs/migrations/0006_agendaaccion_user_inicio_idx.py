@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0005_joboffer_fts_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='agendaaccion',
+            name='jobs_agenda_user_id_c4903d_idx',
+        ),
+        migrations.AddIndex(
+            model_name='agendaaccion',
+            index=models.Index(fields=['user', 'fecha_hora_inicio'], name='jobs_agenda_user_inicio_idx'),
+        ),
+    ]
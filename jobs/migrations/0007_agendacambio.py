@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0006_agendaaccion_user_inicio_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgendaCambio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('accion_id', models.PositiveBigIntegerField(unique=True, verbose_name='Acción')),
+                ('eliminada', models.BooleanField(default=False, verbose_name='Eliminada')),
+                ('fecha', models.DateTimeField(auto_now=True, verbose_name='Fecha del cambio')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='agenda_cambios', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Cambio de Agenda',
+                'verbose_name_plural': 'Cambios de Agenda',
+                'indexes': [models.Index(fields=['user', 'id'], name='jobs_agenda_cambio_seq_idx')],
+            },
+        ),
+    ]
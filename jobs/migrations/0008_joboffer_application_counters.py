@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:32
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+CONTADOR_POR_ESTADO = {
+    'pendiente': 'num_pendientes',
+    'aceptado': 'num_aceptadas',
+    'rechazado': 'num_rechazadas',
+}
+
+
+def rellenar_contadores(apps, schema_editor):
+    JobOffer = apps.get_model('jobs', 'JobOffer')
+    Candidatura = apps.get_model('jobs', 'Candidatura')
+    contadores = {}
+    for fila in Candidatura.objects.order_by().values('offer_id', 'estado').annotate(n=Count('id')):
+        oferta = contadores.setdefault(fila['offer_id'], {})
+        oferta['num_candidaturas'] = oferta.get('num_candidaturas', 0) + fila['n']
+        campo = CONTADOR_POR_ESTADO.get(fila['estado'])
+        if campo:
+            oferta[campo] = oferta.get(campo, 0) + fila['n']
+    for offer_id, valores in contadores.items():
+        JobOffer.objects.filter(pk=offer_id).update(**valores)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0007_agendacambio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='joboffer',
+            name='num_aceptadas',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Candidaturas aceptadas'),
+        ),
+        migrations.AddField(
+            model_name='joboffer',
+            name='num_candidaturas',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Candidaturas'),
+        ),
+        migrations.AddField(
+            model_name='joboffer',
+            name='num_pendientes',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Candidaturas pendientes'),
+        ),
+        migrations.AddField(
+            model_name='joboffer',
+            name='num_rechazadas',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Candidaturas rechazadas'),
+        ),
+        migrations.RunPython(rellenar_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0008_joboffer_application_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='candidatura',
+            index=models.Index(fields=['offer', '-updated_at', '-id'], name='jobs_cand_offer_updated_idx'),
+        ),
+    ]
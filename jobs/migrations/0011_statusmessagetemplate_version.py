@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0010_outboxemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='statusmessagetemplate',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Versión'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0011_statusmessagetemplate_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='joboffer',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['modality', 'category', 'location', 'created_at', 'is_active'], name='jobs_offer_facets_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='joboffer',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['modality', '-created_at', '-id'], name='jobs_offer_modality_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='joboffer',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', '-created_at', '-id'], name='jobs_offer_category_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='joboffer',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['location', '-created_at', '-id'], name='jobs_offer_location_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0012_joboffer_facet_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='joboffer',
+            name='salary_currency',
+            field=models.CharField(blank=True, editable=False, max_length=3, verbose_name='Moneda del salario'),
+        ),
+        migrations.AddField(
+            model_name='joboffer',
+            name='salary_max',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Salario anual máximo'),
+        ),
+        migrations.AddField(
+            model_name='joboffer',
+            name='salary_min',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Salario anual mínimo'),
+        ),
+        migrations.AddField(
+            model_name='joboffer',
+            name='salary_period',
+            field=models.CharField(blank=True, choices=[('year', 'Año'), ('month', 'Mes'), ('week', 'Semana'), ('day', 'Día'), ('hour', 'Hora')], editable=False, max_length=10, verbose_name='Periodo del salario'),
+        ),
+        migrations.AddIndex(
+            model_name='joboffer',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['salary_currency', '-salary_max', '-id'], name='jobs_offer_salary_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0013_joboffer_structured_salary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='joboffer',
+            name='location_city',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Ciudad'),
+        ),
+        migrations.AddField(
+            model_name='joboffer',
+            name='location_geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12, verbose_name='Geohash'),
+        ),
+        migrations.AddField(
+            model_name='joboffer',
+            name='location_lat',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Latitud'),
+        ),
+        migrations.AddField(
+            model_name='joboffer',
+            name='location_lon',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Longitud'),
+        ),
+        migrations.AddField(
+            model_name='joboffer',
+            name='location_region',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Región'),
+        ),
+        migrations.AddIndex(
+            model_name='joboffer',
+            index=models.Index(fields=['location_geohash'], name='jobs_offer_geohash_idx'),
+        ),
+    ]
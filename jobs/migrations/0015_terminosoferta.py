@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0014_joboffer_normalized_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TerminosOferta',
+            fields=[
+                ('offer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='terminos', serialize=False, to='jobs.joboffer', verbose_name='Oferta')),
+                ('terminos', models.JSONField(default=dict, verbose_name='Términos')),
+                ('activa', models.BooleanField(default=True, verbose_name='Activa')),
+                ('actualizado', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Actualizado')),
+            ],
+            options={
+                'verbose_name': 'Términos de oferta',
+                'verbose_name_plural': 'Términos de ofertas',
+            },
+        ),
+    ]
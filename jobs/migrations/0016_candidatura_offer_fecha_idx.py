@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0015_terminosoferta'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='candidatura',
+            name='jobs_cand_offer_updated_idx',
+        ),
+        migrations.AddIndex(
+            model_name='candidatura',
+            index=models.Index(fields=['offer', '-fecha_aplicacion', '-id'], name='jobs_cand_offer_fecha_idx'),
+        ),
+    ]
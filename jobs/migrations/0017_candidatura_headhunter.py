@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def rellenar_headhunter(apps, schema_editor):
+    JobOffer = apps.get_model('jobs', 'JobOffer')
+    Candidatura = apps.get_model('jobs', 'Candidatura')
+    Candidatura.objects.update(headhunter_id=Subquery(
+        JobOffer.objects.filter(pk=OuterRef('offer_id')).values('created_by_id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0016_candidatura_offer_fecha_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidatura',
+            name='headhunter',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Headhunter de la oferta'),
+        ),
+        migrations.RunPython(rellenar_headhunter, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='candidatura',
+            index=models.Index(fields=['headhunter', '-fecha_aplicacion', '-id'], name='jobs_cand_hh_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:03
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+
+
+def recortar_duraciones(apps, schema_editor):
+    # Las acciones creadas fuera del formulario pueden pasar de 8 horas: se recortan
+    # antes de añadir la restricción
+    AgendaAccion = apps.get_model('jobs', 'AgendaAccion')
+    AgendaAccion.objects.filter(duracion_minutos__gt=480).update(duracion_minutos=480)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0017_candidatura_headhunter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='agendaaccion',
+            name='duracion_minutos',
+            field=models.PositiveIntegerField(default=30, validators=[django.core.validators.MaxValueValidator(480)], verbose_name='Duración (minutos)'),
+        ),
+        migrations.RunPython(recortar_duraciones, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='agendaaccion',
+            constraint=models.CheckConstraint(condition=models.Q(('duracion_minutos__lte', 480)), name='jobs_agenda_duracion_max'),
+        ),
+    ]
@@ -1,8 +1,14 @@
 # jobs/models.py
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.dispatch import Signal
 from django.contrib.auth.models import User
+from django.core.validators import MaxValueValidator
 from django.utils import timezone # Importar para usar timezone.now() o manejar TimeZone
 
+from . import locations, salaries
+
 
 # Oferta de empleo creada por un headhunter
 class JobOffer(models.Model):
@@ -36,20 +42,223 @@ class JobOffer(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Última actualización")    
 
+    # Contadores desnormalizados de candidaturas. Se mantienen con F() al crear,
+    # cambiar de estado o borrar candidaturas (ver jobs/counters.py) y se reparan con
+    # `python manage.py reconcile_application_counters`.
+    num_candidaturas = models.PositiveIntegerField(default=0, editable=False, verbose_name="Candidaturas")
+    num_pendientes = models.PositiveIntegerField(default=0, editable=False, verbose_name="Candidaturas pendientes")
+    num_aceptadas = models.PositiveIntegerField(default=0, editable=False, verbose_name="Candidaturas aceptadas")
+    num_rechazadas = models.PositiveIntegerField(default=0, editable=False, verbose_name="Candidaturas rechazadas")
+
+    CAMPOS_CONTADOR = ('num_candidaturas', 'num_pendientes', 'num_aceptadas', 'num_rechazadas')
+
+    # Salario estructurado, extraído de `salary` al guardar (ver jobs/salaries.py) y
+    # rellenado en las filas antiguas con `python manage.py backfill_salaries`.
+    # Los importes son anuales, en la moneda de la oferta.
+    class SalaryPeriodChoices(models.TextChoices):
+        YEAR = 'year', 'Año'
+        MONTH = 'month', 'Mes'
+        WEEK = 'week', 'Semana'
+        DAY = 'day', 'Día'
+        HOUR = 'hour', 'Hora'
+
+    salary_min = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Salario anual mínimo")
+    salary_max = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Salario anual máximo")
+    salary_currency = models.CharField(max_length=3, blank=True, editable=False, verbose_name="Moneda del salario")
+    salary_period = models.CharField(
+        max_length=10, blank=True, editable=False, choices=SalaryPeriodChoices.choices,
+        verbose_name="Periodo del salario",
+    )
+
+    CAMPOS_SALARIO = salaries.CAMPOS
+
+    # Ubicación normalizada de la primera ciudad conocida de `location`, contra el
+    # nomenclátor offline de jobs/locations.py (`python manage.py backfill_locations`
+    # para las filas antiguas). location_geohash sirve las búsquedas por cercanía.
+    location_city = models.CharField(max_length=100, blank=True, editable=False, verbose_name="Ciudad")
+    location_region = models.CharField(max_length=100, blank=True, editable=False, verbose_name="Región")
+    location_lat = models.FloatField(null=True, blank=True, editable=False, verbose_name="Latitud")
+    location_lon = models.FloatField(null=True, blank=True, editable=False, verbose_name="Longitud")
+    location_geohash = models.CharField(max_length=12, blank=True, editable=False, verbose_name="Geohash")
+
+    CAMPOS_UBICACION = locations.CAMPOS
+
     class Meta:
         verbose_name = "Oferta de Empleo"
         verbose_name_plural = "Ofertas de Empleo"
         ordering = ['-created_at']
+        indexes = [
+            # Soporta la paginación por cursor (created_at, id) del listado público
+            models.Index(fields=['is_active', '-created_at', '-id'], name='jobs_offer_active_feed_idx'),
+            # Facetas (jobs/facets.py). Son parciales: SQLite compila is_active=True como
+            # `WHERE is_active`, que no aprovecha un prefijo de índice pero sí casa con la
+            # condición de un índice parcial. El listado filtrado por una faceta sale así
+            # sin ordenar en memoria, y la consulta agrupada de los recuentos recorre solo
+            # el índice (is_active va al final únicamente para que lo cubra).
+            models.Index(
+                fields=['modality', 'category', 'location', 'created_at', 'is_active'],
+                condition=models.Q(is_active=True), name='jobs_offer_facets_idx',
+            ),
+            models.Index(
+                fields=['modality', '-created_at', '-id'],
+                condition=models.Q(is_active=True), name='jobs_offer_modality_feed_idx',
+            ),
+            models.Index(
+                fields=['category', '-created_at', '-id'],
+                condition=models.Q(is_active=True), name='jobs_offer_category_feed_idx',
+            ),
+            models.Index(
+                fields=['location', '-created_at', '-id'],
+                condition=models.Q(is_active=True), name='jobs_offer_location_feed_idx',
+            ),
+            # Rango de salario y orden por salario (paginación por cursor sobre (salary_max, id))
+            models.Index(
+                fields=['salary_currency', '-salary_max', '-id'],
+                condition=models.Q(is_active=True), name='jobs_offer_salary_feed_idx',
+            ),
+            # Búsqueda por cercanía: cada celda de geohash es un rango de este índice
+            # (MULTI-INDEX OR). No es parcial: SQLite no usa un índice parcial dentro
+            # de los términos de un OR, que no repiten la condición is_active.
+            models.Index(fields=['location_geohash'], name='jobs_offer_geohash_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} en {self.company_name}"
 
+    def save(self, *args, **kwargs):
+        # Los contadores solo se modifican con F(): al editar la oferta no se reescriben
+        # para no pisar candidaturas llegadas mientras se editaba.
+        if not self._state.adding and self.pk and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.CAMPOS_CONTADOR
+            ]
+        # Campos derivados del texto libre: se recalculan si cambia su origen
+        update_fields = kwargs.get('update_fields')
+        derivados = set()
+        if update_fields is None or 'salary' in update_fields:
+            self.actualizar_salario()
+            derivados.update(self.CAMPOS_SALARIO)
+        if update_fields is None or 'location' in update_fields:
+            self.actualizar_ubicacion()
+            derivados.update(self.CAMPOS_UBICACION)
+        if update_fields is not None and derivados:
+            kwargs['update_fields'] = {*update_fields, *derivados}
+        super().save(*args, **kwargs)
+
+    def actualizar_salario(self):
+        """Rellena los campos de salario estructurado a partir del texto de `salary`."""
+        for campo, valor in salaries.parsear(self.salary).items():
+            setattr(self, campo, valor)
+
+    def actualizar_ubicacion(self):
+        """Rellena la ubicación normalizada a partir del texto de `location`."""
+        for campo, valor in locations.normalizar(self.location).items():
+            setattr(self, campo, valor)
+
 # Candidatura de un usuario a una oferta
 class CandidatureStatus(models.TextChoices):
     PENDING = 'pendiente', 'Pendiente'
     ACCEPTED = 'aceptado', 'Aceptado'
     REJECTED = 'rechazado', 'Rechazado'
 
+# Se emite tras un cambio de estado masivo (cambiar_estado o aplicar_estados), con
+# los argumentos candidatura_ids y estado. Los cambios individuales usan post_save.
+candidaturas_cambiadas = Signal()
+
+# Campo contador de JobOffer que corresponde a cada estado
+CONTADOR_POR_ESTADO = {
+    CandidatureStatus.PENDING: 'num_pendientes',
+    CandidatureStatus.ACCEPTED: 'num_aceptadas',
+    CandidatureStatus.REJECTED: 'num_rechazadas',
+}
+
+def ajustar_contadores(offer_id, **deltas):
+    """
+    Suma (o resta) a los contadores de la oferta con expresiones F(), sin leer la fila.
+    Los decrementos no bajan de cero aunque los contadores se hayan desajustado.
+    """
+    valores = {}
+    for campo, delta in deltas.items():
+        if delta > 0:
+            valores[campo] = F(campo) + delta
+        elif delta < 0:
+            valores[campo] = Greatest(F(campo) + delta, Value(0))
+    if valores:
+        JobOffer.objects.filter(pk=offer_id).update(**valores)
+
+class CandidaturaQuerySet(models.QuerySet):
+    def cambiar_estado(self, nuevo_estado):
+        """
+        Cambia el estado de todas las candidaturas del queryset en una sola UPDATE y
+        ajusta los contadores de sus ofertas en la misma transacción.
+        Usar en lugar de queryset.update(estado=...), que no actualiza los contadores.
+        Emite `candidaturas_cambiadas` dentro de la transacción (notificaciones).
+        """
+        destino = CONTADOR_POR_ESTADO[nuevo_estado]
+        with transaction.atomic():
+            cambios = self.exclude(estado=nuevo_estado)
+            # Se bloquean las filas que van a cambiar para que los contadores cuadren
+            filas = list(cambios.select_for_update().order_by().values_list('id', 'offer_id', 'estado'))
+            updated = cambios.update(estado=nuevo_estado, updated_at=timezone.now())
+
+            ajustes = {}
+            for _, offer_id, estado in filas:
+                oferta = ajustes.setdefault(offer_id, {})
+                origen = CONTADOR_POR_ESTADO.get(estado)
+                if origen:
+                    oferta[origen] = oferta.get(origen, 0) - 1
+                oferta[destino] = oferta.get(destino, 0) + 1
+            for offer_id, deltas in ajustes.items():
+                ajustar_contadores(offer_id, **deltas)
+
+            if filas:
+                candidaturas_cambiadas.send(
+                    sender=Candidatura, candidatura_ids=[pk for pk, _, _ in filas], estado=nuevo_estado
+                )
+        return updated
+
+    def aplicar_estados(self, cambios):
+        """
+        Aplica un estado distinto a cada candidatura: `cambios` es {id: nuevo_estado}.
+        Solo se tocan las candidaturas del queryset (p. ej. las de las ofertas del
+        headhunter). Lectura bloqueante, un bulk_update y los ajustes de contadores
+        en una sola transacción.
+        Devuelve (ids_actualizados, ids_sin_cambios); los ids que no están en el
+        queryset no aparecen en ninguno de los dos.
+        """
+        actualizadas, sin_cambios = [], []
+        with transaction.atomic():
+            candidaturas = list(
+                self.filter(id__in=list(cambios)).select_for_update().order_by('id').only('id', 'offer_id', 'estado')
+            )
+            now = timezone.now()
+            ajustes = {}
+            por_estado = {}
+            for candidatura in candidaturas:
+                nuevo_estado = cambios[candidatura.id]
+                if candidatura.estado == nuevo_estado:
+                    sin_cambios.append(candidatura)
+                    continue
+                oferta = ajustes.setdefault(candidatura.offer_id, {})
+                origen = CONTADOR_POR_ESTADO.get(candidatura.estado)
+                if origen:
+                    oferta[origen] = oferta.get(origen, 0) - 1
+                destino = CONTADOR_POR_ESTADO[nuevo_estado]
+                oferta[destino] = oferta.get(destino, 0) + 1
+                candidatura.estado = nuevo_estado
+                candidatura.updated_at = now
+                actualizadas.append(candidatura)
+                por_estado.setdefault(nuevo_estado, []).append(candidatura.id)
+
+            if actualizadas:
+                Candidatura.objects.bulk_update(actualizadas, ['estado', 'updated_at'], batch_size=500)
+            for offer_id, deltas in ajustes.items():
+                ajustar_contadores(offer_id, **deltas)
+            for nuevo_estado, ids in por_estado.items():
+                candidaturas_cambiadas.send(sender=Candidatura, candidatura_ids=ids, estado=nuevo_estado)
+        return [c.id for c in actualizadas], [c.id for c in sin_cambios]
+
 class Candidatura(models.Model):
     offer = models.ForeignKey(
         JobOffer, on_delete=models.CASCADE, related_name='applications', verbose_name="Oferta de Empleo"
@@ -64,15 +273,52 @@ class Candidatura(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Última actualización")
     mensaje_personalizado = models.TextField(blank=True, null=True, verbose_name="Mensaje personalizado")
     fecha_aplicacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de aplicación")
+    # Creador de la oferta, copiado al crear la candidatura: el panel del headhunter
+    # pagina todas sus candidaturas con un índice propio, sin unir con las ofertas
+    headhunter = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, editable=False, related_name='+', db_index=False,
+        verbose_name="Headhunter de la oferta",
+    )
+
+    objects = CandidaturaQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Candidatura"
         verbose_name_plural = "Candidaturas"
         unique_together = ('offer', 'user')
         ordering = ['-fecha_aplicacion']
+        indexes = [
+            # Panel del headhunter paginado por (fecha_aplicacion, id): todas sus candidaturas
+            # o las de una oferta
+            models.Index(fields=['headhunter', '-fecha_aplicacion', '-id'], name='jobs_cand_hh_fecha_idx'),
+            models.Index(fields=['offer', '-fecha_aplicacion', '-id'], name='jobs_cand_offer_fecha_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.offer.title} ({self.get_estado_display()})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Estado tal y como está en la base de datos, para detectar cambios al guardar
+        instance._estado_guardado = instance.__dict__.get('estado')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Las señales ajustan los contadores de la oferta: todo en la misma transacción
+        with transaction.atomic():
+            if self._state.adding and self.headhunter_id is None:
+                self.headhunter_id = self.offer.created_by_id
+            update_fields = kwargs.get('update_fields')
+            if not self._state.adding and (update_fields is None or 'estado' in update_fields):
+                # El estado de partida se relee con la fila bloqueada: dos guardados a la vez
+                # (formulario y admin) no pueden aplicar los dos el mismo -pendiente/+aceptado
+                # ni encolar dos avisos. Es lo mismo que hace cambiar_estado() en lote.
+                self._estado_guardado = (
+                    Candidatura.objects.select_for_update().filter(pk=self.pk)
+                    .values_list('estado', flat=True).first()
+                )
+            super().save(*args, **kwargs)
     
 class StatusMessageTemplate(models.Model):
     user = models.ForeignKey(
@@ -88,6 +334,8 @@ class StatusMessageTemplate(models.Model):
         verbose_name="Estado de Candidatura"
     )
     mensaje = models.TextField(verbose_name="Plantilla de Mensaje")
+    # Se incrementa en cada edición; forma parte de la clave de la plantilla compilada
+    version = models.PositiveIntegerField(default=1, editable=False, verbose_name="Versión")
 
     class Meta:
         unique_together = ('user', 'estado')
@@ -96,7 +344,23 @@ class StatusMessageTemplate(models.Model):
 
     def __str__(self):
         return f"Plantilla de {self.user.username} para {self.get_estado_display()}"
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'version'}
+        # El incremento lo hace la base de datos: dos ediciones a la vez desde la misma
+        # versión no pueden dejar las dos la misma (y la plantilla compilada vieja en caché)
+        with transaction.atomic():
+            self.version = F('version') + 1
+            super().save(*args, **kwargs)
+            self.refresh_from_db(fields=['version'])
     
+MAX_DURACION_ACCION_MINUTOS = 480
+
+
 class AgendaAccion(models.Model):
     class AccionTipoChoices(models.TextChoices):
         INTERVIEW = 'entrevista', 'Entrevista'
@@ -105,6 +369,11 @@ class AgendaAccion(models.Model):
         DELIVERY = 'entrega', 'Entrega'
         OTHER = 'otro', 'Otro'
 
+    # Duración máxima de una acción (8 horas). La API de agenda la usa para saber hasta
+    # dónde mirar hacia atrás al buscar solapamientos: una acción más larga desaparecería
+    # del calendario, así que además del validador la impone una restricción de la tabla.
+    MAX_DURACION_MINUTOS = MAX_DURACION_ACCION_MINUTOS
+
     user = models.ForeignKey(
         User, 
         on_delete=models.CASCADE, 
@@ -132,7 +401,9 @@ class AgendaAccion(models.Model):
     fecha_hora_inicio = models.DateTimeField(
         verbose_name="Fecha y Hora de Inicio",
     )
-    duracion_minutos = models.PositiveIntegerField(default=30, verbose_name="Duración (minutos)")
+    duracion_minutos = models.PositiveIntegerField(
+        default=30, validators=[MaxValueValidator(MAX_DURACION_ACCION_MINUTOS)], verbose_name="Duración (minutos)",
+    )
     
     tipo = models.CharField(
         max_length=20, 
@@ -150,11 +421,18 @@ class AgendaAccion(models.Model):
         verbose_name_plural = "Acciones de Agenda"
         ordering = ['fecha_hora_inicio']
         indexes = [
-            models.Index(fields=['user']),
+            # Índice compuesto para las consultas por rango de fechas de la agenda de cada usuario
+            models.Index(fields=['user', 'fecha_hora_inicio'], name='jobs_agenda_user_inicio_idx'),
             models.Index(fields=['fecha_hora_inicio']),
             models.Index(fields=['oferta']),
             models.Index(fields=['candidatura']), # Añadido el índice para el nuevo campo en AgendaAccion
         ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(duracion_minutos__lte=MAX_DURACION_ACCION_MINUTOS),
+                name='jobs_agenda_duracion_max',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.titulo} ({self.fecha_hora_inicio.strftime('%Y-%m-%d %H:%M')})"
@@ -163,4 +441,98 @@ class AgendaAccion(models.Model):
     def fecha_hora_fin(self):
         if self.fecha_hora_inicio and self.duracion_minutos:
             return self.fecha_hora_inicio + timezone.timedelta(minutes=self.duracion_minutos)
-        return None
\ No newline at end of file
+        return None
+
+class AgendaCambio(models.Model):
+    """
+    Registro de cambios de la agenda para la sincronización incremental del calendario.
+
+    Hay como mucho una fila por acción: cada cambio borra la anterior y crea una nueva,
+    de modo que el id autoincremental funciona como token de sincronización monótono.
+    Las acciones eliminadas quedan como lápida (eliminada=True).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='agenda_cambios',
+        verbose_name="Usuario"
+    )
+    accion_id = models.PositiveBigIntegerField(unique=True, verbose_name="Acción")
+    eliminada = models.BooleanField(default=False, verbose_name="Eliminada")
+    fecha = models.DateTimeField(auto_now=True, verbose_name="Fecha del cambio")
+
+    class Meta:
+        verbose_name = "Cambio de Agenda"
+        verbose_name_plural = "Cambios de Agenda"
+        indexes = [
+            models.Index(fields=['user', 'id'], name='jobs_agenda_cambio_seq_idx'),
+        ]
+
+    def __str__(self):
+        return f"Acción {self.accion_id} ({'eliminada' if self.eliminada else 'modificada'})"
+
+
+class OutboxEmail(models.Model):
+    """
+    Bandeja de salida de correos. Se escribe en la misma transacción que el cambio
+    que lo provoca y la vacía el comando `send_outbox` en lotes, con reintentos.
+    """
+    class Estado(models.TextChoices):
+        PENDIENTE = 'pendiente', 'Pendiente'
+        ENVIADO = 'enviado', 'Enviado'
+        FALLIDO = 'fallido', 'Fallido'
+
+    candidatura = models.ForeignKey(
+        Candidatura,
+        null=True, blank=True,
+        on_delete=models.SET_NULL,
+        related_name='emails',
+        verbose_name="Candidatura"
+    )
+    destinatario = models.EmailField(verbose_name="Destinatario")
+    asunto = models.CharField(max_length=255, verbose_name="Asunto")
+    cuerpo = models.TextField(verbose_name="Cuerpo")
+    estado = models.CharField(max_length=20, choices=Estado.choices, default=Estado.PENDIENTE, verbose_name="Estado")
+    intentos = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    proximo_intento = models.DateTimeField(default=timezone.now, verbose_name="Próximo intento")
+    ultimo_error = models.TextField(blank=True, verbose_name="Último error")
+    creado = models.DateTimeField(auto_now_add=True, verbose_name="Creado")
+    enviado = models.DateTimeField(null=True, blank=True, verbose_name="Enviado")
+
+    class Meta:
+        verbose_name = "Correo pendiente"
+        verbose_name_plural = "Bandeja de salida"
+        ordering = ['id']
+        indexes = [
+            # El worker busca pendientes cuyo próximo intento ya ha llegado
+            models.Index(fields=['estado', 'proximo_intento'], name='jobs_outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.asunto} -> {self.destinatario} ({self.get_estado_display()})"
+
+
+class TerminosOferta(models.Model):
+    """
+    Pesos de frecuencia de los términos de una oferta (ver jobs/tfidf.py), para
+    las recomendaciones del panel del candidato (jobs/recommendations.py). Se
+    actualiza con las señales de JobOffer y se reconstruye entera con
+    `python manage.py rebuild_recommendations`.
+    """
+    offer = models.OneToOneField(
+        JobOffer, on_delete=models.CASCADE, primary_key=True, related_name='terminos', verbose_name="Oferta"
+    )
+    terminos = models.JSONField(default=dict, verbose_name="Términos")
+    activa = models.BooleanField(default=True, verbose_name="Activa")
+    # El índice en memoria de cada proceso relee solo las filas cambiadas desde su última sincronización
+    actualizado = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Actualizado")
+
+    # Campos de la oferta de los que salen los términos
+    CAMPOS_OFERTA = ('title', 'description', 'requirements', 'category')
+
+    class Meta:
+        verbose_name = "Términos de oferta"
+        verbose_name_plural = "Términos de ofertas"
+
+    def __str__(self):
+        return f"Términos de la oferta {self.offer_id}"
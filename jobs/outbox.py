@@ -0,0 +1,165 @@
+# jobs/outbox.py
+"""
+Bandeja de salida (outbox) de correos a candidatos.
+
+Los cambios de estado de una candidatura encolan un OutboxEmail en su misma
+transacción (ver jobs/signals.py); si la transacción se revierte, el correo
+tampoco existe. El comando `send_outbox` los envía en lotes reutilizando una
+sola conexión SMTP y reprograma los fallos con backoff exponencial.
+"""
+import random
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Candidatura, OutboxEmail
+from .status_messages import renderizar_mensajes
+
+MAX_INTENTOS = getattr(settings, 'JOBS_OUTBOX_MAX_ATTEMPTS', 5)
+BACKOFF_BASE = getattr(settings, 'JOBS_OUTBOX_BACKOFF_BASE', 60)  # segundos
+BACKOFF_MAX = getattr(settings, 'JOBS_OUTBOX_BACKOFF_MAX', 6 * 60 * 60)
+# Tiempo que un lote reclamado queda reservado para el worker que lo tomó
+LEASE = timedelta(seconds=getattr(settings, 'JOBS_OUTBOX_LEASE', 300))
+# Candidaturas que se renderizan e insertan juntas al encolar un cambio masivo
+LOTE_ENCOLADO = 500
+
+
+# --- Encolado ---
+
+def mensaje_cambio_estado(candidatura):
+    """Asunto y cuerpo por defecto del aviso (si el headhunter no tiene plantilla)."""
+    asunto = f"Tu candidatura a {candidatura.offer.title}: {candidatura.get_estado_display()}"
+    cuerpo = (
+        f"Hola {candidatura.user.get_full_name() or candidatura.user.username},\n\n"
+        f"El estado de tu candidatura a \"{candidatura.offer.title}\" en {candidatura.offer.company_name} "
+        f"ha cambiado a: {candidatura.get_estado_display()}.\n"
+    )
+    return asunto, cuerpo
+
+
+def encolar_cambios_estado(candidaturas):
+    """
+    Crea un OutboxEmail por candidatura (con user y offer__created_by ya cargados)
+    en un solo bulk_create. El cuerpo sale de la StatusMessageTemplate del
+    headhunter para el nuevo estado, si existe. Los candidatos sin email se omiten.
+    Devuelve los correos creados.
+    """
+    correos = []
+    for candidatura, plantilla in renderizar_mensajes(candidaturas):
+        if not candidatura.user.email:
+            continue
+        asunto, cuerpo = mensaje_cambio_estado(candidatura)
+        if plantilla is not None:
+            cuerpo = plantilla
+        correos.append(OutboxEmail(
+            candidatura=candidatura,
+            destinatario=candidatura.user.email,
+            asunto=asunto,
+            cuerpo=cuerpo,
+        ))
+    return OutboxEmail.objects.bulk_create(correos, batch_size=500)
+
+
+def encolar_cambios_estado_por_ids(candidatura_ids):
+    """
+    Encola los avisos de un cambio masivo de LOTE_ENCOLADO en LOTE_ENCOLADO
+    candidaturas: se renderizan y se insertan por tramos, así que ni las
+    candidaturas ni los correos se cargan todos a la vez. Devuelve cuántos se crearon.
+    """
+    candidaturas = (
+        Candidatura.objects.filter(id__in=candidatura_ids)
+        .select_related('user', 'offer__created_by')
+        .iterator(chunk_size=LOTE_ENCOLADO)
+    )
+    total = 0
+    while True:
+        lote = list(islice(candidaturas, LOTE_ENCOLADO))
+        if not lote:
+            return total
+        total += len(encolar_cambios_estado(lote))
+
+
+# --- Envío ---
+
+def calcular_backoff(intentos):
+    """Espera antes del siguiente intento: exponencial con jitter, acotada."""
+    espera = min(BACKOFF_BASE * (2 ** max(intentos - 1, 0)), BACKOFF_MAX)
+    return timedelta(seconds=espera * random.uniform(0.8, 1.2))
+
+
+def reclamar_lote(batch_size):
+    """
+    Toma hasta `batch_size` correos pendientes y los reserva moviendo su
+    proximo_intento al futuro (LEASE). Si el worker muere, vuelven a estar
+    disponibles al expirar la reserva.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        pendientes = OutboxEmail.objects.filter(
+            estado=OutboxEmail.Estado.PENDIENTE, proximo_intento__lte=now
+        ).order_by('proximo_intento', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            pendientes = pendientes.select_for_update(skip_locked=True)
+        lote = list(pendientes[:batch_size])
+        if lote:
+            OutboxEmail.objects.filter(id__in=[correo.id for correo in lote]).update(proximo_intento=now + LEASE)
+    return lote
+
+
+def enviar_lote(batch_size=100, mail_connection=None):
+    """
+    Envía un lote por una única conexión de correo. Devuelve (enviados, fallidos).
+    """
+    lote = reclamar_lote(batch_size)
+    if not lote:
+        return 0, 0
+
+    mail_connection = mail_connection or get_connection()
+    enviados, fallidos = [], []
+    try:
+        mail_connection.open()
+    except Exception as exc:
+        # Sin conexión no se puede enviar nada del lote: se reprograma entero
+        fallidos = [(correo, exc) for correo in lote]
+    else:
+        try:
+            for correo in lote:
+                mensaje = EmailMessage(
+                    correo.asunto, correo.cuerpo, settings.DEFAULT_FROM_EMAIL, [correo.destinatario],
+                    connection=mail_connection,
+                )
+                try:
+                    mensaje.send()
+                except Exception as exc:
+                    fallidos.append((correo, exc))
+                else:
+                    enviados.append(correo)
+        finally:
+            mail_connection.close()
+
+    now = timezone.now()
+    if enviados:
+        OutboxEmail.objects.filter(id__in=[correo.id for correo in enviados]).update(
+            estado=OutboxEmail.Estado.ENVIADO, enviado=now, ultimo_error=''
+        )
+    for correo, exc in fallidos:
+        correo.intentos += 1
+        correo.ultimo_error = f"{type(exc).__name__}: {exc}"
+        if correo.intentos >= MAX_INTENTOS:
+            correo.estado = OutboxEmail.Estado.FALLIDO
+        else:
+            correo.proximo_intento = now + calcular_backoff(correo.intentos)
+    if fallidos:
+        OutboxEmail.objects.bulk_update(
+            [correo for correo, _ in fallidos], ['intentos', 'ultimo_error', 'estado', 'proximo_intento']
+        )
+    return len(enviados), len(fallidos)
+
+
+def profundidad():
+    """Correos pendientes de enviar (incluidos los que esperan reintento)."""
+    return OutboxEmail.objects.filter(estado=OutboxEmail.Estado.PENDIENTE).count()
@@ -0,0 +1,124 @@
+# jobs/pagination.py
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(Exception):
+    """El token de paginación no se puede decodificar."""
+
+
+class KeysetPage:
+    """
+    Página devuelta por KeysetPaginator. Expone la misma interfaz mínima que
+    django.core.paginator.Page que usan las plantillas (has_next, has_previous...).
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginación por cursor sobre (key_field, id) en orden descendente.
+
+    A diferencia de OFFSET, cada página es un rango sobre el índice compuesto,
+    por lo que el coste no crece con la profundidad de la página. Los tokens
+    "next"/"previous" codifican la posición del primer/último elemento visible.
+    """
+
+    def __init__(self, queryset, per_page, key_field='created_at'):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.key_field = key_field
+        # La clave puede ser una fecha (created_at, updated_at) o un entero (salary_max)
+        internal_type = queryset.model._meta.get_field(key_field).get_internal_type()
+        self.key_is_date = internal_type in ('DateTimeField', 'DateField')
+
+    # --- Codificación de cursores ---
+
+    def encode_cursor(self, obj, direction):
+        key = getattr(obj, self.key_field)
+        payload = {
+            'd': direction,
+            'k': key.isoformat() if self.key_is_date else key,
+            'id': obj.pk,
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            direction = payload['d']
+            key = parse_datetime(payload['k']) if self.key_is_date else int(payload['k'])
+            pk = int(payload['id'])
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise InvalidCursor(cursor)
+        if direction not in ('n', 'p') or key is None:
+            raise InvalidCursor(cursor)
+        if not self.key_is_date and not -2 ** 63 <= key < 2 ** 63:
+            raise InvalidCursor(cursor)  # No cabe en un entero de la base de datos
+        return direction, key, pk
+
+    # --- Consulta ---
+
+    def page(self, cursor=None):
+        """
+        Devuelve la página que sigue (o precede) al cursor. Sin cursor, la primera.
+        Se pide un elemento extra para saber si hay más allá del límite.
+        """
+        key = self.key_field
+        limit = self.per_page + 1
+
+        if not cursor:
+            rows = list(self.queryset.order_by(f'-{key}', '-id')[:limit])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            return self._build_page(rows, has_next=has_more, has_previous=False)
+
+        direction, value, pk = self.decode_cursor(cursor)
+        if direction == 'n':
+            qs = self.queryset.filter(
+                Q(**{f'{key}__lt': value}) | Q(**{key: value, 'id__lt': pk})
+            ).order_by(f'-{key}', '-id')
+            rows = list(qs[:limit])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            return self._build_page(rows, has_next=has_more, has_previous=True)
+
+        # Hacia atrás: se recorre el índice en orden ascendente y se invierte.
+        qs = self.queryset.filter(
+            Q(**{f'{key}__gt': value}) | Q(**{key: value, 'id__gt': pk})
+        ).order_by(key, 'id')
+        rows = list(qs[:limit])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return self._build_page(rows, has_next=True, has_previous=has_more)
+
+    def _build_page(self, rows, has_next, has_previous):
+        next_cursor = self.encode_cursor(rows[-1], 'n') if rows and has_next else None
+        previous_cursor = self.encode_cursor(rows[0], 'p') if rows and has_previous else None
+        return KeysetPage(rows, next_cursor=next_cursor, previous_cursor=previous_cursor)
@@ -0,0 +1,84 @@
+# jobs/profiling.py
+"""
+Perfiles de cProfile guardados por RequestProfilerMiddleware. Cada perfil es un
+fichero .prof (formato de pstats) en JOBS_PROFILE_DIR llamado
+
+    <fecha>__<ruta>__u<id de usuario>__<ms>ms.prof
+
+para poder filtrarlos por ruta o usuario sin abrirlos (`manage.py profiles`).
+"""
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+PROFILE_DIR = Path(getattr(settings, 'JOBS_PROFILE_DIR', 'profiles'))
+
+# Se borran los más antiguos al pasar de este número de ficheros
+PROFILE_MAX_FILES = getattr(settings, 'JOBS_PROFILE_MAX_FILES', 200)
+
+FORMATO_FECHA = '%Y%m%dT%H%M%S%f'
+_NOMBRE = re.compile(r'^(?P<fecha>\d{8}T\d{12})__(?P<ruta>.+)__u(?P<usuario>\d+|-)__(?P<ms>\d+)ms\.prof$')
+
+
+class Perfil:
+    """Un fichero de perfil y los datos de su nombre."""
+
+    def __init__(self, ruta_fichero, fecha, ruta, usuario, ms):
+        self.ruta_fichero = ruta_fichero
+        self.fecha = fecha
+        self.ruta = ruta
+        self.usuario = usuario
+        self.ms = ms
+
+
+def nombre_ruta(ruta):
+    """Nombre de URL apto para un fichero: 'admin:jobs_joboffer_change' -> 'admin.jobs_joboffer_change'."""
+    return re.sub(r'[^\w.-]', '.', ruta)
+
+
+def guardar(perfil, ruta, usuario_id, ms):
+    """Escribe el perfil (un cProfile.Profile ya parado) y devuelve el nombre del fichero."""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    fecha = timezone.now().strftime(FORMATO_FECHA)
+    nombre = f'{fecha}__{nombre_ruta(ruta)}__u{usuario_id or "-"}__{round(ms)}ms.prof'
+    perfil.dump_stats(PROFILE_DIR / nombre)
+    limpiar(PROFILE_MAX_FILES)
+    return nombre
+
+
+def listar(ruta=None, usuario=None):
+    """Perfiles guardados (del más antiguo al más reciente), opcionalmente filtrados."""
+    if not PROFILE_DIR.is_dir():
+        return []
+    perfiles = []
+    for fichero in PROFILE_DIR.iterdir():
+        m = _NOMBRE.match(fichero.name)
+        if not m:
+            continue
+        perfil = Perfil(
+            ruta_fichero=fichero,
+            fecha=datetime.strptime(m['fecha'], FORMATO_FECHA),
+            ruta=m['ruta'],
+            usuario=None if m['usuario'] == '-' else int(m['usuario']),
+            ms=int(m['ms']),
+        )
+        if ruta is not None and perfil.ruta != nombre_ruta(ruta):
+            continue
+        if usuario is not None and perfil.usuario != usuario:
+            continue
+        perfiles.append(perfil)
+    return sorted(perfiles, key=lambda perfil: perfil.fecha)
+
+
+def limpiar(maximo):
+    """Deja como mucho `maximo` perfiles, borrando los más antiguos."""
+    perfiles = listar()
+    for perfil in perfiles[:max(len(perfiles) - maximo, 0)]:
+        try:
+            os.remove(perfil.ruta_fichero)
+        except FileNotFoundError:
+            pass  # Otro worker lo ha borrado a la vez
@@ -0,0 +1,390 @@
+# jobs/recommendations.py
+"""
+Ofertas recomendadas en el panel del candidato: las ofertas activas más
+parecidas, por similitud del coseno entre vectores TF-IDF, a las ofertas a las
+que ya se ha inscrito.
+
+Los pesos de frecuencia de cada oferta (jobs/tfidf.py) se guardan en
+TerminosOferta al guardar la oferta (ver jobs/signals.py), y
+`python manage.py rebuild_recommendations` los recalcula todos. Cada proceso
+mantiene en memoria la matriz ofertas x términos en arrays de NumPy y la pone
+al día de forma incremental: cuando cambia la versión en la caché relee solo
+las filas con `actualizado` posterior a su última sincronización. Una consulta
+es un producto matriz-vector sobre esos arrays, sin bucles en Python por oferta.
+Tanto la primera carga como las sincronizaciones se hacen en un hilo aparte: la
+petición que ve una versión nueva sirve la matriz anterior (o ninguna
+recomendación, en la primera carga) y no espera.
+"""
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import fragments
+from .db import con_reintentos
+from .models import JobOffer, TerminosOferta
+from .tfidf import terminos_oferta, terminos_ofertas
+
+VERSION_KEY = 'jobs:recommendations:version'
+# Cambia solo al borrar una oferta: las filas borradas no aparecen entre las
+# actualizadas, así que la sincronización que lo ve recarga la matriz entera
+BORRADAS_KEY = 'jobs:recommendations:borradas'
+
+LIMITE = getattr(settings, 'JOBS_RECOMMENDATIONS_LIMIT', 6)
+# Filas que se vuelven a leer en cada sincronización por si su transacción se
+# confirmó después de la lectura anterior (las que no cambiaron se descartan)
+MARGEN = timedelta(seconds=60)
+# Con una cola de entradas añadidas mayor que esta fracción de las ordenadas, la
+# sincronización recarga la matriz entera (y se descartan las filas anuladas)
+FRACCION_RECARGA = 0.25
+# Términos presentes en más de esta fracción de las ofertas no distinguen unas de
+# otras ("desarrollador", "madrid"...): pesan 0, como max_df en scikit-learn.
+# Además acortan las consultas, que solo recorren las entradas de sus términos.
+MAX_DF = 0.5
+
+CAMPOS_LECTURA = ('offer_id', 'terminos', 'activa', 'actualizado')
+
+
+def get_version():
+    return fragments._get_or_init(VERSION_KEY)
+
+
+def bump_version():
+    fragments._bump(VERSION_KEY)
+
+
+def get_borradas():
+    return fragments._get_or_init(BORRADAS_KEY)
+
+
+def oferta_borrada():
+    """Tras borrar una oferta (sus términos se van en cascada)."""
+    fragments._bump(BORRADAS_KEY)
+    bump_version()
+
+
+# --- Términos guardados ---
+
+def guardar_terminos(filas):
+    """Inserta o actualiza TerminosOferta para filas (offer_id, terminos, activa) en una sola sentencia."""
+    TerminosOferta.objects.bulk_create(
+        [TerminosOferta(offer_id=offer_id, terminos=terminos, activa=activa) for offer_id, terminos, activa in filas],
+        update_conflicts=True,
+        unique_fields=['offer'],
+        update_fields=['terminos', 'activa', 'actualizado'],
+    )
+
+
+def indexar_oferta(offer, update_fields=None):
+    """Recalcula los términos de la oferta si cambió alguno de sus campos de texto o `is_active`."""
+    if update_fields is not None and not {*TerminosOferta.CAMPOS_OFERTA, 'is_active'} & set(update_fields):
+        return
+    textos = [getattr(offer, campo) for campo in TerminosOferta.CAMPOS_OFERTA]
+    guardar_terminos([(offer.pk, terminos_oferta(*textos), offer.is_active)])
+    # Tras confirmar: un proceso que sincronice antes no vería aún la fila
+    transaction.on_commit(bump_version)
+
+
+def _lotes(batch_size):
+    """Filas (id, title, description, requirements, category, is_active) de todas las ofertas, por lotes de id."""
+    ultimo_id = 0
+    while True:
+        lote = list(
+            JobOffer.objects.filter(pk__gt=ultimo_id).order_by('pk')
+            .values_list('id', *TerminosOferta.CAMPOS_OFERTA, 'is_active')[:batch_size]
+        )
+        if not lote:
+            return
+        ultimo_id = lote[-1][0]
+        yield lote
+
+
+def reconstruir(workers=1, batch_size=1000):
+    """
+    Recalcula los términos de todas las ofertas y devuelve cuántas son. Con
+    workers > 1 la tokenización se reparte entre procesos, arrancados con
+    'spawn' para que no hereden la conexión a la base de datos (solo importan
+    jobs.tfidf); la lectura y las escrituras siguen en este proceso.
+    """
+    def guardar(lote, resultados):
+        activas = {fila[0]: fila[-1] for fila in lote}
+        con_reintentos(guardar_terminos)([
+            (offer_id, terminos, activas[offer_id]) for offer_id, terminos in resultados
+        ])
+        return len(lote)
+
+    total = 0
+    if workers <= 1:
+        for lote in _lotes(batch_size):
+            total += guardar(lote, terminos_ofertas([fila[:-1] for fila in lote]))
+    else:
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=contexto) as pool:
+            pendientes = deque()
+            for lote in _lotes(batch_size):
+                pendientes.append((lote, pool.submit(terminos_ofertas, [fila[:-1] for fila in lote])))
+                # Dos lotes en vuelo por proceso: la memoria no crece con el tamaño de la tabla
+                if len(pendientes) >= 2 * workers:
+                    lote, futuro = pendientes.popleft()
+                    total += guardar(lote, futuro.result())
+            while pendientes:
+                lote, futuro = pendientes.popleft()
+                total += guardar(lote, futuro.result())
+    transaction.on_commit(bump_version)
+    return total
+
+
+# --- Matriz en memoria ---
+
+class Indice:
+    """
+    Matriz dispersa ofertas x términos en formato de coordenadas (fila, columna,
+    peso). Las entradas de cada fila son contiguas. Al cambiar una oferta se añade
+    una fila nueva al final y la anterior queda anulada (peso 0); las filas
+    anuladas desaparecen en la siguiente recarga completa.
+
+    Tras una recarga completa se guarda además el orden de las entradas por
+    columna (como una matriz CSC): una consulta recorre solo las entradas de sus
+    propios términos, más la cola de entradas añadidas desde la recarga.
+
+    Una vez publicado en el proceso no se modifica: la sincronización construye
+    uno nuevo, así que las consultas en curso no necesitan bloqueo.
+    """
+
+    def __init__(self):
+        self.vocabulario = {}    # término -> columna
+        self.fila_de = {}        # offer_id -> fila vigente
+        self.marcas = {}         # offer_id -> `actualizado` de su fila vigente
+        self.ofertas = np.zeros(0, np.int64)     # fila -> offer_id
+        self.vigentes = np.zeros(0, bool)        # fila -> es la última versión de su oferta
+        self.activas = np.zeros(0, bool)         # fila -> vigente y de una oferta activa
+        self.inicios = np.zeros(1, np.int64)     # entradas de la fila f: inicios[f]:inicios[f + 1]
+        self.filas = np.zeros(0, np.int32)
+        self.columnas = np.zeros(0, np.int32)
+        self.tf = np.zeros(0, np.float32)
+        self.pesos = np.zeros(0, np.float32)     # tf * idf, normalizado por fila
+        self.base = 0                            # entradas cubiertas por el orden por columna
+        self.orden = np.zeros(0, np.int64)       # entradas [:base] ordenadas por columna
+        self.filas_columna = np.zeros(0, np.int32)   # filas[orden]
+        self.pesos_columna = np.zeros(0, np.float32)  # pesos[orden], se rehace al cambiar el IDF
+        self.inicios_columna = np.zeros(1, np.int64)  # entradas de la columna c: inicios_columna[c]:[c + 1]
+        self.version = None
+        self.borradas = None
+        self.sincronizado = None
+
+    def cola(self):
+        """Entradas añadidas desde la última recarga completa."""
+        return len(self.filas) - self.base
+
+    def con_cambios(self, cambios):
+        """Nuevo Indice con las filas (offer_id, terminos, activa, actualizado) aplicadas."""
+        nuevo = Indice()
+        nuevo.vocabulario = dict(self.vocabulario)
+        nuevo.fila_de = dict(self.fila_de)
+        nuevo.marcas = dict(self.marcas)
+        nuevo.base, nuevo.orden, nuevo.inicios_columna = self.base, self.orden, self.inicios_columna
+        nuevo.filas_columna = self.filas_columna
+        total = len(self.ofertas)
+
+        ofertas, activas, largos, columnas, tf, viejas = [], [], [], [], [], []
+        for offer_id, terminos, activa, actualizado in cambios:
+            if nuevo.marcas.get(offer_id) == actualizado:
+                continue
+            if offer_id in nuevo.fila_de:
+                viejas.append(nuevo.fila_de[offer_id])
+            nuevo.fila_de[offer_id] = total + len(ofertas)
+            nuevo.marcas[offer_id] = actualizado
+            ofertas.append(offer_id)
+            activas.append(activa)
+            largos.append(len(terminos))
+            for termino, peso in terminos.items():
+                columnas.append(nuevo.vocabulario.setdefault(termino, len(nuevo.vocabulario)))
+                tf.append(peso)
+
+        nuevas = np.arange(total, total + len(ofertas), dtype=np.int32)
+        nuevo.ofertas = np.concatenate([self.ofertas, np.array(ofertas, np.int64)])
+        nuevo.vigentes = np.concatenate([self.vigentes, np.ones(len(ofertas), bool)])
+        nuevo.activas = np.concatenate([self.activas, np.array(activas, bool)])
+        nuevo.vigentes[viejas] = False
+        nuevo.activas[viejas] = False
+        nuevo.inicios = np.concatenate([self.inicios, self.inicios[-1] + np.cumsum(largos, dtype=np.int64)])
+        nuevo.filas = np.concatenate([self.filas, np.repeat(nuevas, largos)])
+        nuevo.columnas = np.concatenate([self.columnas, np.array(columnas, np.int32)])
+        nuevo.tf = np.concatenate([self.tf, np.array(tf, np.float32)])
+        nuevo._ponderar()
+        return nuevo
+
+    def _ponderar(self):
+        # IDF sobre las filas vigentes (también las de ofertas inactivas: siguen siendo
+        # texto de ofertas), con el suavizado habitual 1 + log((1 + n) / (1 + df))
+        entradas_vigentes = self.vigentes[self.filas]
+        df = np.bincount(self.columnas[entradas_vigentes], minlength=len(self.vocabulario))
+        n = int(self.vigentes.sum())
+        idf = np.log((1 + n) / (1 + df)) + 1
+        if n >= 1 / (1 - MAX_DF):
+            idf[df > MAX_DF * n] = 0
+        pesos = self.tf * idf[self.columnas] * entradas_vigentes
+        normas = np.sqrt(np.bincount(self.filas, weights=pesos * pesos, minlength=len(self.ofertas)))
+        normas[normas == 0] = 1
+        self.pesos = (pesos / normas[self.filas]).astype(np.float32)
+        self.pesos_columna = self.pesos[self.orden]
+
+    def ordenar(self):
+        """Copia por columna todas las entradas actuales (tras una recarga completa)."""
+        self.base = len(self.columnas)
+        self.orden = np.argsort(self.columnas, kind='stable')
+        self.filas_columna = self.filas[self.orden]
+        self.pesos_columna = self.pesos[self.orden]
+        self.inicios_columna = np.searchsorted(
+            self.columnas[self.orden], np.arange(len(self.vocabulario) + 1), side='left'
+        )
+        return self
+
+    def vector(self, offer_ids):
+        """Suma de los vectores normalizados de esas ofertas (el perfil del candidato), sobre el vocabulario."""
+        entradas = [
+            np.arange(self.inicios[fila], self.inicios[fila + 1])
+            for fila in (self.fila_de.get(offer_id) for offer_id in offer_ids) if fila is not None
+        ]
+        if not entradas:
+            return None
+        entradas = np.concatenate(entradas)
+        return np.bincount(self.columnas[entradas], weights=self.pesos[entradas], minlength=len(self.vocabulario))
+
+    def productos(self, consulta):
+        """Producto escalar de cada fila con el vector de consulta."""
+        # Parte ordenada: solo los tramos de las columnas de la consulta, concatenados sin bucle
+        columnas = np.flatnonzero(consulta[:len(self.inicios_columna) - 1])
+        inicios = self.inicios_columna[columnas]
+        largos = self.inicios_columna[columnas + 1] - inicios
+        posiciones = np.repeat(inicios - np.cumsum(largos) + largos, largos) + np.arange(int(largos.sum()))
+        productos = np.zeros(len(self.ofertas))
+        productos += np.bincount(
+            self.filas_columna[posiciones],
+            weights=self.pesos_columna[posiciones] * np.repeat(consulta[columnas], largos),
+            minlength=len(self.ofertas),
+        )
+        # Cola añadida desde la recarga: se recorre entera
+        if self.base < len(self.filas):
+            cola = slice(self.base, None)
+            productos += np.bincount(
+                self.filas[cola], weights=self.pesos[cola] * consulta[self.columnas[cola]],
+                minlength=len(self.ofertas),
+            )
+        return productos
+
+    def similares(self, offer_ids, excluir=(), limite=LIMITE):
+        """[(offer_id, similitud)] de las ofertas activas más parecidas a offer_ids, de mayor a menor."""
+        consulta = self.vector(offer_ids)
+        norma = np.linalg.norm(consulta) if consulta is not None else 0
+        if not norma:
+            return []
+        puntos = self.productos(consulta)
+        puntos /= norma
+        puntos[~self.activas] = 0
+        puntos[[self.fila_de[offer_id] for offer_id in excluir if offer_id in self.fila_de]] = 0
+        candidatas = np.flatnonzero(puntos > 0)
+        if len(candidatas) > limite:
+            candidatas = candidatas[np.argpartition(puntos[candidatas], -limite)[-limite:]]
+        candidatas = candidatas[np.argsort(-puntos[candidatas], kind='stable')]
+        return [(int(self.ofertas[fila]), float(puntos[fila])) for fila in candidatas]
+
+
+_indice = None
+_lock = threading.Lock()
+_hilo = None
+
+
+def get_indice():
+    """
+    Matriz del proceso. Si la versión de la caché es otra, la sincronización se
+    lanza en segundo plano y se devuelve la matriz anterior (None durante la
+    primera carga).
+    """
+    indice = _indice
+    if indice is None or indice.version != get_version():
+        _sincronizar_en_segundo_plano()
+    return indice
+
+
+def cargar():
+    """Carga o sincroniza la matriz en este hilo (espera a la carga en curso, si la hay)."""
+    with _lock:
+        return _actualizar()
+
+
+def _actualizar():
+    global _indice
+    # Las versiones se leen antes que las filas: un cambio posterior deja otra versión
+    version, borradas = get_version(), get_borradas()
+    if _indice is None or _indice.version != version:
+        _indice = _sincronizar(_indice, version, borradas)
+    return _indice
+
+
+def _sincronizar_en_segundo_plano():
+    global _hilo
+    # Si dos peticiones lanzan a la vez su hilo, el segundo encuentra la matriz ya al día
+    if _hilo is None or not _hilo.is_alive():
+        _hilo = threading.Thread(target=_cargar_y_cerrar, name='jobs-recomendaciones', daemon=True)
+        _hilo.start()
+
+
+def _cargar_y_cerrar():
+    try:
+        cargar()
+    finally:
+        # El hilo no pasa por el ciclo de una petición: su conexión no la cierra nadie más
+        connection.close()
+
+
+def _sincronizar(indice, version, borradas):
+    desde = timezone.now() - MARGEN
+    filas = TerminosOferta.objects.order_by()
+    cambios = filas.filter(actualizado__gte=indice.sincronizado) if indice is not None else filas
+    if (
+        indice is None
+        # Se ha borrado alguna oferta: sus filas no aparecen entre los cambios
+        or indice.borradas != borradas
+        or indice.cola() > FRACCION_RECARGA * indice.base
+        # Tras una reconstrucción completa (o una carga masiva) sale más barato leerlo todo
+        or cambios.count() > FRACCION_RECARGA * len(indice.fila_de)
+    ):
+        indice = _recargar(filas)
+    else:
+        indice = indice.con_cambios(cambios.values_list(*CAMPOS_LECTURA).iterator(chunk_size=5000))
+    indice.version, indice.borradas, indice.sincronizado = version, borradas, desde
+    return indice
+
+
+def _recargar(filas):
+    return Indice().con_cambios(filas.values_list(*CAMPOS_LECTURA).iterator(chunk_size=5000)).ordenar()
+
+
+def reiniciar():
+    """Descarta la matriz del proceso: la siguiente consulta lanza otra vez la carga entera."""
+    global _indice, _hilo
+    with _lock:
+        _indice, _hilo = None, None
+
+
+def recomendar(aplicadas, limite=LIMITE):
+    """
+    [(offer_id, similitud)] de las ofertas activas más parecidas a las ofertas
+    `aplicadas`, sin incluirlas; ninguna mientras la matriz se carga. Hasta que
+    termina la sincronización en segundo plano se usa la matriz anterior, con
+    ofertas que quizá ya se han borrado: quien las muestra las cruza con la base
+    de datos.
+    """
+    if not aplicadas:
+        return []
+    indice = get_indice()
+    if indice is None:
+        return []
+    return indice.similares(aplicadas, excluir=aplicadas, limite=limite)
@@ -0,0 +1,129 @@
+# jobs/routers.py
+"""
+Reparto de consultas entre la base de datos principal y las réplicas de lectura.
+
+Las escrituras van siempre a `default`; las lecturas, a una réplica al azar. Para
+que cada usuario lea lo que acaba de escribir, las lecturas vuelven a `default`:
+  - durante el resto de la petición en la que se escribe algo (el execute_wrapper
+    que instala ReplicaPinningMiddleware),
+  - durante JOBS_REPLICA_PIN_SECONDS después (cookie de ReplicaPinningMiddleware),
+  - dentro de una transacción abierta en `default`,
+  - dentro de `with en_primario():`.
+
+Lo que se guarda en caché se lee con `with lectura_para_cache(clave):`. Va a una
+réplica, salvo que la clave (la versión o la propia entrada) haya cambiado hace
+menos de JOBS_REPLICA_PIN_SECONDS: una réplica atrasada quedaría guardada bajo la
+versión nueva. Quien invalida la clave lo anota con marcar_cambio().
+
+Sin réplicas configuradas (el caso por defecto) todo va a `default`.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Apps cuyas lecturas van siempre a la principal (la sesión recién creada al
+# iniciar sesión tiene que encontrarse en la petición siguiente)
+PRIMARY_ONLY_APPS = set(getattr(settings, 'JOBS_PRIMARY_ONLY_APPS', ('sessions',)))
+# Retraso máximo de las réplicas (el mismo que cubre la cookie de ReplicaPinningMiddleware)
+RETRASO_REPLICAS = getattr(settings, 'JOBS_REPLICA_PIN_SECONDS', 5)
+
+_ESCRITURAS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_fijado = ContextVar('jobs_db_fijado', default=False)
+_escrito = ContextVar('jobs_db_escrito', default=False)
+
+
+def fijar_primario(fijado=True):
+    """Fija (o libera) las lecturas en la principal. Devuelve tokens para restaurar()."""
+    return _fijado.set(fijado), _escrito.set(False)
+
+
+def restaurar(tokens):
+    fijado, escrito = tokens
+    _fijado.reset(fijado)
+    _escrito.reset(escrito)
+
+
+def ha_escrito():
+    """True si desde fijar_primario() se ha ejecutado alguna escritura (ver registrar_escrituras)."""
+    return _escrito.get()
+
+
+def registrar_escrituras(execute, sql, params, many, context):
+    """execute_wrapper de ReplicaPinningMiddleware: tras una escritura, el resto de la petición lee de la principal."""
+    if sql.lstrip()[:7].upper().startswith(_ESCRITURAS):
+        _fijado.set(True)
+        _escrito.set(True)
+    return execute(sql, params, many, context)
+
+
+@contextmanager
+def en_primario():
+    token = _fijado.set(True)
+    try:
+        yield
+    finally:
+        _fijado.reset(token)
+
+
+def hay_replicas():
+    return len(settings.DATABASES) > 1
+
+
+def marca_cambio_key(clave):
+    return f'{clave}:reciente'
+
+
+def marcar_cambio(*claves):
+    """Anota que las claves de caché acaban de invalidarse (ver lectura_para_cache)."""
+    if hay_replicas() and claves:
+        cache.set_many({marca_cambio_key(clave): 1 for clave in claves}, RETRASO_REPLICAS)
+
+
+@contextmanager
+def lectura_para_cache(*claves):
+    """
+    Lecturas que se guardarán en caché bajo `claves`: de una réplica, o de la
+    principal si alguna clave ha cambiado hace menos de RETRASO_REPLICAS.
+    """
+    if hay_replicas() and cache.get_many([marca_cambio_key(clave) for clave in claves]):
+        with en_primario():
+            yield
+    else:
+        yield
+
+
+class PrimaryReplicaRouter:
+    def __init__(self):
+        self.replicas = [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+        self.aliases = {DEFAULT_DB_ALIAS, *self.replicas}
+
+    def db_for_read(self, model, **hints):
+        if (
+            not self.replicas
+            or _fijado.get()
+            or model._meta.app_label in PRIMARY_ONLY_APPS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in self.aliases:
+            # Relaciones de un objeto: se leen de la misma base de datos que él
+            return instance._state.db
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if obj1._state.db in self.aliases and obj2._state.db in self.aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema con la copia (sync_sqlite_replicas)
+        return db == DEFAULT_DB_ALIAS
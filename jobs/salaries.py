@@ -0,0 +1,193 @@
+# jobs/salaries.py
+"""
+Salario estructurado de las ofertas a partir del texto libre de `salary`
+("30.000 - 40.000 €", "45k-55k EUR", "USD 3000/mes", "A convenir"...).
+
+parsear() devuelve el mínimo y el máximo en importe ANUAL (para poder comparar
+ofertas por mes y por año con el mismo índice), la moneda y el periodo en que
+venía expresado. JobOffer.save() lo aplica en cada guardado y
+`python manage.py backfill_salaries` rellena las filas existentes o las
+escritas sin pasar por save() (bulk_create, queryset.update).
+
+También aquí los filtros del listado por rango de salario y el orden por
+salario, que se resuelven con el índice jobs_offer_salary_feed_idx.
+"""
+import re
+from urllib.parse import urlencode
+
+# Periodo -> veces al año. Las jornadas y horas son las de un año laboral estándar.
+PERIODOS = {
+    'year': 1,
+    'month': 12,
+    'week': 52,
+    'day': 220,
+    'hour': 1760,
+}
+
+# Por orden de prioridad: "€/mes" gana a un "anual" que aparezca más adelante
+_PATRONES_PERIODO = [
+    ('hour', re.compile(r'/\s*h(?:ora)?\b|\bhora|\bhour')),
+    ('day', re.compile(r'/\s*d[ií]a\b|\bd[ií]a\b|\bdiari|\bday\b|\bdaily')),
+    ('week', re.compile(r'semana|\bweek')),
+    ('month', re.compile(r'/\s*mes\b|\bmes\b|\bmeses\b|mensual|\bmonth')),
+    ('year', re.compile(r'/\s*a[ñn]o\b|\ba[ñn]o\b|\banual|\byear|\bannual|\bbrutos?\b|\bk\b|\d\s*k\b')),
+]
+
+MONEDAS = {
+    'EUR': re.compile(r'€|\beur\b|\beuros?\b'),
+    'USD': re.compile(r'\$|\busd\b|\bd[oó]lar'),
+    'GBP': re.compile(r'£|\bgbp\b|\blibras?\b'),
+}
+MONEDA_POR_DEFECTO = 'EUR'
+
+# "30.000", "30,000", "30 000", "2.500,50", "45k", "30 mil"
+_IMPORTE = r'(\d{1,3}(?:[.,\s]\d{3})+|\d+)(?:[.,](\d{1,2}))?(?!\d)(?:\s*(k|mil)(?![a-z]))?'
+# Un importe suelto que no sea un porcentaje ("bonus 10%")
+_NUMERO = re.compile(rf'(?<![\d.,]){_IMPORTE}(?!\s*%)')
+# Rango explícito: "30-35k", "30.000 € - 40.000 €", "de 30.000 a 40.000", "entre 24 y 28k"
+_SIMBOLO = r'(?:\s*(?:€|\$|£|eur\b|euros\b|usd\b|gbp\b))?'
+_RANGO = re.compile(
+    rf'(?<![\d.,]){_IMPORTE}{_SIMBOLO}(?:\s*[-–—]\s*|\s+(?:a|hasta|to|y)\s+){_SIMBOLO}\s*{_IMPORTE}(?!\s*%)'
+)
+_PAGAS = re.compile(r'(\d{1,2})\s*pagas')
+_MONEDA_ANTES = re.compile(r'(?:€|\$|£|\beur|\busd|\bgbp)\s*$')
+_MONEDA_DESPUES = re.compile(r'\s*(?:€|\$|£|eur|usd|gbp|euros?|d[oó]lar|libras?|/\s*[a-z])')
+
+# Importes anuales fuera de este rango se consideran un error de lectura
+ANUAL_MINIMO = 1000
+ANUAL_MAXIMO = 5_000_000
+
+CAMPOS = ('salary_min', 'salary_max', 'salary_currency', 'salary_period')
+VACIO = {'salary_min': None, 'salary_max': None, 'salary_currency': '', 'salary_period': ''}
+
+
+def _valor(entero, decimales, multiplicador):
+    valor = float(re.sub(r'[.,\s]', '', entero) + ('.' + decimales if decimales else ''))
+    return valor * 1000 if multiplicador else valor
+
+
+def _parece_anio(entero, decimales, multiplicador):
+    return entero.isdigit() and not decimales and not multiplicador and 1900 <= int(entero) <= 2100
+
+
+def _junto_a_moneda(texto, coincidencia):
+    """"2000 €/mes" es un importe aunque parezca un año; "revisión 2025" no."""
+    return bool(
+        _MONEDA_ANTES.search(texto, 0, coincidencia.start()) or _MONEDA_DESPUES.match(texto, coincidencia.end())
+    )
+
+
+def _importes(texto):
+    """
+    [mínimo, máximo] del primer rango explícito o [importe] del primer número
+    suelto. Se saltan los porcentajes y los años ("revisión 2025") que no van
+    junto a una moneda.
+    """
+    rango = _RANGO.search(texto)
+    if rango:
+        inicio, fin = rango.groups()[:3], rango.groups()[3:]
+        if not ((_parece_anio(*inicio) or _parece_anio(*fin)) and not _junto_a_moneda(texto, rango)):
+            minimo, maximo = _valor(*inicio), _valor(*fin)
+            # "30-35k": el multiplicador de un extremo vale también para el otro
+            if fin[2] and not inicio[2] and minimo < 1000:
+                minimo *= 1000
+            if inicio[2] and not fin[2] and maximo < 1000:
+                maximo *= 1000
+            return [minimo, maximo]
+    for numero in _NUMERO.finditer(texto):
+        if _parece_anio(*numero.groups()) and not _junto_a_moneda(texto, numero):
+            continue
+        valor = _valor(*numero.groups())
+        if valor > 0:
+            return [valor]
+    return []
+
+
+def _periodo(texto, importe):
+    for periodo, patron in _PATRONES_PERIODO:
+        if patron.search(texto):
+            return periodo
+    # Sin periodo explícito se deduce del importe
+    if importe >= 10000:
+        return 'year'
+    if importe >= 400:
+        return 'month'
+    return 'hour'
+
+
+def parsear(texto):
+    """
+    {salary_min, salary_max, salary_currency, salary_period} a partir del texto.
+    Importes anuales en la moneda de la oferta; VACIO si no hay un salario legible
+    ("Negociable", "A convenir"...). Con un solo importe, mínimo y máximo coinciden.
+    """
+    texto = (texto or '').lower()
+    pagas = _PAGAS.search(texto)
+    texto_importes = _PAGAS.sub(' ', texto)
+    importes = _importes(texto_importes)
+    if not importes:
+        return dict(VACIO)
+    minimo, maximo = min(importes), max(importes)
+
+    periodo = _periodo(texto_importes, maximo)
+    veces = PERIODOS[periodo]
+    if periodo == 'month' and pagas:
+        veces = int(pagas.group(1))
+    minimo, maximo = round(minimo * veces), round(maximo * veces)
+    if minimo < ANUAL_MINIMO or maximo > ANUAL_MAXIMO:
+        return dict(VACIO)
+
+    moneda = next((codigo for codigo, patron in MONEDAS.items() if patron.search(texto)), MONEDA_POR_DEFECTO)
+    return {'salary_min': minimo, 'salary_max': maximo, 'salary_currency': moneda, 'salary_period': periodo}
+
+
+# --- Filtros del listado ---
+
+def _entero(valor):
+    try:
+        return min(max(0, int(valor)), ANUAL_MAXIMO)
+    except (TypeError, ValueError):
+        return None
+
+
+def leer_filtros(params):
+    """
+    Rango de salario anual (?salario_min=, ?salario_max=), ?moneda= y ?orden=salario.
+    Lo que no es válido se ignora; la moneda solo se fija si hay rango u orden.
+    Un rango implica el orden por salario: las páginas son entonces un tramo de
+    jobs_offer_salary_feed_idx, mientras que por fecha habría que ordenar todas
+    las ofertas del rango en cada página.
+    """
+    filtros = {}
+    for nombre in ('salario_min', 'salario_max'):
+        valor = _entero(params.get(nombre))
+        if valor:
+            filtros[nombre] = valor
+    if filtros or params.get('orden') == 'salario':
+        filtros['orden'] = 'salario'
+    if filtros:
+        moneda = params.get('moneda', '').upper()
+        filtros['moneda'] = moneda if moneda in MONEDAS else MONEDA_POR_DEFECTO
+    return filtros
+
+
+def filtrar(queryset, filtros):
+    """
+    Ofertas cuyo rango se solapa con el pedido, en la moneda pedida. Con el orden
+    por salario quedan fuera las ofertas sin salario legible.
+    """
+    if not filtros:
+        return queryset
+    queryset = queryset.filter(salary_currency=filtros['moneda'])
+    if 'salario_min' in filtros:
+        queryset = queryset.filter(salary_max__gte=filtros['salario_min'])
+    if 'salario_max' in filtros:
+        queryset = queryset.filter(salary_min__lte=filtros['salario_max'])
+    if 'orden' in filtros:
+        queryset = queryset.filter(salary_max__isnull=False)
+    return queryset
+
+
+def firma(filtros):
+    """Representación estable de los filtros, para claves de caché."""
+    return urlencode(sorted(filtros.items()))
@@ -0,0 +1,133 @@
+# jobs/search.py
+"""
+Búsqueda de texto completo sobre JobOffer con un índice FTS5 de SQLite.
+
+La tabla virtual jobs_joboffer_fts (creada en la migración 0005) usa como rowid
+el id de la oferta y solo contiene ofertas activas. Se mantiene sincronizada con
+las señales de JobOffer (ver jobs/signals.py) y se puede reconstruir con
+`python manage.py rebuild_search_index`.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'jobs_joboffer_fts'
+
+# Columnas indexadas, en el mismo orden que la tabla virtual
+FTS_COLUMNS = ('title', 'company_name', 'description', 'requirements', 'category', 'location')
+
+# Pesos BM25 por columna: un acierto en el título pesa más que en la descripción
+BM25_WEIGHTS = (10.0, 5.0, 1.0, 2.0, 3.0, 2.0)
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_supported(conn=None):
+    return (conn or connection).vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """
+    Convierte lo que escribe el usuario en una expresión MATCH segura.
+    Cada término se entrecomilla (sin operadores FTS) y se busca por prefijo.
+    """
+    terms = _TERM_RE.findall(text or '')
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def index_offer(offer):
+    """Inserta o actualiza una oferta en el índice. Las inactivas se eliminan."""
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [offer.pk])
+        if offer.is_active:
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(FTS_COLUMNS)}) '
+                f'VALUES (%s, {", ".join(["%s"] * len(FTS_COLUMNS))})',
+                [offer.pk] + [getattr(offer, column) or '' for column in FTS_COLUMNS],
+            )
+
+
+def remove_offer(offer_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [offer_id])
+
+
+def rebuild_index():
+    """
+    Reconstruye el índice completo en una sola sentencia INSERT ... SELECT y lo
+    compacta. Devuelve el número de ofertas indexadas.
+    """
+    if not is_supported():
+        return 0
+    columns = ', '.join(FTS_COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, {columns}) '
+            f'SELECT id, {columns} FROM jobs_joboffer WHERE is_active = 1'
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def search_offer_ids(text, limit, offset=0, within=None):
+    """
+    Devuelve los ids de las ofertas que coinciden con `text`, ordenados por BM25
+    (más relevante primero). Con `within` (un queryset de ofertas) solo se
+    clasifican las que pertenecen a él, para que los filtros no dejen páginas
+    a medias.
+    """
+    match = build_match_query(text)
+    if not match:
+        return []
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    restriction, params = '', []
+    if within is not None:
+        sql, params = within.order_by().values('pk').query.sql_with_params()
+        restriction = f'AND rowid IN ({sql}) '
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s {restriction}'
+            f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s OFFSET %s',
+            [match, *params, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def match_q(text):
+    """Condición (Q) de las ofertas que coinciden con `text`, sin ordenar por relevancia."""
+    if not is_supported():
+        condition = Q()
+        for term in _TERM_RE.findall(text or ''):
+            term_condition = Q()
+            for column in FTS_COLUMNS:
+                term_condition |= Q(**{f'{column}__icontains': term})
+            condition &= term_condition
+        return condition
+    match = build_match_query(text)
+    if not match:
+        return Q(pk__in=[])
+    return Q(pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]))
+
+
+def search_offers(queryset, text, limit, offset=0, restrict=False):
+    """
+    Ejecuta la búsqueda y devuelve la lista de ofertas de `queryset` en orden de
+    relevancia. En motores sin FTS5 se recurre a icontains ordenado por fecha.
+    `restrict` indica que `queryset` tiene filtros (p. ej. facetas) que deben
+    aplicarse antes de paginar y no después.
+    """
+    if not is_supported():
+        queryset = queryset.filter(match_q(text))
+        return list(queryset.order_by('-created_at', '-id')[offset:offset + limit])
+
+    ids = search_offer_ids(text, limit, offset, within=queryset if restrict else None)
+    offers = queryset.in_bulk(ids)
+    return [offers[pk] for pk in ids if pk in offers]
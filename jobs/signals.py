@@ -0,0 +1,162 @@
+# jobs/signals.py
+from functools import partial
+
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import JobOffer, AgendaAccion, Candidatura, candidaturas_cambiadas
+from . import search
+from . import agenda
+from . import counters
+from . import outbox
+from . import fragments
+from . import metrics
+from . import recommendations
+from .access import invalidate_user_access
+
+
+# --- Índice de búsqueda de ofertas ---
+
+@receiver(post_save, sender=JobOffer)
+def actualizar_indice_busqueda(sender, instance, **kwargs):
+    search.index_offer(instance)
+
+
+@receiver(post_delete, sender=JobOffer)
+def eliminar_de_indice_busqueda(sender, instance, **kwargs):
+    search.remove_offer(instance.pk)
+
+
+# --- Términos de las recomendaciones del panel del candidato ---
+
+@receiver(post_save, sender=JobOffer)
+def actualizar_terminos_recomendacion(sender, instance, update_fields=None, **kwargs):
+    recommendations.indexar_oferta(instance, update_fields)
+
+
+@receiver(post_delete, sender=JobOffer)
+def quitar_de_recomendaciones(sender, instance, **kwargs):
+    # Sus términos se borran en cascada: la próxima sincronización recarga la matriz sin ellos
+    transaction.on_commit(recommendations.oferta_borrada)
+
+
+# --- Fragmentos HTML compartidos de las páginas públicas de ofertas ---
+
+@receiver(post_save, sender=JobOffer)
+@receiver(post_delete, sender=JobOffer)
+def invalidar_fragmentos_oferta(sender, instance, **kwargs):
+    # Tras confirmar: una petición anterior al commit leería la fila vieja y guardaría
+    # su HTML bajo la versión nueva
+    transaction.on_commit(partial(fragments.bump_offer, instance.pk))
+
+
+# --- Caché de permisos (roles y ofertas propias) ---
+
+def invalidar_permisos(*user_ids):
+    # Tras confirmar: una petición durante la transacción volvería a guardar en caché
+    # los roles y las ofertas de antes. Los ids se leen ya; solo se aplaza el borrado.
+    transaction.on_commit(partial(invalidate_user_access, *user_ids))
+
+
+@receiver(post_save, sender=JobOffer)
+@receiver(post_delete, sender=JobOffer)
+def invalidar_permisos_por_oferta(sender, instance, **kwargs):
+    invalidar_permisos(instance.created_by_id)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidar_permisos_por_grupos(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        # user.groups.add/remove/clear(...): instance es el usuario
+        invalidar_permisos(instance.pk)
+    elif action == 'pre_clear':
+        # group.user_set.clear(): hay que leer los usuarios antes de que desaparezcan
+        invalidar_permisos(*instance.user_set.values_list('pk', flat=True))
+    else:
+        invalidar_permisos(*pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidar_permisos_por_grupo(sender, instance, **kwargs):
+    # Renombrar o borrar un grupo cambia los roles de todos sus miembros
+    if instance.pk:
+        invalidar_permisos(*instance.user_set.values_list('pk', flat=True))
+
+
+# --- Versión de la agenda (invalida los feeds cacheados) ---
+
+@receiver(post_save, sender=AgendaAccion)
+@receiver(post_delete, sender=AgendaAccion)
+def invalidar_feed_agenda(sender, instance, **kwargs):
+    # Tras confirmar: un feed pedido antes del commit guardaría (con su ETag) los
+    # eventos viejos bajo la versión nueva
+    transaction.on_commit(partial(agenda.bump_version, instance.user_id))
+
+
+@receiver(post_save, sender=AgendaAccion)
+def registrar_cambio_agenda(sender, instance, **kwargs):
+    agenda.registrar_cambio(instance.user_id, instance.pk)
+
+
+@receiver(post_delete, sender=AgendaAccion)
+def registrar_eliminacion_agenda(sender, instance, origin=None, **kwargs):
+    # Al borrar el propio usuario sus acciones caen en cascada: no hay agenda que
+    # sincronizar y la fila del registro rompería la clave foránea hacia el usuario
+    origen = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if issubclass(origen, User):
+        return
+    agenda.registrar_cambio(instance.user_id, instance.pk, eliminada=True)
+
+
+@receiver(post_save, sender=JobOffer)
+def invalidar_feed_agenda_por_oferta(sender, instance, created, **kwargs):
+    # El título de la oferta forma parte del título de los eventos
+    if not created:
+        transaction.on_commit(partial(agenda.bump_version, instance.created_by_id))
+
+
+# --- Contadores de candidaturas de la oferta ---
+
+@receiver(post_save, sender=Candidatura)
+def actualizar_contadores_candidatura(sender, instance, created, **kwargs):
+    if created:
+        counters.candidatura_creada(instance)
+        transaction.on_commit(lambda: metrics.inc('jobs_candidaturas_creadas_total'))
+    else:
+        estado_anterior = getattr(instance, '_estado_guardado', instance.estado)
+        counters.candidatura_cambiada(instance, estado_anterior)
+        if estado_anterior != instance.estado:
+            # Aviso al candidato, en la misma transacción que el cambio de estado
+            outbox.encolar_cambios_estado([instance])
+            contar_cambios_estado(instance.estado, 1)
+    instance._estado_guardado = instance.estado
+
+
+@receiver(post_delete, sender=Candidatura)
+def descontar_candidatura(sender, instance, **kwargs):
+    counters.candidatura_eliminada(instance)
+
+
+# --- Bandeja de salida de correos ---
+
+@receiver(candidaturas_cambiadas)
+def encolar_avisos_cambio_masivo(sender, candidatura_ids, estado, **kwargs):
+    outbox.encolar_cambios_estado_por_ids(candidatura_ids)
+
+
+# --- Métricas (/metrics) ---
+
+def contar_cambios_estado(estado, cantidad):
+    # Solo si la transacción se confirma: un cambio revertido no cuenta
+    transaction.on_commit(lambda: metrics.inc('jobs_candidaturas_cambios_estado_total', cantidad, estado=estado))
+
+
+@receiver(candidaturas_cambiadas)
+def contar_cambio_masivo(sender, candidatura_ids, estado, **kwargs):
+    contar_cambios_estado(estado, len(candidatura_ids))
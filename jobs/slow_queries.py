@@ -0,0 +1,96 @@
+# jobs/slow_queries.py
+"""
+Registro de consultas lentas. Toda consulta de una petición que tarda al menos
+JOBS_SLOW_QUERY_MS se escribe como una línea JSON en el log
+'jobs.slow_queries' (fichero JOBS_SLOW_QUERY_LOG), con su huella, la ruta
+y, en SQLite, su EXPLAIN QUERY PLAN. `manage.py slow_queries` agrupa el
+fichero por huella y señala los recorridos completos de tabla.
+
+Lo llama el acumulador de jobs.timing, así que solo ve las consultas hechas
+dentro de RequestTimingMiddleware.
+"""
+import json
+import logging
+import re
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+logger = logging.getLogger('jobs.slow_queries')
+
+# Umbral en milisegundos; 0 desactiva el registro
+UMBRAL_MS = getattr(settings, 'JOBS_SLOW_QUERY_MS', 100)
+
+# Planes ya capturados por huella en este proceso (el plan se pide una sola vez)
+MAX_PLANES = 1000
+_planes = {}
+
+_LITERALES = [
+    (re.compile(r'\s+'), ' '),
+    (re.compile(r'SAVEPOINT "[^"]+"'), 'SAVEPOINT ?'),
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    # Escrituras en bloque (bulk_create, bulk_update): el tamaño del lote no cambia la huella
+    (re.compile(r'(\([^()]*\))(?:, \1)+'), r'\1, ...'),
+    (re.compile(r'(WHEN \([^()]*\) THEN \? )(?:\1)+'), r'\1... '),
+]
+
+_EXPLICABLES = ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH')
+_ESCANEO = re.compile(r'^SCAN (\S+)(?: AS \S+)?$')
+
+
+def huella(sql):
+    """SQL sin literales: las consultas que solo cambian en sus parámetros comparten huella."""
+    for patron, reemplazo in _LITERALES:
+        sql = patron.sub(reemplazo, sql)
+    return sql.strip()
+
+
+def explicar(connection, sql, params):
+    """
+    Detalle de EXPLAIN QUERY PLAN (lista de cadenas), o None si no aplica.
+    Usa un cursor del backend sin envolver para no volver a pasar por los
+    execute_wrapper.
+    """
+    if connection.vendor != 'sqlite' or not sql.lstrip().upper().startswith(_EXPLICABLES):
+        return None
+    try:
+        cursor = connection.create_cursor()
+        try:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [fila[-1] for fila in cursor.fetchall()]
+        finally:
+            cursor.close()
+    except DatabaseError:
+        return None
+
+
+def escaneos(plan):
+    """Tablas que el plan recorre enteras (SCAN sin índice)."""
+    return [m.group(1) for m in map(_ESCANEO.match, plan or ()) if m]
+
+
+def registrar(connection, sql, params, many, segundos, ruta=None):
+    """Escribe la consulta en el log si supera el umbral."""
+    ms = segundos * 1000
+    if not UMBRAL_MS or ms < UMBRAL_MS:
+        return
+    clave = huella(sql)
+    if clave not in _planes and not many:
+        if len(_planes) >= MAX_PLANES:
+            _planes.clear()
+        _planes[clave] = explicar(connection, sql, params)
+    plan = _planes.get(clave)
+    logger.warning(json.dumps({
+        'fecha': timezone.now().isoformat(),
+        'alias': connection.alias,
+        'ruta': ruta,
+        'ms': round(ms, 2),
+        'huella': clave,
+        'sql': sql[:2000],
+        'plan': plan,
+        'escaneos': escaneos(plan),
+    }, ensure_ascii=False))
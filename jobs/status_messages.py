@@ -0,0 +1,127 @@
+# jobs/status_messages.py
+"""
+Motor de las plantillas de mensaje por estado (StatusMessageTemplate).
+
+Las plantillas son texto plano con marcadores {{ campo }}. Cada plantilla se
+compila una sola vez a una tupla de trozos (literal, campo) y se guarda en memoria
+por (usuario, estado, versión); renderizar es solo concatenar. No se usa el motor
+de plantillas de Django porque el texto lo escriben los headhunters.
+"""
+import re
+from collections import OrderedDict
+from threading import Lock
+
+from .models import StatusMessageTemplate
+
+_PLACEHOLDER_RE = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+# Marcadores disponibles y cómo se obtiene su valor de una candidatura
+# (con user, offer y offer.created_by ya cargados)
+CAMPOS = {
+    'candidato': lambda c: c.user.get_full_name() or c.user.username,
+    'candidato_usuario': lambda c: c.user.username,
+    'candidato_email': lambda c: c.user.email,
+    'oferta': lambda c: c.offer.title,
+    'empresa': lambda c: c.offer.company_name,
+    'ubicacion': lambda c: c.offer.location,
+    'estado': lambda c: c.get_estado_display(),
+    'fecha_aplicacion': lambda c: c.fecha_aplicacion.strftime('%d/%m/%Y') if c.fecha_aplicacion else '',
+    'headhunter': lambda c: c.offer.created_by.get_full_name() or c.offer.created_by.username,
+}
+
+# Máximo de plantillas compiladas en memoria por proceso
+MAX_COMPILADAS = 1024
+
+_compiladas = OrderedDict()
+_lock = Lock()
+
+
+def compilar(texto):
+    """
+    Convierte el texto en una tupla de (literal, campo). Los marcadores que no
+    existen en CAMPOS se dejan tal cual, como literal.
+    """
+    partes = []
+    literal = []
+    pos = 0
+    for match in _PLACEHOLDER_RE.finditer(texto):
+        literal.append(texto[pos:match.start()])
+        campo = match.group(1)
+        if campo in CAMPOS:
+            partes.append((''.join(literal), campo))
+            literal = []
+        else:
+            literal.append(match.group(0))
+        pos = match.end()
+    literal.append(texto[pos:])
+    partes.append((''.join(literal), None))
+    return tuple(partes)
+
+
+def obtener_compilada(user_id, estado, version, texto):
+    """
+    Plantilla compilada desde la caché en memoria (LRU). El texto se guarda junto
+    a la versión compilada para detectar dos ediciones con el mismo número de versión.
+    """
+    key = (user_id, estado, version)
+    with _lock:
+        entrada = _compiladas.get(key)
+        if entrada is not None and entrada[0] == texto:
+            _compiladas.move_to_end(key)
+            return entrada[1]
+    compilada = compilar(texto)
+    with _lock:
+        _compiladas[key] = (texto, compilada)
+        _compiladas.move_to_end(key)
+        while len(_compiladas) > MAX_COMPILADAS:
+            _compiladas.popitem(last=False)
+    return compilada
+
+
+def renderizar(compilada, candidatura):
+    valores = {}
+    trozos = []
+    for literal, campo in compilada:
+        trozos.append(literal)
+        if campo is not None:
+            if campo not in valores:
+                valores[campo] = str(CAMPOS[campo](candidatura) or '')
+            trozos.append(valores[campo])
+    return ''.join(trozos)
+
+
+def cargar_plantillas(pares):
+    """
+    Plantillas compiladas para los pares (user_id, estado) dados, en una consulta.
+    Devuelve {(user_id, estado): compilada}; los pares sin plantilla no aparecen.
+    """
+    pares = set(pares)
+    if not pares:
+        return {}
+    user_ids = {user_id for user_id, _ in pares}
+    estados = {estado for _, estado in pares}
+    filas = StatusMessageTemplate.objects.filter(user_id__in=user_ids, estado__in=estados).values_list(
+        'user_id', 'estado', 'version', 'mensaje'
+    )
+    return {
+        (user_id, estado): obtener_compilada(user_id, estado, version, mensaje)
+        for user_id, estado, version, mensaje in filas
+        if (user_id, estado) in pares
+    }
+
+
+def renderizar_mensajes(candidaturas):
+    """
+    Renderiza el mensaje de cada candidatura con la plantilla del headhunter dueño
+    de la oferta para su estado actual, en una sola pasada.
+
+    `candidaturas` debe venir con select_related('user', 'offer__created_by').
+    Devuelve una lista de (candidatura, mensaje o None si no hay plantilla).
+    """
+    candidaturas = list(candidaturas)
+    plantillas = cargar_plantillas((c.offer.created_by_id, c.estado) for c in candidaturas)
+    resultado = []
+    for candidatura in candidaturas:
+        compilada = plantillas.get((candidatura.offer.created_by_id, candidatura.estado))
+        resultado.append((candidatura, renderizar(compilada, candidatura) if compilada else None))
+    return resultado
@@ -1,6 +1,7 @@
 # jobs/templatetags/user_tags.py
 from django import template
-from django.contrib.auth.models import User, Group
+
+from jobs.access import get_user_access
 
 register = template.Library()
 
@@ -9,10 +10,6 @@ def is_in_group(user, group_name):
     """
     Comprueba si el usuario pertenece a un grupo específico.
     Uso: {% if request.user|is_in_group:'nombre_del_grupo' %}
+    Los grupos se leen de la caché de permisos (jobs.access), no de la base de datos.
     """
-    if user.is_authenticated:
-        try:
-            return user.groups.filter(name=group_name).exists()
-        except Group.DoesNotExist:
-            return False # El grupo no existe
-    return False
\ No newline at end of file
+    return get_user_access(user).has_role(group_name)
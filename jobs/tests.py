@@ -1,3 +1,1348 @@
-from django.test import TestCase
+import base64
+import json
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, connections, router as db_router, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import agenda, db, fit, fragments, locations, metrics, outbox, profiling, recommendations, salaries, search, slow_queries, tfidf, urls as jobs_urls
+from .access import HEADHUNTER_GROUP, get_user_access
+from .middleware import PIN_COOKIE
+from .pagination import KeysetPaginator
+from .models import AgendaAccion, Candidatura, CandidatureStatus, JobOffer, OutboxEmail, StatusMessageTemplate, TerminosOferta
+from .routers import PrimaryReplicaRouter
+from .views import OFFERS_MAX_PAGE_SIZE, HeadhunterDashboardView, JobOfferList, get_page_size
+
+# Presupuesto de consultas SQL por ruta de jobs/urls.py, medido con la caché vacía
+# (el peor caso). Si una vista necesita más, súbelo en el mismo cambio y explica
+# por qué en la revisión. Toda ruta con nombre debe tener su presupuesto.
+PRESUPUESTOS = {
+    'job_offer_list': 3,  # + la consulta agrupada de las facetas
+    'api_ofertas_publicas': 1,
+    'job_offer_detail': 1,
+    'apply_to_offer': 6,
+    'create_offer': 4,
+    'edit_offer': 5,
+    'candidate_dashboard': 6,  # + leer las recomendadas (la matriz se carga fuera de la petición)
+    'headhunter_dashboard': 6,
+    'offer_applications': 6,
+    'cambiar_estado_candidatura': 7,
+    'api_cambiar_estados_candidaturas': 14,
+    'agenda': 7,
+    'api_acciones_headhunter': 5,
+    'api_acciones_cambios': 6,
+    'crear_accion_ajax': 14,  # + comprobar la restricción de duración máxima (consulta y savepoint)
+    'editar_accion_ajax': 7,
+    'eliminar_accion_ajax': 10,
+}
+
+# Lo mismo para el admin de jobs (listados y la ficha de oferta con sus candidaturas)
+PRESUPUESTOS_ADMIN = {
+    'admin:jobs_joboffer_changelist': 6,
+    'admin:jobs_joboffer_change': 5,
+    'admin:jobs_candidatura_changelist': 7,
+    'admin:jobs_agendaaccion_changelist': 7,
+    'admin:jobs_statusmessagetemplate_changelist': 5,
+    'admin:jobs_outboxemail_changelist': 5,
+}
+
+# Rutas que escriben: se miden dentro de un savepoint que se revierte
+RUTAS_ESCRITURA = {'api_cambiar_estados_candidaturas', 'crear_accion_ajax', 'eliminar_accion_ajax'}
+
+# Tamaños de los datos: el número de consultas debe ser el mismo en ambos
+FILAS_PEQUENO = 2
+FILAS_GRANDE = 12
+
+def describir(huellas):
+    return '\n'.join(f'  {veces:3d} × {sql[:300]}' for sql, veces in huellas.most_common())
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Cada vista de jobs se pide con pocos datos y con muchos: el número de
+    consultas no puede pasar de su presupuesto ni crecer con el número de filas
+    (síntoma de N+1). Si falla, el mensaje lista las huellas SQL culpables.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        grupo = Group.objects.create(name=HEADHUNTER_GROUP)
+        cls.headhunter = User.objects.create_user('hh', email='hh@example.com', password='x')
+        cls.headhunter.groups.add(grupo)
+        cls.candidato = User.objects.create_user('cand', email='cand@example.com', password='x')
+        cls.admin = User.objects.create_superuser('admin', email='admin@example.com', password='x')
+        cls.oferta = cls.crear_oferta(0)
+        cls.oferta_libre = cls.crear_oferta('libre')
+        for estado in ('aceptado', 'rechazado'):
+            StatusMessageTemplate.objects.create(
+                user=cls.headhunter, estado=estado, mensaje='Hola {{ candidato }}: {{ oferta }}',
+            )
+        cls.filas = 0
+        cls.ampliar(FILAS_PEQUENO)
+
+    @classmethod
+    def crear_oferta(cls, n):
+        return JobOffer.objects.create(
+            created_by=cls.headhunter, company_name=f'Empresa {n}', title=f'Oferta {n}',
+            description='Descripción', location='Madrid', salary='30000',
+        )
+
+    @classmethod
+    def ampliar(cls, filas):
+        """Añade `filas` ofertas, candidatos (postulados a la oferta principal y a la suya) y acciones."""
+        inicio = timezone.now() + timedelta(days=1)
+        for n in range(cls.filas + 1, cls.filas + filas + 1):
+            oferta = cls.crear_oferta(n)
+            usuario = User.objects.create_user(f'u{n}', email=f'u{n}@example.com')
+            candidatura = Candidatura.objects.create(offer=cls.oferta, user=usuario)
+            Candidatura.objects.create(offer=oferta, user=usuario)
+            Candidatura.objects.create(offer=oferta, user=cls.candidato)
+            AgendaAccion.objects.create(
+                user=cls.headhunter, oferta=oferta, candidatura=candidatura, titulo=f'Acción {n}',
+                fecha_hora_inicio=inicio + timedelta(hours=n),
+            )
+        cls.filas += filas
+        # Correos en la bandeja de salida para el admin
+        Candidatura.objects.filter(offer=cls.oferta, estado='pendiente').cambiar_estado('rechazado')
+        Candidatura.objects.filter(offer=cls.oferta).cambiar_estado('pendiente')
+
+    # --- Peticiones ---
+
+    def peticion(self, nombre):
+        """(método, usuario, url, datos, content_type) de cada ruta."""
+        ahora = timezone.now()
+        accion = AgendaAccion.objects.filter(user=self.headhunter).latest('id')
+        if nombre in ('job_offer_list', 'api_ofertas_publicas'):
+            return 'GET', None, reverse(nombre), None, None
+        if nombre == 'job_offer_detail':
+            return 'GET', None, reverse(nombre, kwargs={'offer_id': self.oferta.pk}), None, None
+        if nombre == 'apply_to_offer':
+            return 'GET', self.candidato, reverse(nombre, kwargs={'offer_id': self.oferta_libre.pk}), None, None
+        if nombre == 'candidate_dashboard':
+            return 'GET', self.candidato, reverse(nombre), None, None
+        if nombre in ('edit_offer', 'offer_applications'):
+            return 'GET', self.headhunter, reverse(nombre, kwargs={'offer_id': self.oferta.pk}), None, None
+        if nombre == 'cambiar_estado_candidatura':
+            candidatura = self.oferta.applications.latest('id')
+            return 'GET', self.headhunter, reverse(nombre, kwargs={'candidature_id': candidatura.pk}), None, None
+        if nombre == 'api_cambiar_estados_candidaturas':
+            ids = list(self.oferta.applications.values_list('id', flat=True))
+            datos = json.dumps({'estado': 'aceptado', 'ids': ids})
+            return 'POST', self.headhunter, reverse(nombre), datos, 'application/json'
+        if nombre == 'api_acciones_headhunter':
+            return 'GET', self.headhunter, reverse(nombre), {
+                'start': ahora.isoformat(), 'end': (ahora + timedelta(days=30)).isoformat(),
+            }, None
+        if nombre == 'api_acciones_cambios':
+            return 'GET', self.headhunter, reverse(nombre), {'token': 0}, None
+        if nombre == 'crear_accion_ajax':
+            return 'POST', self.headhunter, reverse(nombre), {
+                'titulo': 'Nueva', 'tipo': 'otro', 'duracion_minutos': 30, 'oferta': self.oferta.pk,
+                'fecha_hora_inicio': (ahora + timedelta(days=2)).strftime('%Y-%m-%dT%H:%M'),
+            }, None
+        if nombre == 'editar_accion_ajax':
+            return 'GET', self.headhunter, reverse(nombre, kwargs={'accion_id': accion.pk}), None, None
+        if nombre == 'eliminar_accion_ajax':
+            return 'POST', self.headhunter, reverse(nombre, kwargs={'accion_id': accion.pk}), None, None
+        if nombre == 'admin:jobs_joboffer_change':
+            return 'GET', self.admin, reverse(nombre, args=[self.oferta.pk]), None, None
+        if nombre.startswith('admin:'):
+            return 'GET', self.admin, reverse(nombre), None, None
+        return 'GET', self.headhunter, reverse(nombre), None, None
+
+    def medir(self, nombre):
+        """Huellas SQL (Counter) de una petición a la ruta, con la caché vacía."""
+        metodo, usuario, url, datos, content_type = self.peticion(nombre)
+        self.client.logout()
+        if usuario is not None:
+            self.client.force_login(usuario)
+        cache.clear()
+        # La matriz de recomendaciones se carga fuera de la petición (en segundo plano)
+        recommendations.reiniciar()
+        recommendations.cargar()
+        with transaction.atomic():
+            with CaptureQueriesContext(connections['default']) as capturadas:
+                if metodo == 'GET':
+                    response = self.client.get(url, datos)
+                elif content_type:
+                    response = self.client.post(url, datos, content_type=content_type)
+                else:
+                    response = self.client.post(url, datos)
+            transaction.set_rollback(nombre in RUTAS_ESCRITURA)
+        self.assertLess(response.status_code, 400, f'{nombre} respondió {response.status_code}')
+        return Counter(slow_queries.huella(consulta['sql']) for consulta in capturadas.captured_queries)
+
+    def comprobar(self, presupuestos):
+        pequeno = {nombre: self.medir(nombre) for nombre in presupuestos}
+        self.ampliar(FILAS_GRANDE - FILAS_PEQUENO)
+        grande = {nombre: self.medir(nombre) for nombre in presupuestos}
+
+        for nombre, maximo in presupuestos.items():
+            with self.subTest(ruta=nombre):
+                total = sum(grande[nombre].values())
+                crecen = Counter({
+                    sql: veces for sql, veces in grande[nombre].items()
+                    if veces > pequeno[nombre].get(sql, 0)
+                })
+                self.assertFalse(crecen, (
+                    f'{nombre}: {sum(pequeno[nombre].values())} consultas con {FILAS_PEQUENO} filas y '
+                    f'{total} con {FILAS_GRANDE}. Huellas que crecen:\n{describir(crecen)}'
+                ))
+                self.assertLessEqual(total, maximo, (
+                    f'{nombre}: {total} consultas, presupuesto {maximo}:\n{describir(grande[nombre])}'
+                ))
+
+    def test_todas_las_rutas_tienen_presupuesto(self):
+        nombres = {patron.name for patron in jobs_urls.urlpatterns if patron.name}
+        self.assertEqual(nombres - set(PRESUPUESTOS), set(), 'Rutas de jobs sin presupuesto de consultas')
+        self.assertEqual(set(PRESUPUESTOS) - nombres, set(), 'Presupuestos de rutas que ya no existen')
+
+    def test_vistas(self):
+        self.comprobar(PRESUPUESTOS)
+
+    def test_admin(self):
+        self.comprobar(PRESUPUESTOS_ADMIN)
+
+    def test_huella(self):
+        self.assertEqual(
+            slow_queries.huella('SELECT * FROM "t" WHERE "id" IN (1, 2,3) AND  "x" = \'a\'\'b\' LIMIT 21'),
+            'SELECT * FROM "t" WHERE "id" IN (...) AND "x" = ? LIMIT ?',
+        )
+        self.assertEqual(
+            slow_queries.huella('INSERT INTO "t" ("a", "b") VALUES (1, NULL), (2, NULL), (3, NULL)'),
+            slow_queries.huella('INSERT INTO "t" ("a", "b") VALUES (1, NULL), (2, NULL)'),
+        )
+        self.assertEqual(slow_queries.huella('SAVEPOINT "s1_x2"'), slow_queries.huella('SAVEPOINT "s1_x3"'))
+
+
+class RequestTimingTests(TestCase):
+    """Cabecera Server-Timing y línea de log de RequestTimingMiddleware."""
+
+    def test_cabecera_y_log(self):
+        usuario = User.objects.create_user('cand', password='x')
+        JobOffer.objects.create(created_by=usuario, company_name='c', title='t', description='d')
+        self.client.force_login(usuario)
+        cache.clear()
+        with self.assertLogs('jobs.timing', 'INFO') as logs:
+            response = self.client.get(reverse('job_offer_list'))
+
+        metricas = {}
+        for parte in response['Server-Timing'].split(', '):
+            nombre, dur, *resto = parte.split(';')
+            metricas[nombre] = (float(dur.removeprefix('dur=')), resto)
+        self.assertEqual(set(metricas), {'total', 'db', 'tpl', 'app'})
+        self.assertGreater(metricas['tpl'][0], 0)
+        self.assertRegex(metricas['db'][1][0], r'^desc="[1-9]\d* consultas"$')
+        self.assertGreaterEqual(metricas['total'][0], metricas['db'][0] + metricas['tpl'][0])
+        self.assertIn('ruta=job_offer_list metodo=GET status=200', logs.output[-1])
+
+
+class SlowQueryTests(TestCase):
+    """Registro de consultas lentas con su plan (jobs.slow_queries)."""
+
+    def test_registra_huella_y_plan(self):
+        JobOffer.objects.create(
+            created_by=User.objects.create_user('hh'), company_name='c', title='t', description='d',
+        )
+        cache.clear()
+        with mock.patch.object(slow_queries, 'UMBRAL_MS', 1e-6), \
+                self.assertLogs('jobs.slow_queries', 'WARNING') as logs:
+            self.client.get(reverse('api_ofertas_publicas'))
+
+        registros = [json.loads(linea.split(':', 2)[2]) for linea in logs.output]
+        ofertas = [r for r in registros if 'FROM "jobs_joboffer"' in r['huella']]
+        self.assertTrue(ofertas)
+        self.assertEqual(ofertas[0]['ruta'], 'api_ofertas_publicas')
+        self.assertTrue(ofertas[0]['plan'])
+
+    def test_escaneos(self):
+        plan = ['SCAN jobs_joboffer', 'SCAN auth_user USING INDEX x', 'SEARCH T4 USING INTEGER PRIMARY KEY (rowid=?)']
+        self.assertEqual(slow_queries.escaneos(plan), ['jobs_joboffer'])
+
+
+class RequestProfilerTests(TestCase):
+    """Perfilado bajo demanda (RequestProfilerMiddleware y jobs.profiling)."""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        patcher = mock.patch.object(profiling, 'PROFILE_DIR', Path(directorio.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_solo_staff(self):
+        usuario = User.objects.create_user('cand')
+        self.client.force_login(usuario)
+        response = self.client.get(reverse('candidate_dashboard'), HTTP_X_PROFILE='1')
+        self.assertNotIn('X-Profile-File', response)
+        self.assertEqual(profiling.listar(), [])
+
+    def test_guarda_perfil_con_ruta_y_usuario(self):
+        staff = User.objects.create_user('staff', is_staff=True)
+        self.client.force_login(staff)
+        self.client.get(reverse('candidate_dashboard'))
+        self.assertEqual(profiling.listar(), [])
+
+        response = self.client.get(reverse('candidate_dashboard'), {'_profile': '1'})
+        self.assertIn('X-Profile-File', response)
+        perfiles = profiling.listar(ruta='candidate_dashboard', usuario=staff.pk)
+        self.assertEqual([perfil.ruta_fichero.name for perfil in perfiles], [response['X-Profile-File']])
+        salida = StringIO()
+        call_command('profiles', '--top', '5', stdout=salida)
+        self.assertIn('1 perfiles (candidate_dashboard)', salida.getvalue())
+
+
+class MetricsTests(TestCase):
+    """Registro de métricas entre procesos y vista /metrics."""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = Path(directorio.name)
+        patcher = mock.patch.object(metrics, 'METRICS_DIR', self.directorio)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def valor(self, texto, linea):
+        for fila in texto.splitlines():
+            nombre, _, valor = fila.rpartition(' ')
+            if nombre == linea:
+                return float(valor)
+        return 0.0
+
+    @override_settings(DEBUG=True)  # sin JOBS_METRICS_TOKEN, /metrics solo responde con DEBUG
+    def test_exponer(self):
+        hh = User.objects.create_user('hh')
+        oferta = JobOffer.objects.create(created_by=hh, company_name='c', title='t', description='d')
+        antes = self.client.get('/metrics').content.decode()
+        with self.captureOnCommitCallbacks(execute=True):
+            candidatura = Candidatura.objects.create(
+                offer=oferta, user=User.objects.create_user('u', email='u@example.com'),
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            Candidatura.objects.filter(pk=candidatura.pk).cambiar_estado('aceptado')
+        self.client.get(reverse('job_offer_list'))
+
+        response = self.client.get('/metrics')
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        texto = response.content.decode()
+        for linea, incremento in [
+            ('jobs_candidaturas_creadas_total', 1),
+            ('jobs_candidaturas_cambios_estado_total{estado="aceptado"}', 1),
+            ('jobs_http_requests_total{metodo="GET",ruta="job_offer_list",status="200"}', 1),
+            ('jobs_http_request_duration_seconds_count{metodo="GET",ruta="job_offer_list"}', 1),
+        ]:
+            self.assertEqual(self.valor(texto, linea) - self.valor(antes, linea), incremento, linea)
+        self.assertIn('jobs_outbox_emails{estado="pendiente"} 1', texto)
+        self.assertIn('# TYPE jobs_http_request_duration_seconds histogram', texto)
+        self.assertIn('jobs_http_request_duration_seconds_bucket{metodo="GET",ruta="job_offer_list",le="+Inf"}', texto)
+
+    def test_suma_los_ficheros_de_todos_los_procesos(self):
+        metrics.inc('jobs_candidaturas_creadas_total', 2)
+        metrics.volcar(forzar=True)
+        (self.directorio / '99999-1.json').write_text(json.dumps({
+            'contadores': [['jobs_candidaturas_creadas_total', {}, 5]], 'histogramas': [],
+        }))
+        contadores, _ = metrics.leer()
+        propios = metrics._registro.contadores[('jobs_candidaturas_creadas_total', ())]
+        self.assertEqual(contadores[('jobs_candidaturas_creadas_total', ())], propios + 5)
+
+    @override_settings(JOBS_METRICS_TOKEN='secreto')
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(JOBS_METRICS_TOKEN='', DEBUG=False)
+    def test_sin_token_fuera_de_debug(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+class PaginacionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hh = User.objects.create_user('hh')
+        self.ofertas = [
+            JobOffer.objects.create(created_by=self.hh, company_name='c', title=f't{n}', description='d', salary='30k')
+            for n in range(7)
+        ]
+        # Todas con la misma fecha: solo el id desempata
+        JobOffer.objects.update(created_at=timezone.now())
+        self.paginator = KeysetPaginator(JobOffer.objects.all(), 3)
+
+    def ids(self, page):
+        return [o.pk for o in page]
+
+    def test_ida_y_vuelta_con_claves_iguales(self):
+        primera = self.paginator.page()
+        segunda = self.paginator.page(primera.next_cursor)
+        tercera = self.paginator.page(segunda.next_cursor)
+        esperado = [o.pk for o in reversed(self.ofertas)]
+        self.assertEqual(self.ids(primera) + self.ids(segunda) + self.ids(tercera), esperado)
+        self.assertEqual((primera.has_previous(), tercera.has_next()), (False, False))
+
+        # Hacia atrás se vuelven a ver las mismas páginas
+        self.assertEqual(self.ids(self.paginator.page(tercera.previous_cursor)), self.ids(segunda))
+        vuelta = self.paginator.page(segunda.previous_cursor)
+        self.assertEqual(self.ids(vuelta), self.ids(primera))
+        self.assertFalse(vuelta.has_previous())
+        self.assertEqual(vuelta.next_cursor, primera.next_cursor)
+
+    def test_tamano_de_pagina_acotado(self):
+        for valor, esperado in [('1000', OFFERS_MAX_PAGE_SIZE), ('0', 1), ('-5', 1), ('abc', 20), ('7', 7)]:
+            with self.subTest(page_size=valor):
+                self.assertEqual(get_page_size(RequestFactory().get('/', {'page_size': valor}), default=20), esperado)
+
+    def test_cursor_no_valido(self):
+        def cursor(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+        url = reverse('job_offer_list')
+        for parametros in [
+            {'cursor': 'basura!'},
+            {'cursor': cursor({'d': 'n', 'k': 'no es una fecha', 'id': 1})},
+            {'cursor': cursor({'d': 'x', 'k': timezone.now().isoformat(), 'id': 1})},
+            # Clave entera (orden por salario): ni texto ni fuera de rango
+            {'orden': 'salario', 'cursor': cursor({'d': 'n', 'k': 'abc', 'id': 1})},
+            {'orden': 'salario', 'cursor': cursor({'d': 'n', 'k': 2 ** 70, 'id': 1})},
+            {'orden': 'salario', 'cursor': cursor({'d': 'n', 'k': 30000})},
+        ]:
+            with self.subTest(parametros=parametros):
+                self.assertEqual(self.client.get(url, parametros).status_code, 404)
+                self.assertEqual(self.client.get(reverse('api_ofertas_publicas'), parametros).status_code, 404)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hh = User.objects.create_user('hh')
+
+    def oferta(self, title, description='d', **kwargs):
+        return JobOffer.objects.create(created_by=self.hh, company_name='c', title=title, description=description, **kwargs)
+
+    def indexadas(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid FROM {search.FTS_TABLE} ORDER BY rowid')
+            return [fila[0] for fila in cursor.fetchall()]
+
+    def test_orden_bm25(self):
+        descripcion = self.oferta('Desarrollador backend', 'Experiencia con Python y Django')
+        titulo = self.oferta('Desarrollador Python', 'Backend')
+        self.oferta('Diseñador', 'Figma')
+        self.assertEqual(search.search_offer_ids('python', 10), [titulo.pk, descripcion.pk])
+        # Por prefijo: "pyth" también encuentra las dos
+        self.assertEqual(search.search_offer_ids('pyth', 10), [titulo.pk, descripcion.pk])
+        response = self.client.get(reverse('api_ofertas_publicas'), {'q': 'python'})
+        self.assertEqual([o['id'] for o in response.json()['results']], [titulo.pk, descripcion.pk])
+
+    def test_inactivas_y_borradas_fuera_del_indice(self):
+        activa = self.oferta('Python')
+        inactiva = self.oferta('Python', is_active=False)
+        borrada = self.oferta('Python')
+        self.assertEqual(self.indexadas(), [activa.pk, borrada.pk])
+        borrada.delete()
+        activa.is_active = False
+        activa.save()
+        self.assertEqual(self.indexadas(), [])
+        inactiva.is_active = True
+        inactiva.save()
+        self.assertEqual(search.search_offer_ids('python', 10), [inactiva.pk])
+
+    def test_operadores_fts_entrecomillados(self):
+        self.assertEqual(
+            search.build_match_query('python OR "java" NEAR(c++) -spring* title:x'),
+            '"python"* "OR"* "java"* "NEAR"* "c"* "spring"* "title"* "x"*',
+        )
+        self.assertEqual(search.build_match_query('"*-:()'), '')
+        self.oferta('Desarrollador Python')
+        for texto in ('python OR', 'NEAR(python', '"python', 'title:python', '*'):
+            with self.subTest(q=texto):
+                self.assertEqual(self.client.get(reverse('api_ofertas_publicas'), {'q': texto}).status_code, 200)
+
+    def test_rebuild_search_index(self):
+        activa = self.oferta('Python')
+        self.oferta('Python', is_active=False)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+        self.assertEqual(search.search_offer_ids('python', 10), [])
+        salida = StringIO()
+        call_command('rebuild_search_index', stdout=salida)
+        self.assertIn('1 ofertas activas indexadas', salida.getvalue())
+        self.assertEqual(search.search_offer_ids('python', 10), [activa.pk])
+
+
+class FacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        hh = User.objects.create_user('hh')
+        for modalidad, categoria, ubicacion, dias in [
+            ('remote', 'IT', 'Madrid', 0),
+            ('remote', 'IT', 'Madrid', 0),
+            ('remote', 'Ventas', 'Madrid', 10),
+            ('onsite', 'IT', 'Sevilla', 0),
+        ]:
+            oferta = JobOffer.objects.create(
+                created_by=hh, company_name='c', title=f'Python {categoria}', description='d',
+                modality=modalidad, category=categoria, location=ubicacion,
+            )
+            JobOffer.objects.filter(pk=oferta.pk).update(created_at=timezone.now() - timedelta(days=dias))
+        JobOffer.objects.create(created_by=hh, company_name='c', title='Inactiva', description='d', is_active=False)
+
+    def recuentos(self, response, faceta):
+        return {opcion['valor']: opcion['n'] for opcion in response.context['facetas'][faceta]}
+
+    def test_recuentos_con_los_demas_filtros(self):
+        response = self.client.get(reverse('job_offer_list'), {'modality': 'remote'})
+        self.assertEqual(len(response.context['cards']), 3)
+        self.assertEqual(response.context['facetas']['total'], 3)
+        # La faceta filtrada muestra las alternativas; las demás, lo que queda con el filtro
+        self.assertEqual(self.recuentos(response, 'modality'), {'remote': 3, 'onsite': 1})
+        self.assertEqual(self.recuentos(response, 'category'), {'IT': 2, 'Ventas': 1})
+        self.assertEqual(self.recuentos(response, 'publicada'), {'24h': 2, '7d': 2, '30d': 3})
+
+        response = self.client.get(reverse('job_offer_list'), {'modality': 'remote', 'publicada': '7d'})
+        self.assertEqual(response.context['facetas']['total'], 2)
+        self.assertEqual(self.recuentos(response, 'category'), {'IT': 2})
+        self.assertEqual(self.recuentos(response, 'location'), {'Madrid': 2})
+
+    def test_filtros_no_validos_se_ignoran(self):
+        response = self.client.get(reverse('job_offer_list'), {'modality': 'luna', 'publicada': '1y'})
+        self.assertEqual(response.context['filtros'], {})
+        self.assertEqual(response.context['facetas']['total'], 4)
+
+    def test_segunda_peticion_sin_consultas(self):
+        parametros = {'category': 'IT', 'location': 'Madrid'}
+        self.client.get(reverse('job_offer_list'), parametros)
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('job_offer_list'), parametros)
+        self.assertEqual(response.context['facetas']['total'], 2)
+
+    def test_busqueda_con_filtros_pagina_completa(self):
+        # El ranking se limita a las ofertas filtradas: la página no queda a medias
+        response = self.client.get(reverse('job_offer_list'), {'q': 'python', 'location': 'Sevilla', 'page_size': 1})
+        self.assertEqual(len(response.context['cards']), 1)
+        self.assertEqual(response.context['facetas']['total'], 1)
+        self.assertEqual(self.recuentos(response, 'location'), {'Madrid': 3, 'Sevilla': 1})
+
+        response = self.client.get(reverse('api_ofertas_publicas'), {'q': 'python', 'modality': 'onsite'})
+        self.assertEqual([oferta['location'] for oferta in response.json()['results']], ['Sevilla'])
+
+
+class SalaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hh = User.objects.create_user('hh')
+
+    def oferta(self, salary, **kwargs):
+        return JobOffer.objects.create(
+            created_by=self.hh, company_name='c', title='t', description='d', salary=salary, **kwargs,
+        )
+
+    def test_parsear(self):
+        for texto, esperado in [
+            ('30000-40000 EUR/año', (30000, 40000, 'EUR', 'year')),
+            ('30.000 - 40.000 €', (30000, 40000, 'EUR', 'year')),
+            ('45k-55k', (45000, 55000, 'EUR', 'year')),
+            ('USD 3000/mes', (36000, 36000, 'USD', 'month')),
+            ('1.500 €/mes en 14 pagas', (21000, 21000, 'EUR', 'month')),
+            ('25 €/hora', (44000, 44000, 'EUR', 'hour')),
+            ('£40,000 per year', (40000, 40000, 'GBP', 'year')),
+            ('30-35k', (30000, 35000, 'EUR', 'year')),
+            ('30.000 € - 40.000 €', (30000, 40000, 'EUR', 'year')),
+            ('45.000 € + bonus 10%', (45000, 45000, 'EUR', 'year')),
+            ('40000 EUR (revisión 2025)', (40000, 40000, 'EUR', 'year')),
+            ('2000 €/mes', (24000, 24000, 'EUR', 'month')),
+            ('Entre 24 y 28K', (24000, 28000, 'EUR', 'year')),
+            ('entre 30.000 y 40.000 € brutos', (30000, 40000, 'EUR', 'year')),
+            ('Negociable', (None, None, '', '')),
+            ('', (None, None, '', '')),
+        ]:
+            campos = salaries.parsear(texto)
+            self.assertEqual(tuple(campos[campo] for campo in salaries.CAMPOS), esperado, texto)
+
+    def test_save_y_backfill(self):
+        oferta = self.oferta('30.000 - 40.000 €')
+        self.assertEqual((oferta.salary_min, oferta.salary_max), (30000, 40000))
+        oferta.salary = '50k'
+        oferta.save(update_fields=['salary'])
+        oferta.refresh_from_db()
+        self.assertEqual((oferta.salary_min, oferta.salary_max), (50000, 50000))
+
+        # Un update directo no pasa por save(): lo repara el comando
+        JobOffer.objects.filter(pk=oferta.pk).update(salary='USD 2000/mes')
+        call_command('backfill_salaries', '--batch-size', '1', stdout=StringIO())
+        oferta.refresh_from_db()
+        self.assertEqual((oferta.salary_max, oferta.salary_currency), (24000, 'USD'))
+
+    def test_filtro_y_orden(self):
+        for salario in ('20.000 €', '30.000 - 40.000 €', '60k EUR', 'USD 5000/mes', 'A convenir'):
+            self.oferta(salario)
+        url = reverse('job_offer_list')
+
+        response = self.client.get(url, {'salario_min': 35000})
+        self.assertEqual(len(response.context['cards']), 2)
+        response = self.client.get(url, {'salario_min': 35000, 'moneda': 'usd'})
+        self.assertEqual(len(response.context['cards']), 1)
+
+        # Mejor pagadas primero, sin las que no tienen salario, paginando por (salary_max, id)
+        vistos = []
+        parametros = {'orden': 'salario', 'page_size': 2}
+        while True:
+            response = self.client.get(reverse('api_ofertas_publicas'), parametros)
+            datos = response.json()
+            vistos += [oferta['salary_max'] for oferta in datos['results']]
+            if not datos['next']:
+                break
+            parametros['cursor'] = datos['next']
+        self.assertEqual(vistos, [60000, 40000, 20000])
+
+    def test_orden_servido_por_el_indice(self):
+        queryset = salaries.filtrar(
+            JobOffer.objects.filter(is_active=True), {'orden': 'salario', 'salario_min': 30000, 'moneda': 'EUR'},
+        ).order_by('-salary_max', '-id').only('id', 'salary_max')[:21]
+        sql, params = queryset.query.sql_with_params()
+        plan = ' '.join(slow_queries.explicar(connection, sql, params))
+        self.assertIn('jobs_offer_salary_feed_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_rango_servido_por_el_indice(self):
+        # Sin ?orden=salario el rango también pagina por (salary_max, id), no por fecha
+        for filtros in ({'salario_min': 30000}, {'salario_max': 50000}, {'salario_min': 30000, 'salario_max': 50000}):
+            peticion = RequestFactory().get(reverse('job_offer_list'), filtros)
+            vista = JobOfferList()
+            vista.setup(peticion)
+            queryset = vista.get_queryset()
+            self.assertEqual(vista.filtros_salario['orden'], 'salario')
+            queryset = queryset.only('id', 'salary_max').order_by('-salary_max', '-id')[:21]
+            sql, params = queryset.query.sql_with_params()
+            plan = ' '.join(slow_queries.explicar(connection, sql, params))
+            with self.subTest(filtros=filtros):
+                self.assertIn('jobs_offer_salary_feed_idx', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+
+class LocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hh = User.objects.create_user('hh')
+
+    def oferta(self, location, **kwargs):
+        return JobOffer.objects.create(
+            created_by=self.hh, company_name='c', title='t', description='d', location=location, **kwargs,
+        )
+
+    def test_normalizar(self):
+        for texto, ciudad in [
+            ('Barcelona, Remoto, Madrid', 'Barcelona'),
+            ('Oficina en Bilbao centro', 'Bilbao'),
+            ('La Coruña', 'A Coruña'),
+            ('Donostia - San Sebastián', 'San Sebastián'),
+            ('Remoto', ''),
+        ]:
+            self.assertEqual(locations.normalizar(texto)['location_city'], ciudad, texto)
+        self.assertEqual(locations.geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+
+    def test_save_y_backfill(self):
+        oferta = self.oferta('Sevilla (híbrido)')
+        self.assertEqual((oferta.location_city, oferta.location_region), ('Sevilla', 'Andalucía'))
+        self.assertTrue(oferta.location_geohash.startswith('eyes'))
+
+        JobOffer.objects.filter(pk=oferta.pk).update(location='Valencia')
+        call_command('backfill_locations', stdout=StringIO())
+        oferta.refresh_from_db()
+        self.assertEqual(oferta.location_city, 'Valencia')
+
+    def test_cerca(self):
+        for ubicacion in ('Barcelona', 'Sabadell', 'Girona', 'Madrid', 'Remoto'):
+            self.oferta(ubicacion)
+        url = reverse('api_ofertas_publicas')
+        ciudades = lambda params: sorted(o['location_city'] for o in self.client.get(url, params).json()['results'])
+
+        self.assertEqual(ciudades({'cerca': 'bcn', 'radio': 25}), ['Barcelona', 'Sabadell'])
+        self.assertEqual(ciudades({'cerca': 'Barcelona', 'radio': 100}), ['Barcelona', 'Girona', 'Sabadell'])
+        # Ciudad desconocida: sin filtro
+        self.assertEqual(len(ciudades({'cerca': 'Atlantis'})), 5)
+
+        response = self.client.get(reverse('job_offer_list'), {'cerca': 'Madrid'})
+        self.assertEqual(len(response.context['cards']), 1)
+
+    def test_cercania_servida_por_el_indice(self):
+        queryset = locations.filtrar(
+            JobOffer.objects.filter(is_active=True), {'cerca': 'Madrid', 'radio': 50},
+        ).only('id')
+        sql, params = queryset.query.sql_with_params()
+        plan = ' '.join(slow_queries.explicar(connection, sql, params))
+        self.assertIn('SEARCH jobs_joboffer USING INDEX jobs_offer_geohash_idx', plan)
+        self.assertNotIn('SCAN jobs_joboffer', plan)
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        recommendations.reiniciar()
+        # Sin margen de relectura: aquí todas las filas tienen menos de un minuto y
+        # cada sincronización las releería todas (recarga completa)
+        patcher = mock.patch.object(recommendations, 'MARGEN', timedelta(0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Las sincronizaciones en segundo plano no verían los datos de la transacción
+        # del test: se comprueba que se lanzan y se hacen aquí con cargar()
+        patcher = mock.patch.object(recommendations, '_sincronizar_en_segundo_plano')
+        self.en_segundo_plano = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.hh = User.objects.create_user('hh')
+        self.candidato = User.objects.create_user('cand')
+        self.aplicada = self.oferta('Desarrollador Python', 'Backend con Django y PostgreSQL', 'Python, Django')
+        self.parecida = self.oferta('Programador Python Django', 'APIs REST con Django', 'Django REST framework')
+        self.inactiva = self.oferta('Python Django senior', 'Django', 'Python', is_active=False)
+        self.java = self.oferta('Ingeniero Java', 'Microservicios con Spring Boot', 'Java, Spring')
+        self.oferta('Diseñador UX', 'Prototipos en Figma', 'Figma, investigación de usuarios')
+        self.oferta('Responsable de marketing', 'Campañas SEO y SEM', 'Google Ads')
+        for puesto in ('Contable', 'Enfermera', 'Camarero', 'Conductor'):
+            self.oferta(puesto, f'Se busca {puesto.lower()}', '')
+        Candidatura.objects.create(offer=self.aplicada, user=self.candidato)
+        recommendations.cargar()
+
+    def oferta(self, title, description, requirements, **kwargs):
+        return JobOffer.objects.create(
+            created_by=self.hh, company_name='c', title=title, description=description,
+            requirements=requirements, **kwargs,
+        )
+
+    def recomendadas(self):
+        self.client.force_login(self.candidato)
+        return [o.pk for o in self.client.get(reverse('candidate_dashboard')).context['recomendadas']]
+
+    def test_tokenizar(self):
+        self.assertEqual(
+            tfidf.tokenizar('Desarrollador C++ y Node.js en Málaga (2 años)'),
+            ['desarrollador', 'c++', 'node.js', 'malaga'],
+        )
+
+    def test_recomienda_parecidas_activas(self):
+        # Ni la propia candidatura, ni la inactiva, ni las que no comparten términos
+        self.assertEqual(self.recomendadas(), [self.parecida.pk])
+
+    def test_sincronizacion_incremental(self):
+        self.assertEqual(self.recomendadas(), [self.parecida.pk])
+        base = recommendations.get_indice().base
+        with self.captureOnCommitCallbacks(execute=True):
+            self.java.description = 'Migración de Spring a Django'
+            self.java.requirements = 'Python y Django'
+            self.java.save()
+        # La petición no sincroniza: sirve la matriz anterior y lanza el hilo
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(recommendations.recomendar([self.aplicada.pk]), [(self.parecida.pk, mock.ANY)])
+        self.assertEqual(len(consultas), 0)
+        self.en_segundo_plano.assert_called_once()
+        recommendations.cargar()
+        self.assertEqual(self.recomendadas(), [self.parecida.pk, self.java.pk])
+        indice = recommendations.get_indice()
+        # Fila nueva en la cola y la anterior anulada, sin recarga completa
+        self.assertEqual((indice.base, len(indice.ofertas), indice.cola() > 0), (base, 11, True))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.parecida.is_active = False
+            self.parecida.save()
+        recommendations.cargar()
+        self.assertEqual(self.recomendadas(), [self.java.pk])
+
+    def test_carga_inicial_en_segundo_plano(self):
+        recommendations.reiniciar()
+        # La petición no espera a la carga: sale sin recomendaciones
+        self.assertEqual(self.recomendadas(), [])
+        self.en_segundo_plano.assert_called_once()
+        recommendations.cargar()
+        self.assertEqual(self.recomendadas(), [self.parecida.pk])
+
+    def test_oferta_borrada(self):
+        self.assertEqual(self.recomendadas(), [self.parecida.pk])
+        borrada = self.parecida.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.parecida.delete()
+        # Hasta que sincroniza, la matriz anterior la sigue teniendo: el panel la descarta
+        self.assertEqual(self.recomendadas(), [])
+        self.assertIn(borrada, recommendations.get_indice().fila_de)
+        # La sincronización no cuenta la tabla: la clave de borradas fuerza la recarga
+        with CaptureQueriesContext(connection) as consultas:
+            indice = recommendations.cargar()
+        self.assertNotIn(borrada, indice.fila_de)
+        self.assertEqual(indice.base, len(indice.filas))
+        self.assertFalse([q['sql'] for q in consultas if 'COUNT' in q['sql'] and '"actualizado"' not in q['sql']])
+
+    def test_rebuild_recommendations(self):
+        TerminosOferta.objects.all().delete()
+        recommendations.reiniciar()
+        recommendations.cargar()
+        self.assertEqual(self.recomendadas(), [])
+        salida = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebuild_recommendations', workers=2, batch_size=2, stdout=salida)
+        self.assertIn('10 ofertas', salida.getvalue())
+        recommendations.cargar()
+        self.assertEqual(self.recomendadas(), [self.parecida.pk])
+
+
+class FitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        grupo = Group.objects.create(name=HEADHUNTER_GROUP)
+        self.hh = User.objects.create_user('hh')
+        self.hh.groups.add(grupo)
+        self.oferta = JobOffer.objects.create(
+            created_by=self.hh, company_name='c', title='Backend', description='APIs REST en Python',
+            requirements='Python, Django y PostgreSQL',
+        )
+        self.mensajes = {
+            'poco': 'Sé algo de Python',
+            'nada': 'Me encanta la cocina mediterránea',
+            'mucho': 'Cinco años con Django, Python y PostgreSQL',
+        }
+        self.candidaturas = {
+            nombre: Candidatura.objects.create(
+                offer=self.oferta, user=User.objects.create_user(nombre), mensaje_personalizado=mensaje,
+            )
+            for nombre, mensaje in self.mensajes.items()
+        }
+
+    def test_puntuar(self):
+        mucho, poco, nada, vacio = fit.puntuar(
+            self.oferta, [self.mensajes['mucho'], self.mensajes['poco'], self.mensajes['nada'], ''],
+        )
+        self.assertGreater(mucho, poco)
+        self.assertGreater(poco, 0)
+        self.assertEqual((nada, vacio), (0, 0))
+
+    def test_orden_por_afinidad_y_cache(self):
+        self.client.force_login(self.hh)
+        url = reverse('offer_applications', kwargs={'offer_id': self.oferta.pk})
+        usuarios = lambda response: [a.user.username for a in response.context['applications']]
+
+        self.assertEqual(usuarios(self.client.get(url)), ['mucho', 'nada', 'poco'])
+        with mock.patch.object(fit, 'puntuar', wraps=fit.puntuar) as puntuar:
+            self.assertEqual(usuarios(self.client.get(url, {'orden': 'afinidad'})), ['mucho', 'poco', 'nada'])
+            puntuar.assert_not_called()
+
+            # Una candidatura nueva cambia el IDF del conjunto: se puntúan todas juntas...
+            Candidatura.objects.create(
+                offer=self.oferta, user=User.objects.create_user('nueva'), mensaje_personalizado='Django',
+            )
+            self.client.get(url)
+            self.assertEqual(puntuar.call_count, 1)
+            self.assertEqual(sorted(puntuar.call_args.args[1]), sorted([*self.mensajes.values(), 'Django']))
+            self.client.get(url)
+            self.assertEqual(puntuar.call_count, 1)
+
+            # ...y al editar la oferta, también
+            with self.captureOnCommitCallbacks(execute=True):
+                self.oferta.requirements = 'Cocina mediterránea'
+                self.oferta.save()
+            response = self.client.get(url, {'orden': 'afinidad'})
+            self.assertEqual(len(puntuar.call_args.args[1]), 4)
+            self.assertEqual(usuarios(response)[0], 'nada')
+
+
+class InvalidacionTests(TestCase):
+    """Las versiones de caché se cambian al confirmar la transacción, no antes."""
+
+    def setUp(self):
+        cache.clear()
+        self.hh = User.objects.create_user('hh')
+        self.oferta = JobOffer.objects.create(created_by=self.hh, company_name='c', title='Antes', description='d')
+
+    def test_fragmentos_de_oferta(self):
+        url = reverse('job_offer_detail', kwargs={'offer_id': self.oferta.pk})
+        self.assertContains(self.client.get(url), 'Antes')
+        version = fragments.get_offer_versions([self.oferta.pk])[self.oferta.pk]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.oferta.title = 'Después'
+            self.oferta.save()
+            # Una petición antes del commit no puede guardar HTML viejo bajo una versión nueva
+            self.assertEqual(fragments.get_offer_versions([self.oferta.pk])[self.oferta.pk], version)
+        self.assertNotEqual(fragments.get_offer_versions([self.oferta.pk])[self.oferta.pk], version)
+        self.assertContains(self.client.get(url), 'Después')
+
+    def test_version_de_agenda(self):
+        version = agenda.get_version(self.hh.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            AgendaAccion.objects.create(user=self.hh, oferta=self.oferta, titulo='a', fecha_hora_inicio=timezone.now())
+            self.assertEqual(agenda.get_version(self.hh.pk), version)
+        self.assertNotEqual(agenda.get_version(self.hh.pk), version)
+
+    def test_permisos(self):
+        grupo = Group.objects.create(name=HEADHUNTER_GROUP)
+        self.assertFalse(get_user_access(User.objects.get(pk=self.hh.pk)).is_headhunter)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hh.groups.add(grupo)
+            # Una petición durante la transacción no puede volver a guardar los roles viejos
+            self.assertFalse(get_user_access(User.objects.get(pk=self.hh.pk)).is_headhunter)
+        self.assertTrue(get_user_access(User.objects.get(pk=self.hh.pk)).is_headhunter)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            nueva = JobOffer.objects.create(created_by=self.hh, company_name='c', title='t', description='d')
+        self.assertIn(nueva.pk, get_user_access(User.objects.get(pk=self.hh.pk)).owned_offer_ids)
+
+
+class ContadoresTests(TestCase):
+    def setUp(self):
+        hh = User.objects.create_user('hh')
+        # Una oferta sin candidaturas antes, para que el lote de 1 no empiece por la desajustada
+        JobOffer.objects.create(created_by=hh, company_name='c', title='t', description='d')
+        self.oferta = JobOffer.objects.create(created_by=hh, company_name='c', title='t', description='d')
+        candidato = User.objects.create_user('candidato', email='candidato@example.com')
+        self.candidatura = Candidatura.objects.create(offer=self.oferta, user=candidato)
+
+    def test_guardados_con_instancias_viejas(self):
+        # Dos peticiones leen la candidatura pendiente y las dos la aceptan
+        primera = Candidatura.objects.get(pk=self.candidatura.pk)
+        segunda = Candidatura.objects.get(pk=self.candidatura.pk)
+        for candidatura in (primera, segunda):
+            candidatura.estado = CandidatureStatus.ACCEPTED
+            candidatura.save()
+        self.oferta.refresh_from_db()
+        self.assertEqual((self.oferta.num_pendientes, self.oferta.num_aceptadas), (0, 1))
+        self.assertEqual(OutboxEmail.objects.filter(candidatura=self.candidatura).count(), 1)
+
+    def test_reconcile_application_counters(self):
+        JobOffer.objects.filter(pk=self.oferta.pk).update(num_candidaturas=5, num_pendientes=0)
+        call_command('reconcile_application_counters', '--dry-run', stdout=StringIO())
+        self.oferta.refresh_from_db()
+        self.assertEqual(self.oferta.num_candidaturas, 5)
+
+        salida = StringIO()
+        call_command('reconcile_application_counters', '--batch-size', '1', stdout=salida)
+        self.assertIn(f'1 ofertas corregidas: {self.oferta.pk}', salida.getvalue())
+        self.oferta.refresh_from_db()
+        self.assertEqual((self.oferta.num_candidaturas, self.oferta.num_pendientes, self.oferta.num_aceptadas), (1, 1, 0))
+
+
+class CambioMasivoTests(TestCase):
+    def setUp(self):
+        self.hh = User.objects.create_user('hh')
+        self.hh.groups.add(Group.objects.create(name=HEADHUNTER_GROUP))
+        self.oferta = JobOffer.objects.create(created_by=self.hh, company_name='c', title='t', description='d')
+        ajena = JobOffer.objects.create(created_by=User.objects.create_user('otro'), company_name='c', title='t', description='d')
+        self.aceptar, self.rechazar, self.aceptada, self.sin_email = [
+            Candidatura.objects.create(offer=self.oferta, user=User.objects.create_user(f'cand{n}', email=email))
+            for n, email in enumerate(['a@example.com', 'b@example.com', 'c@example.com', ''])
+        ]
+        self.aceptada.estado = CandidatureStatus.ACCEPTED
+        self.aceptada.save()
+        self.ajena = Candidatura.objects.create(offer=ajena, user=User.objects.create_user('cand9', email='d@example.com'))
+        self.client.force_login(self.hh)
+
+    def enviar(self, cuerpo):
+        return self.client.post(
+            reverse('api_cambiar_estados_candidaturas'), json.dumps(cuerpo), content_type='application/json',
+        )
+
+    def test_lote_mixto(self):
+        correos = OutboxEmail.objects.count()
+        response = self.enviar({'cambios': [
+            {'id': self.aceptar.pk, 'estado': CandidatureStatus.ACCEPTED},
+            {'id': self.rechazar.pk, 'estado': CandidatureStatus.REJECTED},
+            {'id': self.sin_email.pk, 'estado': CandidatureStatus.REJECTED},
+            {'id': self.aceptada.pk, 'estado': CandidatureStatus.ACCEPTED},
+            {'id': self.ajena.pk, 'estado': CandidatureStatus.REJECTED},
+            {'id': 999999, 'estado': CandidatureStatus.REJECTED},
+        ]})
+        datos = response.json()
+        self.assertEqual((datos['actualizadas'], datos['sin_cambios'], datos['no_encontradas']), (3, 1, 2))
+        self.assertEqual(
+            [r['resultado'] for r in datos['resultados']],
+            ['actualizada', 'actualizada', 'actualizada', 'sin_cambios', 'no_encontrada', 'no_encontrada'],
+        )
+        # La candidatura de otro headhunter no se toca
+        self.ajena.refresh_from_db()
+        self.assertEqual(self.ajena.estado, CandidatureStatus.PENDING)
+
+        self.oferta.refresh_from_db()
+        self.assertEqual(
+            (self.oferta.num_candidaturas, self.oferta.num_pendientes, self.oferta.num_aceptadas, self.oferta.num_rechazadas),
+            (4, 0, 2, 2),
+        )
+        # Un aviso por candidatura cambiada con email, en la misma transacción
+        nuevos = OutboxEmail.objects.order_by('id')[correos:]
+        self.assertEqual([c.candidatura_id for c in nuevos], [self.aceptar.pk, self.rechazar.pk])
+
+    def test_avisos_encolados_por_tramos(self):
+        with mock.patch.object(outbox, 'LOTE_ENCOLADO', 1), \
+                mock.patch.object(outbox, 'encolar_cambios_estado', wraps=outbox.encolar_cambios_estado) as encolar:
+            creados = outbox.encolar_cambios_estado_por_ids([self.aceptar.pk, self.rechazar.pk, self.sin_email.pk])
+        self.assertEqual(creados, 2)
+        self.assertEqual([len(llamada.args[0]) for llamada in encolar.call_args_list], [1, 1, 1])
+
+    def test_maximo_por_peticion(self):
+        with mock.patch('jobs.views.BULK_STATUS_MAX', 2):
+            response = self.enviar({'estado': CandidatureStatus.REJECTED, 'ids': [self.aceptar.pk, self.rechazar.pk, self.aceptada.pk]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Como máximo 2', response.json()['message'])
+        self.assertEqual(Candidatura.objects.filter(estado=CandidatureStatus.REJECTED).count(), 0)
+
+
+class PlantillaTests(TestCase):
+    def test_version_con_ediciones_a_la_vez(self):
+        plantilla = StatusMessageTemplate.objects.create(user=User.objects.create_user('hh'), estado='aceptado', mensaje='a')
+        primera = StatusMessageTemplate.objects.get(pk=plantilla.pk)
+        segunda = StatusMessageTemplate.objects.get(pk=plantilla.pk)
+        primera.mensaje = 'b'
+        primera.save()
+        segunda.mensaje = 'c'
+        segunda.save(update_fields=['mensaje'])
+        self.assertEqual((primera.version, segunda.version), (2, 3))
+        plantilla.refresh_from_db()
+        self.assertEqual((plantilla.mensaje, plantilla.version), ('c', 3))
+
+
+class EscriturasConcurrentesTests(TransactionTestCase):
+    """
+    Dos hilos (dos conexiones) escribiendo a la vez a través de con_reintentos.
+    La base de datos de test está en memoria con caché compartida: ahí un choque
+    da "database table is locked" sin esperar al busy_timeout, así que cada uno
+    pasa por los reintentos.
+    """
+
+    def test_sin_database_is_locked(self):
+        hh = User.objects.create_user('hh')
+        errores = []
+
+        @db.con_reintentos
+        def crear(n):
+            oferta = JobOffer.objects.create(created_by=hh, company_name='c', title=f'Oferta {n}', description='d')
+            # Se retiene el bloqueo de escritura para que el otro hilo tenga que esperar
+            time.sleep(0.02)
+            return oferta
+
+        def escribir(hilo):
+            try:
+                for n in range(10):
+                    crear(f'{hilo}-{n}')
+            except Exception as exc:
+                errores.append(exc)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=escribir, args=(hilo,)) for hilo in range(2)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(errores, [])
+        self.assertEqual(JobOffer.objects.count(), 20)
+
+
+class HeadhunterDashboardTests(TestCase):
+    def setUp(self):
+        self.hh = User.objects.create_user('hh')
+        self.hh.groups.add(Group.objects.create(name=HEADHUNTER_GROUP))
+        self.oferta = JobOffer.objects.create(created_by=self.hh, company_name='c', title='t', description='d')
+
+    def test_paginas_estables_al_cambiar_estados(self):
+        candidaturas = [
+            Candidatura.objects.create(offer=self.oferta, user=User.objects.create_user(f'cand{n}')) for n in range(4)
+        ]
+        self.assertEqual({c.headhunter_id for c in candidaturas}, {self.hh.pk})
+        self.client.force_login(self.hh)
+        url = reverse('headhunter_dashboard')
+        primera = self.client.get(url, {'page_size': 2}).context['page_obj']
+
+        # Aceptar la más antigua no la sube a la primera página: sigue en la segunda
+        antigua = candidaturas[0]
+        antigua.estado = CandidatureStatus.ACCEPTED
+        antigua.save()
+        segunda = self.client.get(url, {'page_size': 2, 'cursor': primera.next_cursor}).context['page_obj']
+        vistas = [c.pk for c in primera.object_list] + [c.pk for c in segunda.object_list]
+        self.assertEqual(vistas, [c.pk for c in reversed(candidaturas)])
+
+    def test_paginas_servidas_por_el_indice(self):
+        for filtros, indice in [({}, 'jobs_cand_hh_fecha_idx'), ({'oferta': self.oferta.pk}, 'jobs_cand_offer_fecha_idx')]:
+            peticion = RequestFactory().get(reverse('headhunter_dashboard'), filtros)
+            peticion.user = self.hh
+            vista = HeadhunterDashboardView()
+            vista.setup(peticion)
+            queryset = vista.get_queryset().order_by('-fecha_aplicacion', '-id')[:26]
+            sql, params = queryset.query.sql_with_params()
+            plan = ' '.join(slow_queries.explicar(connection, sql, params))
+            with self.subTest(filtros=filtros):
+                self.assertIn(f'SEARCH jobs_candidatura USING INDEX {indice}', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+
+class AgendaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hh = User.objects.create_user('hh')
+        self.hh.groups.add(Group.objects.create(name=HEADHUNTER_GROUP))
+        self.client.force_login(self.hh)
+        self.inicio = timezone.make_aware(datetime(2026, 3, 2, 9, 0))
+        self.fin = self.inicio + timedelta(days=2)
+
+    def accion(self, desfase, duracion=30):
+        return AgendaAccion.objects.create(
+            user=self.hh, titulo='a', fecha_hora_inicio=self.inicio + desfase, duracion_minutos=duracion,
+        )
+
+    def pedir(self, start=None, end=None, **headers):
+        return self.client.get(reverse('api_acciones_headhunter'), {
+            'start': start or self.inicio.isoformat(), 'end': end or self.fin.isoformat(),
+        }, **headers)
+
+    def test_acciones_que_se_solapan_con_la_ventana(self):
+        dentro = [
+            self.accion(-timedelta(hours=7), 480),  # la más larga posible, desde el límite del lookback
+            self.accion(-timedelta(hours=2), 180),  # empezó antes y acaba dentro
+            self.accion(timedelta(days=1)),
+        ]
+        self.accion(-timedelta(hours=8), 480)  # acaba justo al empezar la ventana
+        self.accion(-timedelta(hours=1))
+        self.accion(timedelta(days=2))  # empieza justo al acabar
+        response = self.pedir()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([int(e['id']) for e in response.json()], [a.pk for a in dentro])
+        self.assertNotIn('X-Agenda-Truncated', response)
+
+    def test_respuesta_truncada(self):
+        for hora in range(3):
+            self.accion(timedelta(hours=hora))
+        with mock.patch('jobs.views.AGENDA_MAX_EVENTS', 2):
+            response = self.pedir()
+        self.assertEqual(len(response.json()), 2)
+        self.assertEqual(response['X-Agenda-Truncated'], '2')
+
+    def test_limites_de_la_ventana(self):
+        self.accion(timedelta(hours=1))
+        # El '+' del offset llega como espacio; la fecha con espacio antes de la hora no es un offset
+        for start, end in [('2026-03-02T09:00:00 00:00', '2026-03-04T09:00:00 00:00'), ('2026-03-02 09:00', '2026-03-04 09:00')]:
+            with self.subTest(start=start):
+                response = self.pedir(start, end)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()), 1)
+        for start, end in [('basura', None), (None, self.inicio.isoformat()), (self.fin.isoformat(), None)]:
+            with self.subTest(start=start, end=end):
+                self.assertEqual(self.pedir(start, end).status_code, 400)
+
+    def test_etag(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            accion = self.accion(timedelta(hours=1))
+        primera = self.pedir()
+        etag = primera['ETag']
+        self.assertEqual(primera['Cache-Control'], 'private, no-cache')
+
+        # La misma ventana sin cambios: 304 sin tocar las tablas de la agenda
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.pedir(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse([q['sql'] for q in consultas if 'jobs_agenda' in q['sql']])
+
+        # Editar la acción cambia el cuerpo y con él el ETag
+        with self.captureOnCommitCallbacks(execute=True):
+            accion.titulo = 'Entrevista'
+            accion.save()
+        response = self.pedir(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Entrevista', response.json()[0]['title'])
+
+    def test_cambios(self):
+        url = reverse('api_acciones_cambios')
+        editada, borrada = self.accion(timedelta(hours=1)), self.accion(timedelta(hours=2))
+        datos = self.client.get(url, {'token': 0}).json()
+        self.assertEqual(sorted(e['id'] for e in datos['upserted']), [editada.pk, borrada.pk])
+        token = datos['token']
+
+        editada.titulo = 'Entrevista'
+        editada.save()
+        borrada_id = borrada.pk
+        borrada.delete()
+        datos = self.client.get(url, {'token': token}).json()
+        self.assertEqual([e['id'] for e in datos['upserted']], [editada.pk])
+        self.assertEqual((datos['deleted'], datos['reset']), ([borrada_id], False))
+        self.assertGreater(datos['token'], token)
+
+        # Con el último token no queda nada por sincronizar
+        sin_cambios = self.client.get(url, {'token': datos['token']}).json()
+        self.assertEqual((sin_cambios['token'], sin_cambios['upserted'], sin_cambios['deleted']), (datos['token'], [], []))
+
+        # Demasiados cambios: el cliente recarga el feed entero
+        with mock.patch('jobs.views.AGENDA_MAX_SYNC_CHANGES', 1):
+            self.assertTrue(self.client.get(url, {'token': token}).json()['reset'])
+        self.assertEqual(self.client.get(url, {'token': 'x'}).status_code, 400)
+
+    def test_duracion_maxima(self):
+        accion = AgendaAccion(user=self.hh, titulo='a', fecha_hora_inicio=self.inicio, duracion_minutos=481)
+        with self.assertRaises(ValidationError):
+            accion.full_clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            accion.save()
+
+
+class BackendQueFalla(locmem.EmailBackend):
+    """Correo en memoria que rechaza los destinatarios de falla.example.com."""
+
+    def send_messages(self, messages):
+        if any(to.endswith('@falla.example.com') for message in messages for to in message.to):
+            raise ConnectionError('rechazado')
+        return super().send_messages(messages)
+
+
+class OutboxTests(TestCase):
+    def correo(self, destinatario='cand@example.com', **kwargs):
+        return OutboxEmail.objects.create(destinatario=destinatario, asunto='a', cuerpo='c', **kwargs)
+
+    def test_reclamar_lote_reserva_los_correos(self):
+        ahora = timezone.now()
+        primero = self.correo(proximo_intento=ahora - timedelta(minutes=2))
+        segundo = self.correo(proximo_intento=ahora - timedelta(minutes=1))
+        self.correo(proximo_intento=ahora + timedelta(minutes=1))
+        self.correo(estado=OutboxEmail.Estado.ENVIADO, proximo_intento=ahora - timedelta(minutes=3))
+
+        self.assertEqual(outbox.reclamar_lote(10), [primero, segundo])
+        # Reservados: otro worker no los toma hasta que expira la reserva
+        self.assertEqual(outbox.reclamar_lote(10), [])
+        primero.refresh_from_db()
+        self.assertGreater(primero.proximo_intento, ahora + outbox.LEASE - timedelta(minutes=1))
+        with mock.patch('django.utils.timezone.now', return_value=ahora + outbox.LEASE + timedelta(minutes=2)):
+            self.assertEqual(len(outbox.reclamar_lote(10)), 3)
+
+    def test_enviar_lote(self):
+        enviado = self.correo()
+        fallido = self.correo('cand@falla.example.com')
+        self.assertEqual(outbox.enviar_lote(mail_connection=BackendQueFalla()), (1, 1))
+        self.assertEqual([m.to for m in mail.outbox], [['cand@example.com']])
+
+        enviado.refresh_from_db()
+        self.assertEqual(enviado.estado, OutboxEmail.Estado.ENVIADO)
+        self.assertIsNotNone(enviado.enviado)
+        fallido.refresh_from_db()
+        self.assertEqual((fallido.estado, fallido.intentos), (OutboxEmail.Estado.PENDIENTE, 1))
+        self.assertEqual(fallido.ultimo_error, 'ConnectionError: rechazado')
+        self.assertGreater(fallido.proximo_intento, timezone.now())
+
+    def test_maximo_de_intentos(self):
+        correo = self.correo('cand@falla.example.com', intentos=outbox.MAX_INTENTOS - 1)
+        outbox.enviar_lote(mail_connection=BackendQueFalla())
+        correo.refresh_from_db()
+        self.assertEqual((correo.estado, correo.intentos), (OutboxEmail.Estado.FALLIDO, outbox.MAX_INTENTOS))
+        self.assertEqual(outbox.reclamar_lote(10), [])
+
+    def test_sin_conexion_se_reprograma_el_lote(self):
+        correos = [self.correo(), self.correo()]
+        conexion = mock.Mock(**{'open.side_effect': OSError('sin red')})
+        self.assertEqual(outbox.enviar_lote(mail_connection=conexion), (0, 2))
+        self.assertEqual(
+            list(OutboxEmail.objects.filter(pk__in=[c.pk for c in correos]).values_list('intentos', 'ultimo_error')),
+            [(1, 'OSError: sin red')] * 2,
+        )
+
+    def test_calcular_backoff(self):
+        with mock.patch.object(outbox.random, 'uniform', return_value=1):
+            esperas = [outbox.calcular_backoff(intentos).total_seconds() for intentos in (1, 2, 3, 30)]
+        base = outbox.BACKOFF_BASE
+        self.assertEqual(esperas, [base, 2 * base, 4 * base, outbox.BACKOFF_MAX])
+        # Con jitter queda dentro del ±20%
+        for _ in range(20):
+            self.assertTrue(0.8 * base <= outbox.calcular_backoff(1).total_seconds() <= 1.2 * base)
+
+    def test_send_outbox(self):
+        for n in range(3):
+            self.correo(f'cand{n}@example.com')
+        salida = StringIO()
+        call_command('send_outbox', batch_size=2, stdout=salida)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn('Bandeja procesada: 3 enviados, 0 fallidos, 0 pendientes.', salida.getvalue())
+        self.assertEqual(outbox.profundidad(), 0)
+
+
+class ReplicaTests(TransactionTestCase):
+    """Réplica de lectura en un segundo fichero SQLite, puesta al día con sync_sqlite_replicas."""
+
+    @classmethod
+    def setUpClass(cls):
+        # El alias se crea aquí: el runner reúne los `databases` de los tests antes de existir
+        cls.databases = {'default', 'replica1'}
+        cls.directorio = tempfile.TemporaryDirectory()
+        principal = connections['default'].settings_dict
+        # Como las de SQLITE_REPLICAS: solo lectura y espejo de default (no se vacía entre tests)
+        settings.DATABASES['replica1'] = connections.settings['replica1'] = {
+            **principal,
+            'NAME': str(Path(cls.directorio.name) / 'replica.sqlite3'),
+            'OPTIONS': {**principal['OPTIONS'], 'init_command': principal['OPTIONS']['init_command'] + ';PRAGMA query_only=1'},
+            'TEST': {**principal['TEST'], 'MIRROR': 'default'},
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica1'].close()
+        del connections['replica1']
+        # connections.settings suele ser el mismo dict que settings.DATABASES
+        connections.settings.pop('replica1', None)
+        settings.DATABASES.pop('replica1', None)
+        cls.directorio.cleanup()
+
+    def setUp(self):
+        cache.clear()
+        enrutador = next(r for r in db_router.routers if isinstance(r, PrimaryReplicaRouter))
+        for atributo, valor in (('replicas', ['replica1']), ('aliases', {'default', 'replica1'})):
+            patcher = mock.patch.object(enrutador, atributo, valor)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.hh = User.objects.create_user('hh')
+        self.candidato = User.objects.create_user('cand')
+        self.oferta = JobOffer.objects.create(created_by=self.hh, company_name='c', title='Copiada', description='d')
+        call_command('sync_sqlite_replicas', stdout=StringIO())
+
+    def test_lecturas_atrasadas_y_fijadas(self):
+        nueva = JobOffer.objects.create(created_by=self.hh, company_name='c', title='Sin copiar', description='d')
+        # Fuera de una transacción y sin fijar, se lee de la réplica: todavía sin la oferta nueva
+        self.assertTrue(JobOffer.objects.filter(pk=self.oferta.pk).exists())
+        self.assertFalse(JobOffer.objects.filter(pk=nueva.pk).exists())
+        self.assertTrue(JobOffer.objects.using('default').filter(pk=nueva.pk).exists())
+
+        self.client.force_login(self.candidato)
+        detalle = reverse('job_offer_detail', kwargs={'offer_id': self.oferta.pk})
+        response = self.client.post(reverse('apply_to_offer', kwargs={'offer_id': self.oferta.pk}), {'mensaje_personalizado': 'Hola'})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertFalse(Candidatura.objects.filter(offer=self.oferta).exists())
+        # Con la cookie, la siguiente petición lee de la principal y ve su candidatura...
+        self.assertContains(self.client.get(detalle), 'Ya has postulado')
+        # ...sin ella, de la réplica, hasta la siguiente copia
+        del self.client.cookies[PIN_COOKIE]
+        self.assertNotContains(self.client.get(detalle), 'Ya has postulado')
+        call_command('sync_sqlite_replicas', stdout=StringIO())
+        self.assertContains(self.client.get(detalle), 'Ya has postulado')
+
+    def test_cache_tras_un_cambio_reciente(self):
+        detalle = reverse('job_offer_detail', kwargs={'offer_id': self.oferta.pk})
+        self.assertContains(self.client.get(detalle), 'Copiada')
+        self.oferta.title = 'Editada'
+        self.oferta.save()
+        # La réplica sigue con el título viejo, pero la versión acaba de cambiar: el
+        # fragmento se rellena desde la principal y no se guarda el HTML atrasado
+        self.assertTrue(JobOffer.objects.filter(title='Copiada').exists())
+        self.assertContains(self.client.get(detalle), 'Editada')
+
+    def test_escritura_en_la_replica_rechazada(self):
+        with self.assertRaises(OperationalError):
+            JobOffer.objects.using('replica1').filter(pk=self.oferta.pk).update(title='x')
@@ -0,0 +1,68 @@
+# jobs/tfidf.py
+"""
+Términos de los textos de ofertas y candidaturas para las comparaciones por
+TF-IDF (recomendaciones y afinidad de candidatos).
+
+Solo funciones puras sobre texto, sin Django: se ejecutan también en los
+procesos de `manage.py rebuild_recommendations`. El peso de frecuencia de
+cada término es 1 + log(apariciones); el IDF depende del conjunto de ofertas
+y lo aplica quien compara.
+"""
+import math
+import re
+import unicodedata
+from collections import Counter
+
+# "python", "c++", "c#", "node.js", "ci/cd" -> "ci", "cd"
+_TOKEN = re.compile(r'[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*')
+
+STOPWORDS = frozenset('''
+a al algo ante antes aqui asi bajo bien cada como con conmigo contra cual cuando de del desde donde dos
+durante e el ella ellas ellos en entre era es esa ese eso esta estar este esto estos fue gran ha hace
+hacer han hasta hay la las le les lo los mas me mi muy nada ni no nos nuestra nuestro nuestros o os otra
+otro para pero poco por porque que quien se segun ser si sin sobre solo son su sus tambien tan te tener
+tiene tienen todo todos tras tu tus un una uno unos usted vez y ya
+about an and are as at be by for from has have in is it of on or our that the this to we will with you your
+experiencia buscamos empresa equipo trabajo puesto oferta valorara valorable conocimientos anos
+'''.split())
+
+# Peso de cada campo de la oferta: el título y la categoría dicen más que la descripción
+PESOS_CAMPOS = (('title', 3), ('category', 3), ('requirements', 2), ('description', 1))
+
+
+def _sin_tildes(texto):
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def tokenizar(texto):
+    """Palabras significativas del texto, en minúsculas y sin tildes."""
+    return [
+        token for token in _TOKEN.findall(_sin_tildes(texto or ''))
+        if token not in STOPWORDS and (len(token) > 1 or token[-1] in '+#') and not token.isdigit()
+    ]
+
+
+def pesos(apariciones):
+    """{término: 1 + log(apariciones)} a partir de un Counter."""
+    return {termino: 1 + math.log(n) for termino, n in apariciones.items() if n > 0}
+
+
+def terminos(texto):
+    """Pesos de frecuencia de un texto suelto (p. ej. el mensaje de una candidatura)."""
+    return pesos(Counter(tokenizar(texto)))
+
+
+def terminos_oferta(title, description, requirements, category):
+    """Pesos de frecuencia de una oferta, con sus campos ponderados por PESOS_CAMPOS."""
+    textos = {'title': title, 'description': description, 'requirements': requirements, 'category': category}
+    apariciones = Counter()
+    for campo, peso in PESOS_CAMPOS:
+        for token in tokenizar(textos[campo]):
+            apariciones[token] += peso
+    return pesos(apariciones)
+
+
+def terminos_ofertas(filas):
+    """[(id, terminos)] para filas (id, title, description, requirements, category). Para los procesos del pool."""
+    return [(fila[0], terminos_oferta(*fila[1:])) for fila in filas]
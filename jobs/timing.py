@@ -0,0 +1,117 @@
+# jobs/timing.py
+"""
+Medición del tiempo de cada petición: total, base de datos (tiempo y número
+de consultas) y renderizado de plantillas. La recoge RequestTimingMiddleware
+(jobs/middleware.py), que la devuelve en la cabecera Server-Timing y la
+escribe en el log 'jobs.timing'.
+
+El tiempo de base de datos se mide con connection.execute_wrapper y el de
+plantillas con el backend DjangoTemplatesMedidas (ver TEMPLATES en settings).
+Las consultas que se lanzan mientras se renderiza una plantilla (querysets
+perezosos) cuentan como base de datos, no como plantilla. Las lentas se pasan
+además a jobs.slow_queries.
+"""
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+from . import slow_queries
+
+_medicion = ContextVar('jobs_medicion', default=None)
+
+
+class Medicion:
+    """Acumulador de una petición. Tiempos en segundos."""
+
+    __slots__ = ('inicio', 'db', 'consultas', 'plantillas', 'ruta', '_renderizando')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.db = 0.0
+        self.consultas = 0
+        self.plantillas = 0.0
+        self.ruta = None  # nombre de la URL, cuando ya se ha resuelto
+        self._renderizando = False
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.inicio
+
+    def desglose(self):
+        """{'total', 'db', 'plantillas', 'python'} en milisegundos, más 'consultas'."""
+        total = self.total
+        return {
+            'total': total * 1000,
+            'db': self.db * 1000,
+            'plantillas': self.plantillas * 1000,
+            'python': max(total - self.db - self.plantillas, 0) * 1000,
+            'consultas': self.consultas,
+        }
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper: se llama en cada consulta de cualquier conexión
+        inicio = time.perf_counter()
+        try:
+            resultado = execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.db += duracion
+            self.consultas += 1
+        # Solo las que terminan bien: tras un error no se pide el plan
+        slow_queries.registrar(context['connection'], sql, params, many, duracion, self.ruta)
+        return resultado
+
+
+def actual():
+    """La medición de la petición en curso, o None fuera de RequestTimingMiddleware."""
+    return _medicion.get()
+
+
+@contextmanager
+def medir():
+    """Mide el bloque: instala el acumulador en todas las conexiones y lo devuelve."""
+    medicion = Medicion()
+    token = _medicion.set(medicion)
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(medicion))
+            yield medicion
+    finally:
+        _medicion.reset(token)
+
+
+class PlantillaMedida:
+    """Envuelve una plantilla del backend de Django y suma su tiempo de render."""
+
+    def __init__(self, plantilla):
+        self._plantilla = plantilla
+
+    def __getattr__(self, nombre):
+        return getattr(self._plantilla, nombre)
+
+    def render(self, context=None, request=None):
+        medicion = _medicion.get()
+        # Las plantillas que se renderizan dentro de otra ya cuentan en la de fuera
+        if medicion is None or medicion._renderizando:
+            return self._plantilla.render(context, request)
+        medicion._renderizando = True
+        inicio, db = time.perf_counter(), medicion.db
+        try:
+            return self._plantilla.render(context, request)
+        finally:
+            medicion.plantillas += time.perf_counter() - inicio - (medicion.db - db)
+            medicion._renderizando = False
+
+
+class DjangoTemplatesMedidas(DjangoTemplates):
+    """El backend de plantillas de Django, midiendo el tiempo de cada render."""
+
+    def from_string(self, template_code):
+        return PlantillaMedida(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return PlantillaMedida(super().get_template(template_name))
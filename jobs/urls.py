@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     # URLs para ofertas de empleo (accesibles por candidatos y headhunters)
     path('ofertas/', views.JobOfferList.as_view(), name='job_offer_list'),
+    path('api/ofertas/', views.api_ofertas_publicas, name='api_ofertas_publicas'),
     path('oferta/<int:offer_id>/', views.JobOfferDetailView.as_view(), name='job_offer_detail'),
     path('oferta/<int:offer_id>/postular/', views.apply_to_offer, name='apply_to_offer'),
     path('oferta/crear/', views.CreateOfferView.as_view(), name='create_offer'), # Solo headhunters
@@ -14,10 +15,12 @@ urlpatterns = [
     path('headhunter/', views.HeadhunterDashboardView.as_view(), name='headhunter_dashboard'),
     path('headhunter/oferta/<int:offer_id>/candidaturas/', views.OfferApplicationsView.as_view(), name='offer_applications'),
     path('headhunter/candidatura/<int:candidature_id>/update/', views.cambiar_estado_candidatura, name='cambiar_estado_candidatura'),
+    path('headhunter/api/candidaturas/estado/', views.api_cambiar_estados_candidaturas, name='api_cambiar_estados_candidaturas'),
     
     # URLs para la agenda del headhunter
     path('headhunter/agenda/', views.agenda, name='agenda'),
     path('headhunter/api/acciones/', views.api_acciones_headhunter, name='api_acciones_headhunter'),
+    path('headhunter/api/acciones/cambios/', views.api_acciones_cambios, name='api_acciones_cambios'),
     path('headhunter/crear-accion-ajax/', views.crear_accion_ajax, name='crear_accion_ajax'),
     path('headhunter/agenda/editar-accion-ajax/<int:accion_id>/', views.editar_accion_ajax, name='editar_accion_ajax'), # Añadido
     path('headhunter/agenda/eliminar-accion-ajax/<int:accion_id>/', views.eliminar_accion_ajax, name='eliminar_accion_ajax'), # Añadido
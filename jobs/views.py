@@ -1,18 +1,27 @@
 # jobs/views.py
 
 from django.shortcuts import render, redirect, get_object_or_404
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse # Import HttpResponse for the edit form content
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified, Http404 # Import HttpResponse for the edit form content
 from django.utils.decorators import method_decorator
-from datetime import timedelta # Necesario para calcular 'end' en eventos de calendario
+import hmac
+import json
+import re
+from datetime import datetime, time, timedelta # Necesario para calcular 'end' en eventos de calendario
 from django.views.decorators.http import require_GET, require_POST # Importar para decoradores de método HTTP
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import parse_etags
+from django.core.serializers.json import DjangoJSONEncoder
 
 # Importa tus modelos y formularios
-from .models import JobOffer, Candidatura, AgendaAccion, StatusMessageTemplate
+from .models import JobOffer, Candidatura, CandidatureStatus, AgendaAccion, StatusMessageTemplate, OutboxEmail
 
 # Corregido 'CandidatureStatusForm' a 'CandidaturaStatusForm'
 from .forms import JobOfferForm, CandidaturaForm, AgendaAccionForm, CandidaturaStatusForm 
@@ -20,6 +29,69 @@ from .forms import JobOfferForm, CandidaturaForm, AgendaAccionForm, CandidaturaS
 # Importa tus decoradores personalizados y Mixins
 from .decorators import headhunter_required, HeadhunterRequiredMixin 
 
+from .access import get_user_access
+from . import agenda as agenda_cache
+from .pagination import KeysetPaginator, KeysetPage, InvalidCursor
+from . import search
+from . import facets
+from . import fragments
+from . import metrics as app_metrics
+from . import locations
+from . import salaries
+from . import recommendations
+from . import fit
+from .db import con_reintentos, guardar
+from .routers import lectura_para_cache
+
+# Tamaño de página por defecto y máximo para los listados paginados por cursor
+OFFERS_PAGE_SIZE = 20
+OFFERS_MAX_PAGE_SIZE = 100
+
+
+def get_page_size(request, default=OFFERS_PAGE_SIZE, maximum=OFFERS_MAX_PAGE_SIZE):
+    """
+    Lee ?page_size= acotándolo a [1, maximum]. Valores no numéricos usan el defecto.
+    """
+    try:
+        size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+def paginate_offers(request, queryset, page_size, key_field='created_at'):
+    """
+    Aplica la paginación por cursor (created_at, id) al queryset de ofertas, o
+    (salary_max, id) al ordenar por salario.
+    Un cursor manipulado o corrupto devuelve 404, como hace Paginator con páginas inválidas.
+    """
+    paginator = KeysetPaginator(queryset, page_size, key_field=key_field)
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        raise Http404('Cursor de paginación no válido.')
+    return paginator, page
+
+
+def search_offers_page(request, queryset, page_size, restrict=False):
+    """
+    Modo búsqueda: resultados ordenados por relevancia (BM25). El cursor es el
+    desplazamiento dentro del ranking, ya que la relevancia no es una clave de índice.
+    Con `restrict` el ranking se limita a `queryset` (filtros de facetas).
+    """
+    cursor = request.GET.get('cursor')
+    try:
+        offset = max(0, int(cursor)) if cursor else 0
+    except ValueError:
+        raise Http404('Cursor de paginación no válido.')
+    rows = search.search_offers(queryset, request.GET['q'], page_size + 1, offset, restrict=restrict)
+    has_next = len(rows) > page_size
+    return KeysetPage(
+        rows[:page_size],
+        next_cursor=str(offset + page_size) if has_next else None,
+        previous_cursor=str(max(0, offset - page_size)) if offset else None,
+    )
+
 # --- Vistas del Dashboard del Headhunter y Gestión de Ofertas ---
 
 # Usamos HeadhunterRequiredMixin directamente en lugar del decorador para CBV ---
@@ -32,14 +104,69 @@ class HeadhunterDashboardView(HeadhunterRequiredMixin, ListView):
     model = Candidatura
     template_name = 'jobs/headhunter_dashboard.html'
     context_object_name = 'candidaturas'
+    paginate_by = 25
+    # Ofertas que se muestran en la franja de resumen (las de más candidaturas)
+    summary_offers = 10
+
+    def get_filters(self):
+        """
+        Filtros de la URL ya validados: ?estado= debe ser un estado válido y
+        ?oferta= una oferta del propio headhunter; si no, se ignoran.
+        """
+        estado = self.request.GET.get('estado')
+        if estado not in CandidatureStatus.values:
+            estado = None
+        try:
+            oferta = int(self.request.GET.get('oferta', ''))
+        except ValueError:
+            oferta = None
+        if oferta is not None and not get_user_access(self.request.user).owns_offer(oferta):
+            oferta = None
+        return estado, oferta
 
     def get_queryset(self):
-        # Filtra candidaturas de ofertas creadas por el headhunter actual
-        return Candidatura.objects.filter(offer__created_by=self.request.user).order_by('-updated_at')
+        # Candidaturas de las ofertas del headhunter actual (copiado en la candidatura: índice
+        # jobs_cand_hh_fecha_idx, sin unir con las ofertas para filtrar ni ordenar).
+        # Candidato y oferta se traen en la misma consulta (solo las columnas que pinta la tabla).
+        queryset = Candidatura.objects.filter(headhunter=self.request.user).select_related('user', 'offer').only(
+            'id', 'estado', 'fecha_aplicacion', 'updated_at', 'offer_id', 'user_id',
+            'offer__id', 'offer__title',
+            'user__id', 'user__username', 'user__first_name', 'user__last_name',
+        )
+        estado, oferta = self.get_filters()
+        if estado:
+            queryset = queryset.filter(estado=estado)
+        if oferta:
+            queryset = queryset.filter(offer_id=oferta)
+        return queryset
+
+    def get_paginate_by(self, queryset):
+        return get_page_size(self.request, default=self.paginate_by)
+
+    def paginate_queryset(self, queryset, page_size):
+        # Cursor sobre (fecha_aplicacion, id): el coste de cada página no depende de su
+        # profundidad. No sobre updated_at: cambiar un estado movería la candidatura a la
+        # primera página y se saltaría o repetiría filas al pasar de página
+        paginator = KeysetPaginator(queryset, page_size, key_field='fecha_aplicacion')
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Cursor de paginación no válido.')
+        return (paginator, page, page.object_list, page.has_other_pages())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['is_headhunter'] = True 
+        # Resumen por oferta: los contadores desnormalizados salen en una sola consulta
+        offers = list(
+            JobOffer.objects.filter(created_by=self.request.user)
+            .only('id', 'title', *JobOffer.CAMPOS_CONTADOR)
+            .order_by('-num_candidaturas', 'title')
+        )
+        context['offers'] = offers
+        context['summary_offers'] = [offer for offer in offers[:self.summary_offers] if offer.num_candidaturas]
+        context['estados'] = CandidatureStatus.choices
+        context['estado_actual'], context['oferta_actual'] = self.get_filters()
         return context
 
 class CreateOfferView(HeadhunterRequiredMixin, CreateView):
@@ -69,6 +196,7 @@ class EditOfferView(HeadhunterRequiredMixin, UpdateView):
     form_class = JobOfferForm
     template_name = 'jobs/edit_offer.html'
     pk_url_kwarg = 'offer_id' 
+    context_object_name = 'offer'  # La plantilla usa `offer` (enlace de vuelta al detalle)
     
     def get_queryset(self):
         # Solo permitir editar ofertas creadas por el usuario actual
@@ -93,16 +221,100 @@ class JobOfferList(ListView):
     """
     Muestra una lista de todas las ofertas de empleo activas.
     Accesible para todos los usuarios.
+
+    Los ids de cada página y el HTML de cada tarjeta salen de la caché compartida
+    (jobs/fragments.py); solo lo personal (ofertas propias y postuladas) se
+    calcula en cada petición. Los filtros por facetas (jobs/facets.py), salario
+    (jobs/salaries.py) y cercanía (jobs/locations.py) forman parte de la clave
+    de cada página.
     """
     template_name = 'jobs/job_offer_list.html'
     model = JobOffer
     context_object_name = 'offers'
     queryset = JobOffer.objects.filter(is_active=True).order_by('-created_at')
+    paginate_by = OFFERS_PAGE_SIZE
+
+    def get_queryset(self):
+        self.filtros = facets.leer_filtros(self.request.GET)
+        self.filtros_salario = salaries.leer_filtros(self.request.GET)
+        self.filtros_ubicacion = locations.leer_filtros(self.request.GET)
+        queryset = facets.filtrar(super().get_queryset(), self.filtros)
+        queryset = salaries.filtrar(queryset, self.filtros_salario)
+        return locations.filtrar(queryset, self.filtros_ubicacion)
+
+    def get_paginate_by(self, queryset):
+        return get_page_size(self.request, default=self.paginate_by)
+
+    def paginate_queryset(self, queryset, page_size):
+        # La página contiene solo ids; el HTML de las tarjetas se añade en get_context_data
+        if self.request.GET.get('q', '').strip():
+            # La búsqueda ordena por relevancia: ?orden=salario solo filtra
+            restrict = bool(self.filtros or self.filtros_salario or self.filtros_ubicacion)
+            page = search_offers_page(self.request, queryset, page_size, restrict=restrict)
+            ids = [offer.pk for offer in page.object_list]
+            page = KeysetPage(ids, page.next_cursor, page.previous_cursor)
+            return (None, page, page.object_list, page.has_other_pages())
+
+        key, entry = fragments.get_list_page(
+            facets.firma(self.filtros), salaries.firma(self.filtros_salario),
+            locations.firma(self.filtros_ubicacion), self.request.GET.get('cursor', ''), page_size,
+        )
+        if entry is None:
+            # Sustituye la paginación por OFFSET de ListView por la de cursor
+            key_field = 'salary_max' if 'orden' in self.filtros_salario else 'created_at'
+            with lectura_para_cache(fragments.LIST_VERSION_KEY):
+                paginator, page = paginate_offers(
+                    self.request, queryset.only('id', key_field), page_size, key_field=key_field,
+                )
+            entry = fragments.set_list_page(
+                key, [offer.pk for offer in page.object_list], page.next_cursor, page.previous_cursor
+            )
+        page = KeysetPage(entry['ids'], entry['next'], entry['previous'])
+        return (None, page, page.object_list, page.has_other_pages())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['is_headhunter'] = self.request.user.is_authenticated and \
-        self.request.user.groups.filter(name='headhunter').exists()
+        user = self.request.user
+        access = get_user_access(user)
+        offer_ids = list(context['object_list'])
+
+        if access.is_headhunter:
+            variante = fragments.VARIANTE_HEADHUNTER
+            load_offers = lambda ids: JobOffer.objects.filter(pk__in=ids).select_related('created_by')
+        else:
+            variante = fragments.VARIANTE_PUBLICA
+            load_offers = lambda ids: JobOffer.objects.filter(pk__in=ids)
+        context['cards'] = fragments.get_cards(offer_ids, variante, load_offers)
+
+        # Capa personal: no se cachea con las tarjetas
+        context['owned_offer_ids'] = access.owned_offer_ids
+        context['applied_offer_ids'] = set()
+        if user.is_authenticated and not access.is_headhunter and offer_ids:
+            context['applied_offer_ids'] = set(
+                Candidatura.objects.filter(user=user, offer_id__in=offer_ids).values_list('offer_id', flat=True)
+            )
+        context['is_headhunter'] = access.is_headhunter
+        context['search_query'] = self.request.GET.get('q', '').strip()
+
+        # Facetas: recuentos sobre las ofertas activas (que coinciden con la búsqueda,
+        # el rango de salario y la cercanía)
+        base = salaries.filtrar(JobOffer.objects.filter(is_active=True), self.filtros_salario)
+        base = locations.filtrar(base, self.filtros_ubicacion)
+        if context['search_query']:
+            base = base.filter(search.match_q(context['search_query']))
+        clave_base = '|'.join((
+            context['search_query'], salaries.firma(self.filtros_salario), locations.firma(self.filtros_ubicacion),
+        ))
+        context['facetas'] = facets.enlazar(
+            facets.get_facetas(base, self.filtros, clave_base), self.request.GET,
+        )
+        context['filtros'] = self.filtros
+        context['filtros_salario'] = self.filtros_salario
+        context['monedas'] = list(salaries.MONEDAS)
+        context['filtros_ubicacion'] = self.filtros_ubicacion
+        context['radios'] = locations.RADIOS
+        context['radio_actual'] = self.filtros_ubicacion.get('radio', locations.RADIO_POR_DEFECTO)
+        context['cerca'] = self.request.GET.get('cerca', '')
         return context
 
 class JobOfferDetailView(DetailView):
@@ -115,29 +327,105 @@ class JobOfferDetailView(DetailView):
     context_object_name = 'offer'
     pk_url_kwarg = 'offer_id'
 
+    def get(self, request, *args, **kwargs):
+        # El cuerpo de la oferta sale de la caché compartida; la oferta solo se lee
+        # de la base de datos si no está en caché o si la ve su creador (contadores
+        # y candidaturas, que no se cachean).
+        offer_id = self.kwargs[self.pk_url_kwarg]
+        key, self.entry = fragments.get_detail(offer_id)
+        self.access = get_user_access(request.user)
+        self.object = None
+        if self.entry is None or self.access.owns_offer(offer_id):
+            with lectura_para_cache(fragments.offer_version_key(offer_id)):
+                self.object = self.get_object()
+            if self.entry is None:
+                self.entry = fragments.set_detail(key, self.object)
+        context = self.get_context_data()
+        return self.render_to_response(context)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        
+
         user = self.request.user
-        offer = self.object
+        offer_id = self.kwargs[self.pk_url_kwarg]
+        context['offer_id'] = offer_id
+        context['offer_title'] = self.entry['title']
+        context['offer_body'] = self.entry['html']
+
+        access = self.access
+        context['is_headhunter'] = access.is_headhunter
+        context['is_offer_creator'] = access.owns_offer(offer_id)
 
-        context['is_headhunter'] = user.is_authenticated and user.groups.filter(name='headhunter').exists()
-        context['is_offer_creator'] = user.is_authenticated and offer.created_by == user
+        if context['is_offer_creator']:
+            context['applications'] = self.object.applications.select_related('user').order_by('-fecha_aplicacion')
 
         if user.is_authenticated and not context['is_headhunter']:
-            user_application = Candidatura.objects.filter(user=user, offer=offer).first()
+            user_application = Candidatura.objects.filter(user=user, offer_id=offer_id).first()
             context['user_has_applied'] = user_application is not None
             context['user_application'] = user_application
 
         return context
 
+@require_GET
+def api_ofertas_publicas(request):
+    """
+    Feed público (JSON) de ofertas activas, paginado por cursor igual que JobOfferList
+    y con los mismos filtros (facetas, salario y cercanía).
+    """
+    filtros = facets.leer_filtros(request.GET)
+    filtros_salario = salaries.leer_filtros(request.GET)
+    filtros_ubicacion = locations.leer_filtros(request.GET)
+    queryset = facets.filtrar(JobOffer.objects.filter(is_active=True), filtros)
+    queryset = salaries.filtrar(queryset, filtros_salario)
+    queryset = locations.filtrar(queryset, filtros_ubicacion)
+    if request.GET.get('q', '').strip():
+        restrict = bool(filtros or filtros_salario or filtros_ubicacion)
+        page = search_offers_page(request, queryset, get_page_size(request), restrict=restrict)
+    else:
+        key_field = 'salary_max' if 'orden' in filtros_salario else 'created_at'
+        _, page = paginate_offers(request, queryset, get_page_size(request), key_field=key_field)
+    results = [{
+        'id': offer.id,
+        'title': offer.title,
+        'company_name': offer.company_name,
+        'location': offer.location,
+        'location_city': offer.location_city,
+        'location_region': offer.location_region,
+        'location_lat': offer.location_lat,
+        'location_lon': offer.location_lon,
+        'modality': offer.modality,
+        'salary': offer.salary,
+        'salary_min': offer.salary_min,
+        'salary_max': offer.salary_max,
+        'salary_currency': offer.salary_currency,
+        'salary_period': offer.salary_period,
+        'category': offer.category,
+        'created_at': offer.created_at.isoformat(),
+        'url': reverse('job_offer_detail', kwargs={'offer_id': offer.id}),
+    } for offer in page]
+    return JsonResponse({
+        'results': results,
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
 # --- Vistas de Postulación ---
 @login_required
 def candidate_dashboard(request):
-    candidaturas = Candidatura.objects.filter(user=request.user).select_related('offer')
+    candidaturas = list(Candidatura.objects.filter(user=request.user).select_related('offer'))
+
+    # "Recomendadas para ti": similitud TF-IDF con las ofertas a las que ya se inscribió
+    similares = recommendations.recomendar([c.offer_id for c in candidaturas])
+    ofertas = JobOffer.objects.filter(id__in=[offer_id for offer_id, _ in similares], is_active=True).in_bulk()
+    recomendadas = []
+    for offer_id, similitud in similares:
+        if offer_id in ofertas:
+            ofertas[offer_id].similitud = round(similitud * 100)
+            recomendadas.append(ofertas[offer_id])
 
     return render(request, 'jobs/candidate_dashboard.html', {
         'candidaturas': candidaturas,
+        'recomendadas': recomendadas,
     })
 
 @login_required 
@@ -147,7 +435,7 @@ def apply_to_offer(request, offer_id):
     """
     offer = get_object_or_404(JobOffer, id=offer_id, is_active=True)
 
-    if request.user.groups.filter(name='headhunter').exists():
+    if get_user_access(request.user).is_headhunter:
         messages.error(request, 'Los headhunters no pueden postular a ofertas de empleo.')
         return redirect('job_offer_detail', offer_id=offer_id)
 
@@ -161,7 +449,7 @@ def apply_to_offer(request, offer_id):
             candidatura = form.save(commit=False)
             candidatura.user = request.user
             candidatura.offer = offer
-            candidatura.save()
+            guardar(candidatura)
             messages.success(request, '¡Tu postulación ha sido enviada con éxito!')
             return redirect('job_offer_detail', offer_id=offer_id)
     else:
@@ -187,7 +475,18 @@ class OfferApplicationsView(HeadhunterRequiredMixin, DetailView): # Usamos el Mi
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['applications'] = self.object.applications.all().order_by('-fecha_aplicacion')
+        applications = list(self.object.applications.select_related('user').order_by('-fecha_aplicacion'))
+        # Afinidad del mensaje con la oferta (jobs/fit.py); ?orden=afinidad ordena por ella
+        afinidades = fit.afinidades(self.object, applications)
+        for application in applications:
+            application.afinidad = round(afinidades[application.pk] * 100)
+        orden = 'afinidad' if self.request.GET.get('orden') == 'afinidad' else ''
+        if orden:
+            # sort es estable: a igual afinidad se mantiene el orden por fecha
+            applications.sort(key=lambda application: afinidades[application.pk], reverse=True)
+        context['applications'] = applications
+        context['orden'] = orden
+        context['estados'] = CandidatureStatus.choices
         context['is_headhunter'] = True
         return context
 
@@ -202,7 +501,7 @@ def cambiar_estado_candidatura(request, candidature_id):
     if request.method == 'POST':
         form = CandidaturaStatusForm(request.POST, instance=candidatura)
         if form.is_valid():
-            form.save()
+            con_reintentos(form.save)()
             messages.success(request, f'Estado de la candidatura de {candidatura.user.username} actualizado a "{candidatura.get_estado_display()}".')
             return redirect('offer_applications', offer_id=candidatura.offer.id)
     else:
@@ -215,6 +514,78 @@ def cambiar_estado_candidatura(request, candidature_id):
     }
     return render(request, 'jobs/cambiar_estado_candidatura.html', context)
 
+# Máximo de candidaturas por petición del cambio de estado masivo
+BULK_STATUS_MAX = getattr(settings, 'JOBS_BULK_STATUS_MAX', 1000)
+
+
+def leer_cambios_estado(data):
+    """
+    Normaliza el cuerpo de la API de cambio masivo a {id: estado}. Acepta
+    {"estado": "...", "ids": [...]} o {"cambios": [{"id": ..., "estado": "..."}, ...]}.
+    Lanza ValueError con un mensaje legible si el formato no es válido.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Se esperaba un objeto JSON.')
+    if 'cambios' in data:
+        filas = data['cambios']
+        if not isinstance(filas, list) or not all(isinstance(fila, dict) for fila in filas):
+            raise ValueError('"cambios" debe ser una lista de objetos {"id", "estado"}.')
+        pares = [(fila.get('id'), fila.get('estado')) for fila in filas]
+    else:
+        ids = data.get('ids')
+        if not isinstance(ids, list):
+            raise ValueError('Falta "ids" (lista) o "cambios".')
+        pares = [(pk, data.get('estado')) for pk in ids]
+
+    if len(pares) > BULK_STATUS_MAX:
+        raise ValueError(f'Como máximo {BULK_STATUS_MAX} candidaturas por petición.')
+    cambios = {}
+    for pk, estado in pares:
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            raise ValueError(f'Id de candidatura no válido: {pk!r}.')
+        if estado not in CandidatureStatus.values:
+            raise ValueError(f'Estado no válido: {estado!r}.')
+        cambios[pk] = estado
+    return cambios
+
+
+@headhunter_required
+@require_POST
+def api_cambiar_estados_candidaturas(request):
+    """
+    Cambia el estado de muchas candidaturas en una sola petición y transacción.
+    Devuelve el resultado de cada fila: actualizada, sin_cambios o no_encontrada
+    (inexistente o de una oferta de otro headhunter).
+    """
+    try:
+        cambios = leer_cambios_estado(json.loads(request.body or b'null'))
+    except (ValueError, UnicodeDecodeError) as exc:
+        # json.JSONDecodeError es subclase de ValueError
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+
+    propias = Candidatura.objects.filter(offer__created_by=request.user)
+    actualizadas, sin_cambios = con_reintentos(propias.aplicar_estados)(cambios)
+    actualizadas, sin_cambios = set(actualizadas), set(sin_cambios)
+
+    resultados = []
+    for pk, estado in cambios.items():
+        if pk in actualizadas:
+            resultado = 'actualizada'
+        elif pk in sin_cambios:
+            resultado = 'sin_cambios'
+        else:
+            resultado = 'no_encontrada'
+        resultados.append({'id': pk, 'estado': estado, 'resultado': resultado})
+
+    return JsonResponse({
+        'status': 'ok',
+        'message': f'{len(actualizadas)} candidaturas actualizadas.',
+        'actualizadas': len(actualizadas),
+        'sin_cambios': len(sin_cambios),
+        'no_encontradas': len(cambios) - len(actualizadas) - len(sin_cambios),
+        'resultados': resultados,
+    })
+
 # --- Vistas de Agenda (Solo para Headhunters) ---
 
 @headhunter_required
@@ -227,41 +598,173 @@ def agenda(request):
     context = {
         'form': form,
         'is_headhunter': True,
+        # Punto de partida para la sincronización incremental del calendario
+        'sync_token': agenda_cache.token_actual(request.user.pk),
     }
     return render(request, 'jobs/agenda.html', context)
 
+# Máximo de eventos por respuesta de la API de agenda (configurable en settings)
+AGENDA_MAX_EVENTS = getattr(settings, 'JOBS_AGENDA_MAX_EVENTS', 500)
+
+# Máximo de cambios que devuelve la sincronización incremental antes de pedir recarga completa
+AGENDA_MAX_SYNC_CHANGES = getattr(settings, 'JOBS_AGENDA_MAX_SYNC_CHANGES', 200)
+
+# Ventana por defecto si el cliente no envía start/end
+AGENDA_DEFAULT_WINDOW = (timedelta(days=7), timedelta(days=35))
+
+
+_OFFSET_SIN_SIGNO = re.compile(r'(\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?) (\d{2}(?::?\d{2})?)$')
+
+
+def parse_agenda_bound(value):
+    """
+    Interpreta los parámetros start/end de FullCalendar: fecha ISO con o sin hora
+    y zona horaria. Devuelve un datetime aware o None si el formato no es válido.
+    """
+    if not value:
+        return None
+    # En la query string el '+' del offset llega convertido en espacio: solo se
+    # recupera si el espacio va justo delante de un offset final tras la hora
+    # ('2026-10-18T10:00:00 02:00'); el que separa fecha y hora se deja como está
+    value = _OFFSET_SIN_SIGNO.sub(r'\1+\2', value.strip())
+    parsed = parse_datetime(value)
+    if parsed is None:
+        date = parse_date(value)
+        if date is None:
+            return None
+        parsed = datetime.combine(date, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def serializar_accion(accion):
+    """
+    Convierte una AgendaAccion en un evento de FullCalendar.
+    """
+    title = f"{accion.get_tipo_display()} - {accion.titulo}" # Usar titulo de la accion, no de la oferta directamente
+    if accion.oferta:
+        title += f" (Oferta: {accion.oferta.title})"
+    if accion.candidatura:
+        title += f" (Candidato: {accion.candidatura.user.username})"
+
+    return {
+        'id': accion.id,
+        'title': title,
+        'start': accion.fecha_hora_inicio.isoformat(), # Usar fecha_hora_inicio del modelo
+        # Calcular el 'end' usando la duración. Añadir el timezone.timedelta
+        'end': (accion.fecha_hora_inicio + timedelta(minutes=accion.duracion_minutos)).isoformat() if accion.fecha_hora_inicio else None,
+        'backgroundColor': color_por_tipo(accion.tipo), # Usar el filtro de color
+        'extendedProps': { # Datos adicionales para uso en JS
+            'descripcion': accion.descripcion, # Cambiado de 'notes' a 'descripcion'
+            'oferta_id': accion.oferta_id, # Sin acceder al objeto oferta
+            'candidatura_id': accion.candidatura_id,
+            'tipo': accion.tipo, # Añadido el tipo de acción
+            'duracion_minutos': accion.duracion_minutos, # Añadido la duración
+        }
+    }
+
+
+def acciones_en_ventana(user, start, end, limit):
+    """
+    Acciones del usuario que se solapan con [start, end), como mucho `limit`.
+
+    La consulta es un rango sobre el índice (user, fecha_hora_inicio): una acción que
+    empieza antes de `start` solo puede solaparse si empezó como mucho
+    MAX_DURACION_MINUTOS antes, así que ese es el límite inferior del rango.
+    Devuelve (acciones, truncado).
+    """
+    lookback = start - timedelta(minutes=AgendaAccion.MAX_DURACION_MINUTOS)
+    acciones = (
+        AgendaAccion.objects
+        .filter(user=user, fecha_hora_inicio__gte=lookback, fecha_hora_inicio__lt=end)
+        .select_related('oferta', 'candidatura__user')
+        .order_by('fecha_hora_inicio', 'id')
+    )
+    resultado = []
+    # Se lee un margen extra para compensar las que empiezan antes y no llegan a `start`
+    for accion in acciones.iterator(chunk_size=limit + 1):
+        if accion.fecha_hora_inicio + timedelta(minutes=accion.duracion_minutos) <= start:
+            continue
+        if len(resultado) == limit:
+            return resultado, True
+        resultado.append(accion)
+    return resultado, False
+
+
 @headhunter_required
 @require_GET
 def api_acciones_headhunter(request):
     """
     API endpoint que devuelve las acciones de agenda del headhunter en formato FullCalendar.
+    Solo incluye los eventos que se solapan con la ventana visible (?start=&end=).
+    El JSON de cada ventana se guarda en caché y se valida con ETag (304 si no cambió).
     """
-    # Filtra las acciones del headhunter actual (el campo 'user' en AgendaAccion)
-    acciones = AgendaAccion.objects.filter(user=request.user).select_related('oferta', 'candidatura__user')
-    events = []
-    for accion in acciones:
-        title = f"{accion.get_tipo_display()} - {accion.titulo}" # Usar titulo de la accion, no de la oferta directamente
-        if accion.oferta:
-            title += f" (Oferta: {accion.oferta.title})"
-        if accion.candidatura:
-            title += f" (Candidato: {accion.candidatura.user.username})"
-        
-        events.append({
-            'id': accion.id,
-            'title': title,
-            'start': accion.fecha_hora_inicio.isoformat(), # Usar fecha_hora_inicio del modelo
-            # Calcular el 'end' usando la duración. Añadir el timezone.timedelta
-            'end': (accion.fecha_hora_inicio + timedelta(minutes=accion.duracion_minutos)).isoformat() if accion.fecha_hora_inicio else None,
-            'backgroundColor': color_por_tipo(accion.tipo), # Usar el filtro de color
-            'extendedProps': { # Datos adicionales para uso en JS
-                'descripcion': accion.descripcion, # Cambiado de 'notes' a 'descripcion'
-                'oferta_id': accion.oferta.id if accion.oferta else None, # Asegúrate de que existe oferta antes de acceder a .id
-                'candidatura_id': accion.candidatura.id if accion.candidatura else None,
-                'tipo': accion.tipo, # Añadido el tipo de acción
-                'duracion_minutos': accion.duracion_minutos, # Añadido la duración
-            }
-        })
-    return JsonResponse(events, safe=False)
+    now = timezone.now()
+    start = parse_agenda_bound(request.GET.get('start')) if 'start' in request.GET else now - AGENDA_DEFAULT_WINDOW[0]
+    end = parse_agenda_bound(request.GET.get('end')) if 'end' in request.GET else now + AGENDA_DEFAULT_WINDOW[1]
+    if start is None or end is None or end <= start:
+        return JsonResponse({'status': 'error', 'errors': {'__all__': ['Parámetros start/end no válidos.']}}, status=400)
+
+    key, entry = agenda_cache.get_feed(request.user.pk, start.isoformat(), end.isoformat(), AGENDA_MAX_EVENTS)
+    if entry is None:
+        # Filtra las acciones del headhunter actual (el campo 'user' en AgendaAccion).
+        # Tras un cambio reciente se lee de la principal, no de una réplica atrasada.
+        with lectura_para_cache(agenda_cache.version_key(request.user.pk)):
+            acciones, truncado = acciones_en_ventana(request.user, start, end, AGENDA_MAX_EVENTS)
+        events = [serializar_accion(accion) for accion in acciones]
+        headers = {}
+        if truncado:
+            # La respuesta se ha cortado en AGENDA_MAX_EVENTS eventos
+            headers['X-Agenda-Truncated'] = str(AGENDA_MAX_EVENTS)
+        body = json.dumps(events, cls=DjangoJSONEncoder).encode()
+        entry = agenda_cache.set_feed(key, body, headers)
+
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    if '*' in etags or entry['etag'] in etags:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(entry['body'], content_type='application/json')
+        for header, value in entry['headers'].items():
+            response[header] = value
+    response['ETag'] = entry['etag']
+    # El navegador puede guardar la respuesta pero debe revalidarla siempre
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+@headhunter_required
+@require_GET
+def api_acciones_cambios(request):
+    """
+    Sincronización incremental de la agenda: devuelve solo las acciones creadas,
+    modificadas o eliminadas desde el token que envía el cliente (?token=).
+    Si hay demasiados cambios responde reset=true y el cliente recarga el feed completo.
+    """
+    try:
+        token = int(request.GET.get('token', 0))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'errors': {'token': ['Token de sincronización no válido.']}}, status=400)
+
+    nuevo_token, modificados, eliminados, reset = agenda_cache.cambios_desde(
+        request.user.pk, token, AGENDA_MAX_SYNC_CHANGES
+    )
+    acciones = (
+        AgendaAccion.objects
+        .filter(user=request.user, id__in=modificados)
+        .select_related('oferta', 'candidatura__user')
+    ) if modificados else []
+    events = [serializar_accion(accion) for accion in acciones]
+
+    # Una acción registrada como modificada que ya no es del usuario se trata como eliminada
+    encontrados = {event['id'] for event in events}
+    eliminados += [accion_id for accion_id in modificados if accion_id not in encontrados]
+
+    return JsonResponse({
+        'token': nuevo_token,
+        'reset': reset,
+        'upserted': events,
+        'deleted': eliminados,
+    })
 
 @headhunter_required
 @require_POST
@@ -275,17 +778,19 @@ def crear_accion_ajax(request):
         accion = form.save(commit=False)
         accion.user = request.user # Asegura que la acción se asigne al usuario actual
         
+        access = get_user_access(request.user)
+
         # Validar que la oferta seleccionada (si existe) pertenezca al headhunter actual
-        if accion.oferta and not JobOffer.objects.filter(id=accion.oferta.id, created_by=request.user).exists():
+        if accion.oferta and not access.owns_offer(accion.oferta_id):
             return JsonResponse({'status': 'error', 'errors': {'oferta': ['La oferta seleccionada no te pertenece.']}}, status=403)
         
         # Validar que la candidatura seleccionada (si existe) pertenezca a una oferta del headhunter
-        if accion.candidatura and not Candidatura.objects.filter(id=accion.candidatura.id, offer__created_by=request.user).exists():
+        if accion.candidatura and not access.owns_offer(accion.candidatura.offer_id):
             return JsonResponse({'status': 'error', 'errors': {'candidatura': ['La candidatura seleccionada no está asociada a una de tus ofertas.']}}, status=403)
 
-        accion.save()
-        messages.success(request, 'Acción creada exitosamente.')
-        return JsonResponse({'status': 'ok'})
+        guardar(accion)
+        # La agenda ya no recarga la página: el mensaje viaja en la respuesta
+        return JsonResponse({'status': 'ok', 'message': 'Acción creada exitosamente.'})
     else:
         return JsonResponse({'status': 'error', 'errors': form.errors}, status=400)
 
@@ -302,17 +807,18 @@ def editar_accion_ajax(request, accion_id):
         # Pasar el usuario al formulario al editar
         form = AgendaAccionForm(request.POST, instance=accion, user=request.user) 
         if form.is_valid():
+            access = get_user_access(request.user)
+
             # Validar que la oferta seleccionada (si existe) pertenezca al headhunter
-            if form.cleaned_data.get('oferta') and not JobOffer.objects.filter(id=form.cleaned_data['oferta'].id, created_by=request.user).exists():
+            if form.cleaned_data.get('oferta') and not access.owns_offer(form.cleaned_data['oferta'].id):
                 return JsonResponse({'status': 'error', 'errors': {'oferta': ['La oferta seleccionada no te pertenece.']}}, status=403)
             
             # Validar que la candidatura seleccionada (si existe) pertenezca a una oferta del headhunter
-            if form.cleaned_data.get('candidatura') and not Candidatura.objects.filter(id=form.cleaned_data['candidatura'].id, offer__created_by=request.user).exists():
+            if form.cleaned_data.get('candidatura') and not access.owns_offer(form.cleaned_data['candidatura'].offer_id):
                 return JsonResponse({'status': 'error', 'errors': {'candidatura': ['La candidatura seleccionada no está asociada a una de tus ofertas.']}}, status=403)
 
-            form.save()
-            messages.success(request, 'Acción actualizada exitosamente.')
-            return JsonResponse({'status': 'ok'})
+            con_reintentos(form.save)()
+            return JsonResponse({'status': 'ok', 'message': 'Acción actualizada exitosamente.'})
         else:
             return JsonResponse({'status': 'error', 'errors': form.errors}, status=400)
     else: # GET request, para cargar el formulario
@@ -328,9 +834,8 @@ def eliminar_accion_ajax(request, accion_id):
     """
     # Asegúrate de que solo el headhunter que creó la acción (o su oferta) pueda eliminarla
     accion = get_object_or_404(AgendaAccion, id=accion_id, user=request.user) # Filtro por el user de la acción
-    accion.delete()
-    messages.success(request, 'Acción eliminada exitosamente.')
-    return JsonResponse({'status': 'ok'})
+    con_reintentos(accion.delete)()
+    return JsonResponse({'status': 'ok', 'message': 'Acción eliminada exitosamente.'})
 
 
 def color_por_tipo(tipo):
@@ -345,4 +850,28 @@ def color_por_tipo(tipo):
         'otro': '#6c757d',        # Gris (bg-secondary)
     }
     return tipo_colores.get(tipo, '#6c757d') # Gris por defecto
-    
\ No newline at end of file
+
+
+# --- Métricas para Prometheus ---
+
+@require_GET
+def metrics(request):
+    """
+    Métricas en formato de texto de Prometheus (ver jobs/metrics.py). Se exige
+    `Authorization: Bearer <JOBS_METRICS_TOKEN>`; sin token configurado la ruta
+    solo existe con DEBUG.
+    """
+    token = getattr(settings, 'JOBS_METRICS_TOKEN', '')
+    if not token:
+        if not settings.DEBUG:
+            raise Http404
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+
+    outbox = {(('estado', estado),): 0 for estado in OutboxEmail.Estado.values}
+    for fila in OutboxEmail.objects.values('estado').annotate(n=Count('id')).order_by():
+        outbox[(('estado', fila['estado']),)] = fila['n']
+    return HttpResponse(
+        app_metrics.exponer({'jobs_outbox_emails': outbox}),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )